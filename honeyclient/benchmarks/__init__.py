@@ -0,0 +1,6 @@
+"""
+Benchmarks for the honeyclient hot paths.
+
+Run them from the honeyclient directory, either all at once with python -m benchmarks,
+or individually, e.g. python -m benchmarks.bench_parsing
+"""
@@ -0,0 +1,87 @@
+"""
+Run benchmarks and optionally compare them against a previous run, e.g.
+
+    python -m benchmarks --json baseline.json
+    python -m benchmarks --compare baseline.json hot_paths
+
+Exits with status 1 if any benchmark is slower than its baseline by more than the threshold.
+"""
+import datetime
+import importlib
+import json
+import pkgutil
+import platform
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+import click
+
+from . import common
+
+SUITES = sorted(
+    name[len("bench_"):]
+    for _, name, _ in pkgutil.iter_modules([str(Path(__file__).parent)])
+    if name.startswith("bench_")
+)
+
+
+def compare(baseline: Dict[str, Any], results: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """
+    Returns:
+        A description of every benchmark that is slower than its baseline by more than threshold.
+    """
+    previous = {r["name"]: r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["name"])
+        if not before:
+            continue
+        change = result["seconds"] / before - 1
+        line = f"{result['name']:<50} {before * 1000:>10.3f} ms -> {result['seconds'] * 1000:>10.3f} ms ({change:+.0%})"
+        if change > threshold:
+            regressions.append(line)
+            click.secho(line, fg="red")
+        elif change < -threshold:
+            click.secho(line, fg="green")
+        else:
+            click.echo(line)
+    return regressions
+
+
+@click.command()
+@click.argument("suites", nargs=-1, type=click.Choice(SUITES))
+@click.option("--json", "json_file", type=click.Path(dir_okay=False), help="Write the results to a JSON file.")
+@click.option("--compare", "baseline_file", type=click.Path(exists=True, dir_okay=False),
+              help="Compare the results to a JSON file written by a previous run.")
+@click.option("--threshold", type=float, default=0.25, show_default=True,
+              help="The relative slowdown that is considered a regression.")
+def cli(suites, json_file, baseline_file, threshold):
+    """
+    Run the given benchmark suites, or all of them.
+    """
+    for suite in suites or SUITES:
+        click.secho(f"=== {suite} ===", fg="magenta", bold=True)
+        importlib.import_module(f"benchmarks.bench_{suite}").main()
+
+    if json_file:
+        with open(json_file, "w") as f:
+            json.dump({
+                "timestamp": datetime.datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": common.RESULTS,
+            }, f, indent=2)
+
+    if baseline_file:
+        with open(baseline_file) as f:
+            baseline = json.load(f)
+        click.secho("=== Comparison ===", fg="magenta", bold=True)
+        regressions = compare(baseline, common.RESULTS, threshold)
+        if regressions:
+            click.secho(f"{len(regressions)} benchmarks regressed by more than {threshold:.0%}.", fg="red", bold=True)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli()
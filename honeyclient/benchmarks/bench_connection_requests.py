@@ -0,0 +1,46 @@
+"""
+Throughput of the ConnectionRequestServer, with and without silent connections
+that keep the server waiting until their deadline.
+"""
+import concurrent.futures
+import socket
+import time
+
+from tr069 import connection_request_server
+
+from .common import report
+
+REQUESTS = 1_000
+CONCURRENCY = 50
+REQUEST = b"GET /cr HTTP/1.1\r\nHost: cpe\r\n\r\n"
+
+
+def connection_request(address) -> None:
+    with socket.create_connection(address) as sock:
+        sock.sendall(REQUEST)
+        received = b""
+        while len(received) < len(connection_request_server.DEFAULT_REPLY):
+            received += sock.recv(4096)
+
+
+def main():
+    for silent in (0, 100):
+        serv = connection_request_server.ConnectionRequestServer(("127.0.0.1", 0), log=False, timeout=10)
+        address = serv.sock.getsockname()
+        idle = [socket.create_connection(address) for _ in range(silent)]
+        with concurrent.futures.ThreadPoolExecutor(CONCURRENCY) as pool:
+            start = time.perf_counter()
+            list(pool.map(connection_request, [address] * REQUESTS))
+            seconds = time.perf_counter() - start
+        for sock in idle:
+            sock.close()
+        serv.shutdown()
+        report(
+            f"connection requests ({silent} silent connections)",
+            seconds / REQUESTS,
+            requests_per_second=int(REQUESTS / seconds),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Loading data model definitions: parsing the XML and writing the index,
+opening the memory-mapped index, and creating a device from it.
+"""
+import os
+import tempfile
+import time
+
+from tr069.data import datamodel
+
+from .common import SIZES, measure, report
+
+PARAMETERS_PER_OBJECT = 10
+
+
+def make_definition(size: int) -> str:
+    objects = []
+    for i in range(max(size // PARAMETERS_PER_OBJECT, 1)):
+        params = "".join(
+            f"""
+            <parameter name="Parameter{j}" access="readWrite">
+              <description>A parameter of a synthetic data model, with a description as long as a typical one.</description>
+              <syntax><unsignedInt/><default type="object" value="{j}"/></syntax>
+            </parameter>"""
+            for j in range(PARAMETERS_PER_OBJECT)
+        )
+        objects.append(f"""
+          <object name="InternetGatewayDevice.Object{i}." access="readOnly" minEntries="1" maxEntries="1">
+            {params}
+          </object>""")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <dm:document xmlns:dm="urn:broadband-forum-org:cwmp:datamodel-1-5">
+          <model name="InternetGatewayDevice:1.4">{"".join(objects)}</model>
+        </dm:document>
+    """
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            path = os.path.join(tmp, f"model-{size}.xml")
+            with open(path, "w") as f:
+                f.write(make_definition(size))
+
+            start = time.perf_counter()
+            datamodel.load(path).close()
+            report(f"datamodel.load[{size}] parse", time.perf_counter() - start, xml_kb=os.path.getsize(path) // 1024)
+
+            def cached():
+                datamodel.load(path).close()
+
+            report(f"datamodel.load[{size}] index", measure(cached), index_kb=os.path.getsize(path + ".idx") // 1024)
+
+            dm = datamodel.load(path)
+            report(f"DataModel.get[{size}]", measure(lambda: dm.get("InternetGatewayDevice.Object0.Parameter5")))
+            report(f"DataModel.to_device[{size}]", measure(lambda: dm.to_device("Vendor", "001122", "Gateway", "S1")))
+            dm.close()
+
+
+if __name__ == "__main__":
+    main()
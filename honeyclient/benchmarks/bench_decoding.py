@@ -0,0 +1,36 @@
+"""
+Decoding multi-megabyte response bodies without a declared charset,
+e.g. the GetParameterNamesResponse for an entire data model.
+requests' Response.text, which detects the charset on every access, is included for comparison.
+"""
+import requests
+
+from tr069.data import envelope
+from tr069.data import rpcs
+
+from .common import synthetic_parameters, measure, report
+
+SIZES = (10_000, 100_000)
+
+
+def make_response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.headers["Content-Type"] = "application/soap+xml"
+    return response
+
+
+def main():
+    for size in SIZES:
+        body = rpcs.make_get_parameter_names_response(list(synthetic_parameters(size).values())).encode()
+        assert envelope.decode(make_response(body)) == make_response(body).text
+        for impl, fn in [
+            ("decode", lambda: envelope.decode(make_response(body))),
+            ("Response.text", lambda: make_response(body).text),
+        ]:
+            report(f"GetParameterNamesResponse[{size}] {impl}", measure(fn), body_kb=len(body) // 1024)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Fuzzing throughput against the mock ACS, with all seeds and mutators.
+"""
+import time
+
+from tr069 import fuzz
+from tr069 import testing
+
+from .common import report
+
+CASES = 2_000
+
+
+def main():
+    with testing.MockACS(keep_sessions=False) as acs:
+        fuzzer = fuzz.Fuzzer(acs.url, workers=20, random_seed=0)
+        start = time.perf_counter()
+        fuzzer.run(CASES)
+        seconds = time.perf_counter() - start
+        report(
+            "fuzz cases",
+            seconds / CASES,
+            cases_per_minute=int(CASES / seconds * 60),
+            corpus=len(fuzzer.corpus),
+        )
+
+
+if __name__ == "__main__":
+    main()
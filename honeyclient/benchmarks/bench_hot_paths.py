@@ -0,0 +1,61 @@
+"""
+The functions every session goes through, on synthetic data models of increasing size:
+building and parsing Informs, parsing parameter lists, prefix queries, cwmp:ID handling,
+and a complete session in which an in-process ACS retrieves the entire data model.
+"""
+import datetime
+
+import tr069
+from tr069 import testing
+from tr069.data import device
+from tr069.data import parameters
+from tr069.data import rpcs
+from tr069.data import soap
+
+from .common import SIZES, synthetic_parameters, measure, report
+
+TIME = datetime.datetime(2020, 1, 1)
+# GetParameterValues requests per session.
+SERVER_RPCS = 10
+
+
+def make_device(size: int) -> device.Device:
+    params = synthetic_parameters(size)
+    params.update({p.name: p for p in device.DEFAULT.params.values()})
+    return device.Device("Vendor", "001122", "Gateway", "S1", params)
+
+
+def main():
+    for size in SIZES:
+        dev = make_device(size)
+        param_list = list(dev.params.values())
+        inform = rpcs.make_inform(device=dev, params=param_list, time=TIME)
+        response = rpcs.make_get_parameter_values_response(param_list)
+
+        report(
+            f"make_inform[{size}]",
+            measure(lambda: rpcs.make_inform(device=dev, params=param_list, time=TIME)),
+            body_kb=len(inform) // 1024,
+        )
+        report(f"parameters.from_xml[{size}]", measure(lambda: parameters.from_xml(response)))
+        report(f"device.from_xml[{size}]", measure(lambda: device.from_xml(inform)))
+        report(
+            f"Parameters.all[{size}]",
+            measure(lambda: dev.params.all("InternetGatewayDevice.LANDevice.1.")),
+        )
+        report(f"soap.fix_cwmp_id[{size}]", measure(lambda: soap.fix_cwmp_id(response, inform)))
+
+        script = [testing.get_parameter_values(["InternetGatewayDevice."])] * SERVER_RPCS
+        with testing.MockACS(script, keep_sessions=False) as acs:
+            def session():
+                client = tr069.Client(acs.url, device=dev, log=False)
+                client.inform()
+                client.done()
+                assert client.handle_server_rpcs() == SERVER_RPCS
+                client.close()
+
+            report(f"handle_server_rpcs[{size}]", measure(session, min_time=1), server_rpcs=SERVER_RPCS)
+
+
+if __name__ == "__main__":
+    main()
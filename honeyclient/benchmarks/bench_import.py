@@ -0,0 +1,38 @@
+"""
+Import time of the package and its entry points, measured in fresh interpreters.
+Interpreter startup, measured with an empty statement, is subtracted.
+"""
+import subprocess
+import sys
+import time
+
+from .common import report
+
+RUNS = 10
+STATEMENTS = [
+    "import tr069",
+    "import tr069.data.device",
+    "import tr069.data.device; tr069.data.device.DEFAULT",
+    "from tr069 import Client",
+    "from tr069.fleet import cli",
+]
+
+
+def import_time(statement: str) -> float:
+    """The fastest of RUNS interpreter runs of statement, in seconds."""
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    startup = import_time("pass")
+    for statement in STATEMENTS:
+        report(f"import: {statement}", max(import_time(statement) - startup, 0.0))
+
+
+if __name__ == "__main__":
+    main()
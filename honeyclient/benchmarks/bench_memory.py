@@ -0,0 +1,91 @@
+"""
+Memory used per parameter when many devices load the same data model from XML.
+The previous Parameter representation, a regular object without interning, is included for comparison.
+
+Memory used per device when a fleet derives its devices from a template,
+with copy-on-write layers and with full copies of all parameters, as before.
+"""
+import copy
+from typing import Dict
+
+from tr069 import fleet
+from tr069.data import device
+from tr069.data import parameters
+from tr069.data import pullparser
+from tr069.data import rpcs
+
+from .common import SIZES, synthetic_parameters, measure_retained, report
+
+DEVICES = 10
+
+
+class DictParameter:
+    """A Parameter as it was represented before: with a per-instance __dict__ and without interning."""
+
+    def __init__(self, name, value, type="xsd:string", notification_level=0, writable=True):
+        self.name = name
+        self.value = value
+        self.type = type
+        self.notification_level = notification_level
+        self.writable = writable
+
+
+def load_dict_parameters(xml: str) -> Dict[str, DictParameter]:
+    params = {}
+    for _, struct in pullparser.iter_structs(xml, {"parametervaluestruct": parameters.VALUE_STRUCT_FIELDS}):
+        param = DictParameter(
+            struct.text("name"),
+            struct.text("value", ""),
+            struct.attr("value", "xsi:type") or "xsd:string",
+        )
+        params[param.name] = param
+    return params
+
+
+def load_parameters(xml: str) -> parameters.Parameters:
+    params = parameters.from_xml(xml)
+    # The sorted index is part of the representation, so include it.
+    params.all("InternetGatewayDevice.")
+    return params
+
+
+def copied_device(template: device.Device, serial: str) -> device.Device:
+    params = parameters.Parameters(copy.copy(p) for p in template.params.values())
+    params["InternetGatewayDevice.DeviceInfo.SerialNumber"] = serial
+    return device.Device(template.manufacturer, template.oui, template.product_class, serial, params)
+
+
+def indexed(d: device.Device) -> device.Device:
+    # The sorted index is part of the representation, so include it.
+    d.params.all("InternetGatewayDevice.")
+    return d
+
+
+def main():
+    for size in SIZES:
+        xml = rpcs.make_get_parameter_values_response(list(synthetic_parameters(size).values()))
+        for impl, fn in [("slotted", load_parameters), ("dict", load_dict_parameters)]:
+            devices, retained, seconds = measure_retained(lambda: [fn(xml) for _ in range(DEVICES)])
+            assert all(len(d) == size for d in devices)
+            report(
+                f"{DEVICES} devices x {size} parameters {impl}",
+                seconds,
+                bytes_per_parameter=retained // (DEVICES * size),
+            )
+
+    for size in SIZES:
+        template = device.Device("Manufacturer", "00040E", "Product", "SERIAL", synthetic_parameters(size))
+        template.params["InternetGatewayDevice.DeviceInfo.SerialNumber"] = "SERIAL"
+        for impl, fn in [("layered", fleet.make_device), ("copied", copied_device)]:
+            devices, retained, seconds = measure_retained(
+                lambda: [indexed(fn(template, f"SERIAL{i}")) for i in range(DEVICES * 10)]
+            )
+            report(
+                f"{DEVICES * 10} devices from a {size} parameter template {impl}",
+                seconds / len(devices),
+                bytes_per_device=retained // len(devices),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Session throughput of the in-process mock ACS: on its own, driven by precomputed requests over a raw socket,
+and end-to-end with a fleet, with and without provisioning and digest authentication.
+"""
+import socket
+import time
+import urllib.parse
+
+from tr069 import fleet
+from tr069 import testing
+from tr069.data import device
+from tr069.data import rpcs
+
+from .common import report
+
+RAW_SESSIONS = 2_000
+DEVICES = 200
+SESSIONS = 5
+PROVISIONING = [
+    testing.get_parameter_values(["InternetGatewayDevice.DeviceInfo."]),
+    testing.set_parameter_values({"InternetGatewayDevice.ManagementServer.PeriodicInformInterval": "60"}),
+]
+
+
+def post(body: bytes) -> bytes:
+    return b"POST / HTTP/1.1\r\nHost: acs\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+
+
+def raw_sessions(url: str, count: int) -> None:
+    parts = urllib.parse.urlsplit(url)
+    requests = [post(rpcs.make_inform(device=device.DEFAULT).encode()), post(b"")]
+    with socket.create_connection((parts.hostname, parts.port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        responses = sock.makefile("rb")
+        for _ in range(count):
+            for request in requests:
+                sock.sendall(request)
+                length = 0
+                for line in iter(responses.readline, b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                responses.read(length)
+
+
+def main():
+    with testing.MockACS(keep_sessions=False) as acs:
+        start = time.perf_counter()
+        raw_sessions(acs.url, RAW_SESSIONS)
+        seconds = time.perf_counter() - start
+        assert acs.stats["sessions completed"] == RAW_SESSIONS
+        report("mock ACS sessions (raw socket)", seconds / RAW_SESSIONS, sessions_per_second=int(RAW_SESSIONS / seconds))
+
+    for name, script, digest_auth in [
+        ("inform only", [], None),
+        ("provisioning", PROVISIONING, None),
+        ("provisioning, digest auth", PROVISIONING, ("user", "pass")),
+    ]:
+        with testing.MockACS(script, digest_auth=digest_auth, keep_sessions=False) as acs:
+            f = fleet.Fleet(acs.url, DEVICES, concurrency=50, digest_auth=digest_auth)
+            stats = f.run(SESSIONS)
+            assert not stats.errors, stats.errors
+            report(
+                f"fleet sessions ({name})",
+                stats.duration / stats.sessions,
+                sessions_per_second=int(stats.sessions_per_second),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Value change notifications on large data models with passive notification on every parameter:
+recording 10 changes and collecting them for the next Inform.
+A scan of the whole data model for changed values, which a CPE without change tracking needs, is included for comparison.
+"""
+from typing import Dict, List
+
+from tr069.data import parameters
+
+from .common import SIZES, synthetic_parameters, measure, report
+
+CHANGES = 10
+
+
+def changes_scan(params: parameters.Parameters, last: Dict[str, str]) -> List[parameters.Parameter]:
+    return [p for p in params.values() if p.notification_level > 0 and last.get(p.name) != p.value]
+
+
+def main():
+    for size in SIZES:
+        params = synthetic_parameters(size)
+        params.set_notification("InternetGatewayDevice.", 1)
+        names = list(params)[:CHANGES]
+        last = {p.name: p.value for p in params.values()}
+        counter = [0]
+
+        def tracked():
+            counter[0] += 1
+            for name in names:
+                params[name] = str(counter[0])
+            changes = params.changes()
+            params.clear_changes(changes)
+            return changes
+
+        def scan():
+            counter[0] += 1
+            for name in names:
+                params.set_value(name, str(counter[0]), notify=False)
+            changes = changes_scan(params, last)
+            last.update((p.name, p.value) for p in changes)
+            return changes
+
+        assert len(tracked()) == len(scan()) == CHANGES
+        report(f"notify {CHANGES} changes[{size}] tracked", measure(tracked))
+        report(f"notify {CHANGES} changes[{size}] scan", measure(scan))
+
+
+if __name__ == "__main__":
+    main()
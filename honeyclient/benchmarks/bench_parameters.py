@@ -0,0 +1,36 @@
+"""
+Prefix queries on large data models, as issued by GetParameterValues and GetParameterNames.
+A linear scan, which was used before the sorted index, is included for comparison.
+"""
+from typing import List
+
+from tr069.data import parameters
+
+from .common import SIZES, synthetic_parameters, measure, report
+
+QUERIES = [
+    "InternetGatewayDevice.LANDevice.1.Hosts.Host.1.",
+    "InternetGatewayDevice.LANDevice.1.Hosts.Host.1.IPAddress",
+    "InternetGatewayDevice.LANDevice.1.",
+    "InternetGatewayDevice.WANDevice.",
+]
+
+
+def all_linear(params: parameters.Parameters, key: str) -> List[parameters.Parameter]:
+    if key == "" or key.endswith("."):
+        return [p for p in params.values() if p.name.startswith(key)]
+    return [p for p in params.values() if p.name == key]
+
+
+def main():
+    for size in SIZES:
+        params = synthetic_parameters(size)
+        for impl, fn in [("index", parameters.Parameters.all), ("linear", all_linear)]:
+            seconds = measure(lambda: [fn(params, q) for q in QUERIES])
+            report(f"all[{size}] {impl}", seconds, queries=len(QUERIES))
+        seconds = measure(lambda: params.next_level("InternetGatewayDevice.LANDevice.1.Hosts.Host."))
+        report(f"next_level[{size}]", seconds)
+
+
+if __name__ == "__main__":
+    main()
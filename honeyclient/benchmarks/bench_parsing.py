@@ -0,0 +1,56 @@
+"""
+Parsing of large GetParameterValuesResponse and SetParameterValues bodies.
+BeautifulSoup's html.parser, which was used before tr069.data.pullparser, is included for comparison.
+"""
+from tr069.data import parameters
+from tr069.data import rpcs
+
+from .common import SIZES, synthetic_parameters, measure, measure_memory, report
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # pragma: no cover
+    BeautifulSoup = None
+
+
+def from_xml_bs4(xml: str) -> parameters.Parameters:
+    tree = BeautifulSoup(xml, "html.parser")
+    nodes = tree.find_all("ParameterValueStruct".lower())
+    return parameters.Parameters(
+        parameters.Parameter(
+            node.find("name").get_text(strip=True),
+            node.find("value").get_text(strip=True),
+            node.find("value").get("xsi:type") or "xsd:string"
+        )
+        for node in nodes
+    )
+
+
+def bodies(size: int):
+    params = list(synthetic_parameters(size).values())
+    yield "GetParameterValuesResponse", rpcs.make_get_parameter_values_response(params)
+    yield "SetParameterValues", rpcs.make_get_parameter_values_response(params).replace(
+        "GetParameterValuesResponse", "SetParameterValues"
+    )
+
+
+def main():
+    for size in SIZES:
+        for rpc, xml in bodies(size):
+            implementations = [("pullparser", parameters.from_xml)]
+            if BeautifulSoup:
+                implementations.append(("bs4", from_xml_bs4))
+            for impl, fn in implementations:
+                seconds = measure(lambda: fn(xml))
+                result, peak = measure_memory(lambda: fn(xml))
+                assert len(result) == size
+                report(
+                    f"{rpc}[{size}] {impl}",
+                    seconds,
+                    body_kb=len(xml) // 1024,
+                    peak_kb=peak // 1024,
+                )
+
+
+if __name__ == "__main__":
+    main()
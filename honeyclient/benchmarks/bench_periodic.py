@@ -0,0 +1,64 @@
+"""
+Periodic inform scheduling for 100,000 devices on a virtual clock,
+and a fleet sending periodic informs to the mock ACS.
+"""
+import random
+import time
+
+from tr069 import fleet
+from tr069 import testing
+from tr069.data import device
+
+from .common import report
+
+DEVICES = 100_000
+INTERVAL = 300
+PERIODS = 3
+
+
+def schedule_devices():
+    devices = fleet.make_devices(device.DEFAULT, DEVICES)
+    for d in devices:
+        d.params["InternetGatewayDevice.ManagementServer.PeriodicInformInterval"] = str(INTERVAL)
+    return devices
+
+
+def main():
+    devices = schedule_devices()
+
+    start = time.perf_counter()
+    schedule = fleet.PeriodicInformSchedule(devices, 0, rng=random.Random(0))
+    report(f"build schedule ({DEVICES} devices)", time.perf_counter() - start)
+
+    # Advance a virtual clock second by second and reschedule every due device immediately.
+    informs = 0
+    busiest = 0
+    start = time.perf_counter()
+    for now in range(PERIODS * INTERVAL):
+        due = schedule.pop_due(now)
+        for index, nominal in due:
+            schedule.schedule(index, now, nominal)
+        informs += len(due)
+        busiest = max(busiest, len(due))
+    seconds = time.perf_counter() - start
+    report(
+        "pop and reschedule one inform",
+        seconds / informs,
+        informs=informs,
+        mean_per_second=DEVICES // INTERVAL,
+        busiest_second=busiest,
+    )
+
+    with testing.MockACS([], keep_sessions=False) as acs:
+        f = fleet.Fleet(acs.url, 200, concurrency=50)
+        stats = f.run_periodic_blocking(3, default_interval=0.5)
+        assert not stats.errors, stats.errors
+        report(
+            "fleet periodic sessions (200 devices, 0.5s interval)",
+            stats.duration / stats.sessions,
+            sessions=stats.sessions,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Serialization of Informs and GetParameterValuesResponses.
+The previous implementation, which dedented every element and envelope, is included for comparison.
+Repeated Informs of the same device are also built with a cached InformBuilder.
+"""
+import datetime
+import textwrap
+
+from tr069.data import device
+from tr069.data import event
+from tr069.data import parameters
+from tr069.data import rpcs
+from tr069.data import soap
+
+from .common import synthetic_parameters, measure, report
+
+SIZES = (10, 1_000, 100_000)
+TIME = datetime.datetime(2020, 1, 1)
+
+
+def to_xml_dedent(param: parameters.Parameter) -> str:
+    return textwrap.dedent(f"""
+            <ParameterValueStruct>
+                <Name>{param.name}</Name>
+                <Value xsi:type="{param.type}">{param.value}</Value>
+            </ParameterValueStruct>
+        """).strip()
+
+
+def soapify_dedent(xml: str) -> str:
+    return textwrap.dedent(f"""
+        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
+                       xmlns:soap-enc="http://schemas.xmlsoap.org/soap/encoding/"
+                       xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+                       xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:cwmp="urn:dslforum-org:{soap.CWMP_VERSION}">
+            <soap:Header>
+                {soap.HEADER}
+            </soap:Header>
+            <soap:Body>
+                {xml}
+            </soap:Body>
+        </soap:Envelope>
+    """).strip()
+
+
+def make_get_parameter_values_response_dedent(params) -> str:
+    return soapify_dedent(f"""
+        <cwmp:GetParameterValuesResponse>
+            <ParameterList soap-enc:arrayType="cwmp:ParameterValueStruct[{len(params)}]">
+                {"".join(to_xml_dedent(parameter) for parameter in params)}
+            </ParameterList>
+        </cwmp:GetParameterValuesResponse>
+    """)
+
+
+def main():
+    for size in SIZES:
+        params = list(synthetic_parameters(size).values())
+        expected = make_get_parameter_values_response_dedent(params)
+        assert rpcs.make_get_parameter_values_response(params) == expected
+        for impl, fn in [
+            ("template", rpcs.make_get_parameter_values_response),
+            ("dedent", make_get_parameter_values_response_dedent),
+        ]:
+            seconds = measure(lambda: fn(params))
+            report(f"GetParameterValuesResponse[{size}] {impl}", seconds, body_kb=len(expected) // 1024)
+        seconds = measure(lambda: rpcs.make_inform(device=device.DEFAULT, params=params, time=TIME))
+        report(f"Inform[{size}] template", seconds)
+        builder = rpcs.InformBuilder(device.DEFAULT)
+        expected = rpcs.make_inform(device=device.DEFAULT, params=params, time=TIME)
+        assert builder.build(params=params, time=TIME) == expected
+        seconds = measure(lambda: builder.build(params=params, time=TIME))
+        report(f"Inform[{size}] builder", seconds)
+
+    builder = rpcs.InformBuilder(device.DEFAULT)
+    events = [event.Periodic]
+    seconds = measure(lambda: rpcs.make_inform(device=device.DEFAULT, events=events))
+    report("periodic Inform template", seconds)
+    seconds = measure(lambda: builder.build(events=events))
+    report("periodic Inform builder", seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Bulk replay of a recorded provisioning session against the mock ACS, as fast as possible.
+"""
+import tr069
+from tr069 import testing
+from tr069 import transcript
+
+from .common import report
+
+DEVICES = 200
+SESSIONS = 5
+SCRIPT = [
+    testing.get_parameter_values(["InternetGatewayDevice.DeviceInfo."]),
+    testing.set_parameter_values({"InternetGatewayDevice.ManagementServer.PeriodicInformInterval": "60"}),
+]
+
+
+def record(url: str) -> transcript.Session:
+    recorder = transcript.Recorder()
+    client = tr069.Client(url, log=False, history=recorder)
+    client.inform()
+    client.done()
+    client.handle_server_rpcs()
+    return recorder.sessions[0]
+
+
+def main():
+    with testing.MockACS(SCRIPT, keep_sessions=False) as acs:
+        sessions = [record(acs.url)] * SESSIONS
+        stats = transcript.replay(acs.url, sessions, DEVICES, speed=0, concurrency=50)
+        assert not stats.errors, stats.errors
+        report(
+            "replayed sessions",
+            stats.duration / stats.sessions,
+            sessions_per_second=int(stats.sessions_per_second),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Sessions of many clients against the mock ACS over HTTPS, each with its own connections and TLS context,
+and sharing a transport that pools connections and resumes TLS sessions.
+"""
+import os
+import ssl
+import time
+
+import tr069
+from tr069 import fleet
+from tr069 import testing
+from tr069 import transport
+
+from .common import report
+
+CERT = os.path.join(os.path.dirname(__file__), os.pardir, "test", "data", "acs.pem")
+CLIENTS = 100
+DEVICES = 200
+SESSIONS = 5
+SCRIPT = [testing.get_parameter_values(["InternetGatewayDevice.DeviceInfo."])]
+
+
+def client_sessions(url: str, **kwargs) -> float:
+    start = time.perf_counter()
+    for _ in range(CLIENTS):
+        client = tr069.Client(url, log=False, **kwargs)
+        client.inform()
+        client.done()
+        client.handle_server_rpcs()
+        client.close()
+    return (time.perf_counter() - start) / CLIENTS
+
+
+def main():
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(CERT)
+    with testing.MockACS(SCRIPT, keep_sessions=False, ssl_context=ctx) as acs:
+        report("client sessions (own connections)", client_sessions(acs.url, verify=CERT))
+        t = transport.Transport(verify=CERT)
+        report("client sessions (shared transport)", client_sessions(acs.url, transport=t), **t.stats)
+
+        for name, kwargs in [
+            ("own connections", {"verify": CERT}),
+            ("shared transport", {"transport": transport.Transport(verify=CERT)}),
+        ]:
+            f = fleet.Fleet(acs.url, DEVICES, concurrency=50, **kwargs)
+            stats = f.run(SESSIONS)
+            assert not stats.errors, stats.errors
+            report(
+                f"fleet sessions over HTTPS ({name})",
+                stats.duration / stats.sessions,
+                sessions_per_second=int(stats.sessions_per_second),
+            )
+
+
+if __name__ == "__main__":
+    main()
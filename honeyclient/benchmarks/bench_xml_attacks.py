@@ -0,0 +1,47 @@
+"""
+Generating oversized attack payloads: peak memory and throughput of building a payload in memory
+compared to draining the equivalent stream chunk by chunk.
+Streams of repeated pieces yield the same chunk object over and over, so draining them copies nothing
+and their throughput is only bounded by the consumer, e.g. the socket they are sent over.
+"""
+import time
+
+from tr069 import xml_attacks
+
+from .common import measure_memory, report
+
+REPETITIONS = 10_000_000
+ENTITY_SIZE = 100_000
+
+
+def consume(stream) -> int:
+    return sum(len(chunk) for chunk in stream)
+
+
+def main():
+    payload, peak = measure_memory(lambda: xml_attacks.quadratic_blowup(REPETITIONS, ENTITY_SIZE))
+    start = time.perf_counter()
+    xml_attacks.quadratic_blowup(REPETITIONS, ENTITY_SIZE)
+    report(
+        "quadratic_blowup (in memory)",
+        time.perf_counter() - start,
+        payload_mb=len(payload) // 2 ** 20,
+        peak_kb=peak // 1024,
+    )
+
+    for name, stream in [
+        ("quadratic_blowup_stream", lambda: xml_attacks.quadratic_blowup_stream(REPETITIONS, ENTITY_SIZE)),
+        ("nested_elements", lambda: xml_attacks.nested_elements(10_000_000)),
+        ("many_attributes", lambda: xml_attacks.many_attributes(1_000_000)),
+        ("billion_laughs", lambda: xml_attacks.billion_laughs()),
+    ]:
+        size, peak = measure_memory(lambda: consume(stream()))
+        start = time.perf_counter()
+        for _ in stream():
+            pass
+        seconds = time.perf_counter() - start
+        report(name, seconds, payload_mb=size // 2 ** 20, peak_kb=peak // 1024, mb_per_second=int(size / seconds / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
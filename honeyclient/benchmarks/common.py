@@ -0,0 +1,73 @@
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Tuple, List, Dict, Any
+
+from tr069.data import parameters
+
+SIZES = (10, 1_000, 10_000)
+
+# All results reported in this process, see benchmarks.__main__.
+RESULTS: List[Dict[str, Any]] = []
+
+
+def synthetic_parameters(count: int) -> parameters.Parameters:
+    """
+    A TR-098 like data model with count parameters.
+    """
+    params = parameters.Parameters()
+    for i in range(count):
+        name = f"InternetGatewayDevice.LANDevice.{i // 1000 + 1}.Hosts.Host.{i % 1000 + 1}.IPAddress"
+        params[name] = parameters.Parameter(name, f"192.168.{i // 256 % 256}.{i % 256}")
+    return params
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.2) -> float:
+    """
+    Returns:
+        The average runtime of fn in seconds.
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    total = 0.0
+    runs = 0
+    while total < min_time:
+        total += timer.timeit(number)
+        runs += number
+    return total / runs
+
+
+def measure_memory(fn: Callable[[], object]) -> Tuple[object, int]:
+    """
+    Returns:
+        The result of fn and the peak memory allocated while running it in bytes.
+    """
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def measure_retained(fn: Callable[[], object]) -> Tuple[object, int, float]:
+    """
+    Returns:
+        The result of fn, the memory still allocated when fn returns in bytes, and the runtime of fn in seconds.
+    """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, seconds
+
+
+def report(name: str, seconds: float, **info) -> None:
+    RESULTS.append({"name": name, "seconds": seconds, **info})
+    details = ", ".join(f"{k}={v}" for k, v in info.items())
+    print(f"{name:<50} {seconds * 1000:>10.3f} ms  {details}")
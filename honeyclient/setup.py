@@ -16,10 +16,11 @@ setup(
     author_email="tr069@maximilianhils.com",
     packages=find_packages(include=["tr069", "tr069.*"]),
     include_package_data=True,
+    python_requires=">=3.8",
     install_requires=[
         "click~=6.7",
-        "requests~=2.13.0",
-        "beautifulsoup4~=4.5.3",
+        "requests~=2.32",
+        "urllib3~=2.0",
     ],
     extras_require={
         'dev': [
@@ -33,9 +34,17 @@ setup(
     entry_points={
         'console_scripts': [
             "tr069-client = tr069.__main__:cli",
+            "tr069-fleet = tr069.fleet:cli",
+            "tr069-replay = tr069.transcript:cli",
+            "tr069-fuzz = tr069.fuzz:cli",
         ]
     },
     classifiers=[
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
     ],
 )
@@ -1,3 +1,6 @@
+import http.server
+import threading
+
 import mock
 import pytest
 import requests
@@ -12,7 +15,8 @@ def client():
         log=False
     )
     c._session = mock.MagicMock()
-    c._session.post.return_value.text = "response"
+    c._session.post.return_value.content = b"response"
+    c._session.post.return_value.headers = {}
     return c
 
 
@@ -30,3 +34,45 @@ def response():
     resp.headers.update(bar="baz")
     resp._content = b"quux"
     return resp
+
+
+class _ACSHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append((self.headers, body))
+        if callable(self.server.responses):
+            status, headers, content = self.server.responses(self.headers, body)
+        elif self.server.responses:
+            status, headers, content = self.server.responses.pop(0)
+        else:
+            status, headers, content = 204, {}, b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 204:
+            self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def acs():
+    """
+    A local HTTP server that records all requests and replies with
+    the (status, headers, body) tuples in acs.responses, or 204 No Content.
+    acs.responses may also be a function that returns the tuple for a given (headers, body).
+    """
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ACSHandler)
+    server.requests = []
+    server.responses = []
+    server.url = "http://127.0.0.1:{}/".format(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
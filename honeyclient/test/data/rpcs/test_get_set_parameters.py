@@ -31,6 +31,25 @@ def test_make_get_parameter_values_response():
     ])
 
 
+def test_parse_set_parameter_attributes():
+    assert rpcs.parse_set_parameter_attributes("""
+        <cwmp:SetParameterAttributes>
+            <ParameterList soap-enc:arrayType="cwmp:SetParameterAttributesStruct[2]">
+                <SetParameterAttributesStruct>
+                    <Name>foo</Name>
+                    <NotificationChange>true</NotificationChange>
+                    <Notification>2</Notification>
+                </SetParameterAttributesStruct>
+                <SetParameterAttributesStruct>
+                    <Name>bar.</Name>
+                    <NotificationChange>0</NotificationChange>
+                    <Notification>1</Notification>
+                </SetParameterAttributesStruct>
+            </ParameterList>
+        </cwmp:SetParameterAttributes>
+    """) == [("foo", 2), ("bar.", None)]
+
+
 def test_make_set_parameter_attributes_response():
     assert rpcs.make_set_parameter_attributes_response()
 
@@ -1,4 +1,8 @@
+import datetime
+
 from tr069.data import device
+from tr069.data import event
+from tr069.data import parameters
 from tr069.data import rpcs
 
 
@@ -10,3 +14,47 @@ def test_warn_missing_param(capsys):
     d = device.Device("a", "b", "c", "d")
     assert rpcs.make_inform(device=d)
     assert "Missing required inform parameter" in capsys.readouterr()[1]
+
+
+def test_value_changes():
+    url = "InternetGatewayDevice.ManagementServer.ConnectionRequestURL"
+    changes = [parameters.Parameter(url, "http://new"), parameters.Parameter("foo", "bar")]
+    inform = rpcs.make_inform(device=device.DEFAULT, events=[event.Periodic], value_changes=changes)
+    assert "4 VALUE CHANGE" in inform
+    assert "<Name>foo</Name>" in inform
+    assert inform.count(f"<Name>{url}</Name>") == 1
+    inform = rpcs.make_inform(device=device.DEFAULT, events=[event.Periodic])
+    assert "4 VALUE CHANGE" not in inform
+    inform = rpcs.make_inform(device=device.DEFAULT, value_changes=changes)
+    assert inform.count("4 VALUE CHANGE") == 1
+
+
+def test_inform_builder():
+    d = device.Device("a", "b", "c", "d", parameters.Parameters(**{
+        "InternetGatewayDevice.DeviceSummary": "summary",
+        "InternetGatewayDevice.ManagementServer.ParameterKey": "",
+    }))
+    builder = rpcs.InformBuilder(d)
+    time = datetime.datetime(2020, 1, 1)
+    changed = [parameters.Parameter("foo", "bar", "xsd:int")]
+    for kwargs in [
+        {},
+        {"events": [event.Periodic], "retry_count": 3},
+        {"events": [event.Event("M Reboot", "key")]},
+        {"events": []},
+        {"value_changes": changed},
+        {"params": changed},
+    ]:
+        assert builder.build(time=time, **kwargs) == rpcs.make_inform(device=d, time=time, **kwargs)
+    assert repr(builder) == "InformBuilder(d, 5 cached envelopes)"
+
+    d.params["InternetGatewayDevice.ManagementServer.ParameterKey"] = "new"
+    d.serial = "e"
+    assert builder.build(time=time) == rpcs.make_inform(device=d, time=time)
+    assert "<Value xsi:type=\"xsd:string\">new</Value>" in builder.build()
+    assert "<SerialNumber>e</SerialNumber>" in builder.build()
+
+    # Line breaks change the indentation of the envelope.
+    d.params["InternetGatewayDevice.DeviceSummary"] = "multi\nline"
+    assert builder.build(time=time) == rpcs.make_inform(device=d, time=time)
+    assert repr(builder) == "InformBuilder(e, 6 cached envelopes)"
@@ -0,0 +1,115 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from tr069.data import datamodel
+
+DEFINITION = Path(__file__).parent / "datamodel.xml"
+
+
+@pytest.fixture()
+def definition(tmp_path):
+    path = tmp_path / "tr-098-test-full.xml"
+    shutil.copy(DEFINITION, path)
+    return str(path)
+
+
+def test_parse():
+    name, params = datamodel.parse(str(DEFINITION), instances=2)
+    assert name == "InternetGatewayDevice:1.4"
+    assert [p.name for p in params] == sorted(p.name for p in params)
+    params = {p.name: p for p in params}
+    assert len(params) == 17
+
+    # Components, named data types and defaults
+    interval = params["InternetGatewayDevice.ManagementServer.PeriodicInformInterval"]
+    assert (interval.value, interval.type, interval.writable) == ("3600", "xsd:unsignedInt", True)
+    assert params["InternetGatewayDevice.LANDevice.2.Hosts.Host.2.IPAddress"].type == "xsd:string"
+    assert params["InternetGatewayDevice.LANDevice.1.Hosts.Host.1.Active"].value == "false"
+    assert params["InternetGatewayDevice.DeviceInfo.FirstUseDate"].value == "0001-01-01T00:00:00Z"
+    # Objects that modify a previous definition
+    assert params["InternetGatewayDevice.DeviceInfo.UpTime"].value == "42"
+    # Multi-instance objects
+    assert params["InternetGatewayDevice.LANDeviceNumberOfEntries"].value == "2"
+    assert not params["InternetGatewayDevice.DeviceInfo.Manufacturer"].writable
+
+    name, params = datamodel.parse(str(DEFINITION), model="STBService:1.0")
+    assert name == "STBService:1.0"
+    assert [p.name for p in params] == ["STBService.1.Enable"]
+    with pytest.raises(ValueError, match="No model"):
+        datamodel.parse(str(DEFINITION), model="Device:2.11")
+
+
+def test_data_model():
+    name, params = datamodel.parse(str(DEFINITION), instances=2)
+    dm = datamodel.DataModel(datamodel.build_index(name, params, instances=2))
+    assert repr(dm) == "DataModel(InternetGatewayDevice:1.4, 17 parameters)"
+    assert dm.instances == 2
+    assert len(dm) == len(params)
+    for a, b in zip(dm, params):
+        assert (a.name, a.value, a.type, a.writable) == (b.name, b.value, b.type, b.writable)
+    assert dm[-1].name == params[-1].name
+    with pytest.raises(IndexError):
+        dm[len(params)]
+
+    assert dm.get("InternetGatewayDevice.DeviceInfo.UpTime").value == "42"
+    assert dm.get("InternetGatewayDevice.DeviceInfo.Up") is None
+    assert [p.name for p in dm.all("InternetGatewayDevice.LANDevice.2.Hosts.")] == [
+        "InternetGatewayDevice.LANDevice.2.Hosts.Host.1.Active",
+        "InternetGatewayDevice.LANDevice.2.Hosts.Host.1.IPAddress",
+        "InternetGatewayDevice.LANDevice.2.Hosts.Host.2.Active",
+        "InternetGatewayDevice.LANDevice.2.Hosts.Host.2.IPAddress",
+    ]
+    assert [p.name for p in dm.all("InternetGatewayDevice.ManagementServer.URL")] == [
+        "InternetGatewayDevice.ManagementServer.URL"
+    ]
+    assert dm.all("InternetGatewayDevice.Layer3Forwarding.") == []
+    assert len(dm.all()) == 17
+
+    with pytest.raises(ValueError):
+        datamodel.DataModel(b"\x00" * 64)
+
+
+def test_to_device(definition):
+    dm = datamodel.load(definition)
+    dev = dm.to_device("Vendor", "001122", "Gateway", "S1")
+    assert dev.serial == "S1"
+    assert len(dev.params) == len(dm)
+    assert dev.params["InternetGatewayDevice.DeviceInfo.SerialNumber"].value == "S1"
+    assert dev.params["InternetGatewayDevice.DeviceInfo.Manufacturer"].value == "Vendor"
+
+
+def test_load(definition, monkeypatch):
+    dm = datamodel.load(definition)
+    assert os.path.exists(definition + ".idx")
+    assert len(dm) == 10
+    dm.close()
+
+    # The index is reused as long as the definition does not change...
+    parse = datamodel.parse
+    monkeypatch.setattr(datamodel, "parse", None)
+    dm = datamodel.load(definition)
+    assert len(dm) == 10
+    assert dm.get("InternetGatewayDevice.ManagementServer.PeriodicInformInterval").value == "3600"
+    dm.close()
+    dm = datamodel.load(definition + ".idx")
+    assert len(dm) == 10
+    dm.close()
+
+    # ... and the number of instances is the same.
+    monkeypatch.setattr(datamodel, "parse", parse)
+    dm = datamodel.load(definition, 3)
+    assert len(dm) == 28
+    dm.close()
+    with open(definition, "a") as f:
+        f.write("\n")
+    dm = datamodel.load(definition, 3)
+    assert dm.source_size == os.path.getsize(definition)
+    dm.close()
+
+
+def test_load_readonly_index(definition, tmp_path):
+    dm = datamodel.load(definition, index=str(tmp_path / "missing" / "index.idx"))
+    assert len(dm) == 10
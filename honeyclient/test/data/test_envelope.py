@@ -0,0 +1,81 @@
+import mock
+
+import pytest
+import requests
+
+from tr069.data import envelope
+
+GET_PARAMETER_VALUES = """
+<soap:Envelope>
+    <soap:Header>
+        <cwmp:ID soap:mustUnderstand="1">42</cwmp:ID>
+        <cwmp:HoldRequests> 0 </cwmp:HoldRequests>
+        <cwmp:NoMoreRequests/>
+    </soap:Header>
+    <soap:Body>
+        <cwmp:GetParameterValues>
+            <ParameterNames soap:arrayType="xsd:string[2]">
+                <string>Foo.</string>
+                <string>Bar</string>
+            </ParameterNames>
+        </cwmp:GetParameterValues>
+    </soap:Body>
+</soap:Envelope>
+"""
+
+
+def test_envelope():
+    e = envelope.Envelope(GET_PARAMETER_VALUES)
+    assert e.rpc_name == "cwmp:GetParameterValues"
+    assert e.cwmp_id == "42"
+    assert e.header == {"cwmp:ID": "42", "cwmp:HoldRequests": "0", "cwmp:NoMoreRequests": ""}
+    assert e.arguments == ["Foo.", "Bar"]
+    assert e.arguments is e.arguments
+    assert repr(e) == "Envelope(cwmp:GetParameterValues)"
+
+
+def test_envelope_empty():
+    e = envelope.Envelope("")
+    assert e.rpc_name is None
+    assert e.cwmp_id is None
+    assert e.header == {}
+    assert e.arguments is None
+
+
+def test_envelope_response():
+    resp = mock.PropertyMock(return_value=GET_PARAMETER_VALUES.encode())
+    response = mock.MagicMock(headers={})
+    type(response).content = resp
+    e = envelope.Envelope(response=response)
+    assert not resp.called
+    assert e.rpc_name == "cwmp:GetParameterValues"
+    assert e.arguments == ["Foo.", "Bar"]
+    assert resp.call_count == 1
+
+    with pytest.raises(ValueError):
+        envelope.Envelope()
+
+
+def make_response(content: bytes, content_type: str = None) -> requests.Response:
+    response = requests.Response()
+    response._content = content
+    if content_type:
+        response.headers["Content-Type"] = content_type
+    return response
+
+
+@pytest.mark.parametrize("content_type", [None, "text/xml", "application/soap+xml"])
+def test_decode(content_type):
+    response = make_response("<Value>Grüße</Value>".encode(), content_type)
+    with mock.patch.object(requests.Response, "apparent_encoding", new_callable=mock.PropertyMock) as detect:
+        assert envelope.decode(response) == "<Value>Grüße</Value>"
+    assert not detect.called
+    assert response.encoding is None
+
+
+def test_decode_fallback():
+    response = make_response("<Value>Grüße</Value>".encode("latin-1"), 'text/xml; charset="iso-8859-1"')
+    assert envelope.decode(response) == "<Value>Grüße</Value>"
+    response = make_response(b"<Value>\xff</Value>", "text/xml; charset=unknown")
+    assert envelope.decode(response).startswith("<Value>")
+    assert response.encoding is None
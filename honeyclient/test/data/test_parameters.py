@@ -1,4 +1,5 @@
 import textwrap
+from pathlib import Path
 
 import pytest
 
@@ -55,6 +56,147 @@ class TestParameters:
         assert len(p.all()) == 3
         assert len(p.all("foo.")) == 2
         assert len(p.all("foo.foo")) == 1
+        assert p.all("qux.") == []
+        assert p.all("qux") == []
+
+    def test_all_updates(self):
+        p = parameters.Parameters(**{"a.b.c": "1", "a.d": "2"})
+        assert [x.name for x in p.all("a.")] == ["a.b.c", "a.d"]
+        p["a.b.e"] = "3"
+        del p["a.d"]
+        assert [x.name for x in p.all("a.")] == ["a.b.c", "a.b.e"]
+        del p["a.b.c"]
+        del p["a.b.e"]
+        assert p.all("a.") == []
+        assert p.all("a.b.") == []
+        p["a.d"] = "4"
+        assert [x.value for x in p.all("a.")] == ["4"]
+
+    def test_all_insertion_order(self):
+        p = parameters.Parameters(**{"a.z": "1", "b": "2", "a.b": "3", "a.m.x": "4"})
+        assert [x.name for x in p.all("a.")] == ["a.z", "a.b", "a.m.x"]
+        p["a.a"] = "5"
+        p["a.z"] = "6"
+        assert [x.name for x in p.all("a.")] == ["a.z", "a.b", "a.m.x", "a.a"]
+        assert [x.name for x in p.all("a.")] == [x.name for x in p.all() if x.name.startswith("a.")]
+
+    def test_next_level(self):
+        p = parameters.Parameters(**{
+            "foo.bar.baz": "1",
+            "foo.qux": "2",
+            "bar": "3",
+        })
+        assert [(x.name, x.writable) for x in p.next_level()] == [("bar", True), ("foo.", False)]
+        assert [x.name for x in p.next_level("foo.")] == ["foo.bar.", "foo.qux"]
+        assert [x.name for x in p.next_level("foo.bar.")] == ["foo.bar.baz"]
+        assert [x.name for x in p.next_level("bar")] == ["bar"]
+        assert p.next_level("qux.") == []
+
+    def test_changes(self):
+        p = parameters.Parameters(**{"a.b": "1", "a.c": "2", "d": "3"})
+        p["a.b"] = "0"
+        assert p.changes() == []
+        assert p.set_notification("a.", 1) == 2
+        assert p.set_notification("d", 2) == 1
+        assert p.set_notification("x.", 2) == 0
+        p["a.c"] = "2"
+        p["a.b"] = parameters.Parameter("a.b", "1", "xsd:int", notification_level=1)
+        p["d"] = "4"
+        p.set_value("a.c", "5", notify=False)
+        assert [(x.name, x.value, x.type) for x in p.changes()] == [("a.b", "1", "xsd:int"), ("d", "4", "xsd:string")]
+        assert [x.name for x in p.changes(2)] == ["d"]
+        assert p["a.c"].notification_level == 1
+
+        changes = p.changes()
+        p["d"] = "5"
+        p.clear_changes(changes)
+        assert [(x.name, x.value) for x in p.changes()] == [("d", "5")]
+        p.set_notification("d", 0)
+        assert p.changes() == []
+
+        p["a.b"] = "2"
+        del p["a.b"]
+        p["a.c"] = "6"
+        p.clear_changes()
+        assert p.changes() == []
+
+    def test_set_notification_copies(self):
+        shared = parameters.Parameter("a", "1")
+        p = parameters.Parameters([shared])
+        p.set_notification("a", 2)
+        assert shared.notification_level == 0
+        assert p["a"].notification_level == 2
+
+
+class TestLayeredParameters:
+    def make(self):
+        base = parameters.Parameters(**{
+            "a.b.c": "1",
+            "a.b.d": "2",
+            "a.e": "3",
+            "f": "4",
+        })
+        return base, parameters.LayeredParameters(base)
+
+    def check(self, layer):
+        """A layer behaves like a copy of its contents."""
+        copy = parameters.Parameters(layer.values())
+        assert dict(copy) == dict(layer)
+        assert len(layer) == len(copy) == len(list(layer))
+        for key in ["", "a.", "a.b.", "a.b.c", "x.", "g."]:
+            assert [p.name for p in layer.all(key)] == [p.name for p in copy.all(key)]
+            assert [(p.name, p.value) for p in layer.next_level(key)] == [
+                (p.name, p.value) for p in copy.next_level(key)
+            ]
+
+    def test_copy_on_write(self):
+        base, layer = self.make()
+        assert repr(layer) == "LayeredParameters(4 values, 0 in overlay)"
+        self.check(layer)
+        layer["a.b.c"] = "x"
+        layer["g.h"] = "5"
+        layer["a.b.a"] = "6"
+        assert repr(layer) == "LayeredParameters(6 values, 3 in overlay)"
+        assert layer["a.b.c"].value == "x"
+        assert base["a.b.c"].value == "1"
+        assert "g.h" in layer and "g.h" not in base
+        assert [p.value for p in layer.all("a.b.")] == ["x", "2", "6"]
+        self.check(layer)
+
+    def test_delete(self):
+        base, layer = self.make()
+        layer["a.b.c"] = "x"
+        del layer["a.b.c"]
+        del layer["a.b.d"]
+        assert "a.b.c" not in layer
+        assert len(base) == 4
+        assert [p.name for p in layer.next_level("a.")] == ["a.e"]
+        self.check(layer)
+        with pytest.raises(KeyError):
+            del layer["a.b.c"]
+        layer["a.b.c"] = "y"
+        layer["g"] = "5"
+        del layer["g"]
+        assert layer["a.b.c"].value == "y"
+        assert [p.name for p in layer.next_level("a.")] == ["a.b.", "a.e"]
+        self.check(layer)
+
+    def test_notifications(self):
+        base, layer = self.make()
+        layer.set_notification("a.", 2)
+        assert base["a.e"].notification_level == 0
+        layer["a.e"] = "4"
+        layer["f"] = "5"
+        assert [p.name for p in layer.changes()] == ["a.e"]
+        assert [p.notification_level for p in layer.all("a.")] == [2, 2, 2]
+        assert layer.all("", 2) == layer.all("a.")
+
+    def test_shared_base(self):
+        base, layer = self.make()
+        other = parameters.LayeredParameters(base, f="x")
+        layer["f"] = "y"
+        assert (base["f"].value, layer["f"].value, other["f"].value) == ("4", "y", "x")
+        assert layer["a.e"] is other["a.e"] is base["a.e"]
 
 
 def test_from_xml():
@@ -97,3 +239,37 @@ class TestParameter:
             <Writable>1</Writable>
         </ParameterInfoStruct>
         ''').strip()
+
+    def test_compact(self):
+        a = parameters.Parameter("".join(["foo.", "bar"]), "1", "".join(["xsd:", "int"]))
+        b = parameters.Parameter("".join(["foo.", "bar"]), "2", "".join(["xsd:", "int"]))
+        assert a.name is b.name
+        assert a.type is b.type
+        assert not hasattr(a, "__dict__")
+        with pytest.raises(AttributeError):
+            a.foo = "bar"
+
+
+def test_from_xml_malformed():
+    # The capture contains malformed end tags such as </ Value="Value">
+    with open(Path(__file__).parent / "capture.txt") as f:
+        params = parameters.from_xml(f.read())
+    assert params["InternetGatewayDevice.DeviceInfo.SoftwareVersion"].value == "29.05.01-release-build_1818-2904"
+    assert params["InternetGatewayDevice.ManagementServer.ConnectionRequestURL"].value == (
+        "http://194.175.125.104:8089/4b123c06"
+    )
+    assert len(params) == 7
+
+
+def test_iter_from_xml():
+    xml = """
+        <ParameterValueStruct><Name>a</Name><Value xsi:type="xsd:int">1</Value></ParameterValueStruct>
+        <ParameterValueStruct><Value>no name</Value></ParameterValueStruct>
+        <ParameterValueStruct><Name>b</Name></ParameterValueStruct>
+    """
+    params = parameters.iter_from_xml(xml)
+    param = next(params)
+    assert (param.name, param.value, param.type) == ("a", "1", "xsd:int")
+    param = next(params)
+    assert (param.name, param.value, param.type) == ("b", "", "xsd:string")
+    assert not list(params)
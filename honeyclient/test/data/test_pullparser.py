@@ -0,0 +1,96 @@
+from pathlib import Path
+
+from tr069.data import parameters
+from tr069.data import pullparser
+
+capture = (Path(__file__).parent / "capture.txt").read_text()
+
+
+def events(xml):
+    return list(pullparser.iterparse(xml))
+
+
+def test_iterparse():
+    assert events('<a x="1"><B>t&amp;t</B><c/></a>') == [
+        ("start", "a", ' x="1"'),
+        ("start", "b", ""),
+        ("data", None, "t&t"),
+        ("end", "b", None),
+        ("start", "c", "/"),
+        ("end", "c", None),
+        ("end", "a", None),
+    ]
+    assert events("<?xml version='1.0'?><!DOCTYPE x><!-- <a> --><![CDATA[<a>]]>") == [
+        ("data", None, "<a>"),
+    ]
+
+
+def test_iterparse_malformed():
+    # stray end tags are dropped, unclosed tags are closed implicitly.
+    assert events("<a></x><b></a>1 < 2") == [
+        ("start", "a", ""),
+        ("start", "b", ""),
+        ("end", "b", None),
+        ("end", "a", None),
+        ("data", None, "1 < 2"),
+    ]
+    assert events("<a></ a><b></ b=b>") == [
+        ("start", "a", ""),
+        ("end", "a", None),
+        ("start", "b", ""),
+        ("end", "b", None),
+    ]
+    assert events("<a><!-- unterminated > comment") == [
+        ("start", "a", ""),
+        ("data", None, "<!-- unterminated > comment"),
+        ("end", "a", None),
+    ]
+
+
+def test_pull_parser():
+    p = pullparser.PullParser()
+    p.feed("<a>fo")
+    assert list(p.read_events()) == [("start", "a", "")]
+    p.feed("o</a><!-- > ")
+    assert list(p.read_events()) == [("data", None, "foo"), ("end", "a", None)]
+    p.feed("--><b>")
+    p.close()
+    assert list(p.read_events()) == [("start", "b", ""), ("end", "b", None)]
+
+
+def test_parse_attrs():
+    assert pullparser.parse_attrs(' A="1" b=\'&lt;\' c=3 d /') == {"a": "1", "b": "<", "c": "3", "d": ""}
+
+
+def test_iter_structs_nested():
+    # The second struct is not terminated properly, which makes the third one nested.
+    xml = """
+        <S><Name>1</Name></S>
+        <S><Name>2</Name></ S=S>
+        <S><Name>3</Name><Extra>x</Extra></S>
+    """
+    structs = list(pullparser.iter_structs(xml, {"s": ("name",)}))
+    assert [s.text("name") for _, s in structs] == ["1", "2", "3"]
+    assert [s.texts("name") for _, s in structs] == [["1"], ["2", "3"], ["3"]]
+    assert structs[0][1].text("extra") is None
+    assert repr(structs[0][1])
+
+
+def test_parse_struct():
+    struct = pullparser.parse_struct("<a><b x='1'> foo <c>bar</c> </b></a>", ("b", "c"))
+    assert struct.text("b") == "foobar"
+    assert struct.text("c") == "bar"
+    assert struct.attr("b", "x") == "1"
+    assert struct.attr("c", "x") is None
+    assert struct.attr("d", "x", "default") == "default"
+
+
+def test_chunks():
+    expected = parameters.from_xml(capture)
+    assert len(expected) == 7
+    for size in (1, 3, 100):
+        chunks = [capture[i:i + size] for i in range(0, len(capture), size)]
+        params = parameters.from_xml(chunks)
+        assert [(p.name, p.value, p.type) for p in params.values()] == [
+            (p.name, p.value, p.type) for p in expected.values()
+        ]
@@ -31,3 +31,12 @@ def test_extract_rpc_name():
     assert soap.extract_rpc_name("<SOAP-ENV:Body><cwmp:Foo>") == "cwmp:Foo"
     assert soap.extract_rpc_name("<cwmp:Foo>") is None
     assert soap.extract_rpc_name("") is None
+
+
+def test_bytes():
+    assert soap.extract_rpc_name(b"<SOAP-ENV:Body>\n<cwmp:Foo />") == "cwmp:Foo"
+    assert soap.extract_rpc_name(b"") is None
+    assert soap.get_cwmp_id(b"<cwmp:ID>42</cwmp:ID>") == "42"
+    assert soap.get_cwmp_id(b"") is None
+    assert soap.set_cwmp_id(b"<cwmp:ID>1</cwmp:ID>\xc3\xa4", "\\1") == b"<cwmp:ID>\\1</cwmp:ID>\xc3\xa4"
+    assert soap.fix_cwmp_id(b"<cwmp:ID>1</cwmp:ID>", "<cwmp:ID>2</cwmp:ID>") == b"<cwmp:ID>2</cwmp:ID>"
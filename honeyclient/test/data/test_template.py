@@ -0,0 +1,54 @@
+import textwrap
+
+import pytest
+from hypothesis import example
+from hypothesis import given
+from hypothesis.strategies import text, sampled_from, lists
+
+from tr069.data import template
+
+lines = lists(sampled_from(["", " ", "\t", "\n", "    ", "<a>", "\r", "{}"])).map("".join)
+
+
+@given(lines)
+@example(" \n  x\n \n")
+@example("x\n   \n")
+def test_dedent(s):
+    assert template.dedent(s) == textwrap.dedent(s)
+
+
+T = template.Template("""
+    <Foo>
+        <Bar>{bar}</Bar>
+        {baz}
+    </Foo>
+""", indent=12)
+
+
+def format_dedent(bar, baz):
+    return textwrap.dedent(f"""
+            <Foo>
+                <Bar>{bar}</Bar>
+                {baz}
+            </Foo>
+        """).strip()
+
+
+@given(lines, lines)
+@example("x", "")
+@example("x\n", "  y")
+@example(" x\n      y", "z")
+def test_template(bar, baz):
+    assert T.format(bar=bar, baz=baz) == format_dedent(bar, baz)
+
+
+@given(text(), text())
+def test_template_text(bar, baz):
+    assert T.format(bar=bar, baz=baz) == format_dedent(bar, baz)
+
+
+def test_template_format():
+    assert T.format(bar=42, baz="<Baz />") == "<Foo>\n    <Bar>42</Bar>\n    <Baz />\n</Foo>"
+    assert repr(template.Template("<a>{a}</a>")) == "Template('<a>{a}</a>')"
+    with pytest.raises(ValueError):
+        template.Template("<a>{}</a>")
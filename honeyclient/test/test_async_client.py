@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from tr069 import AsyncClient
+from tr069.data import device
+from tr069.data import parameters
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_init():
+    c = AsyncClient("http://acs.example.com/", basic_auth=("foo", "bar"))
+    assert c.requests_kwargs["auth"]
+    assert repr(c) == "tr069.AsyncClient(http://acs.example.com/, 0 messages)"
+    with pytest.raises(ValueError):
+        AsyncClient("http://acs.example.com/", basic_auth=("foo", "bar"), digest_auth=("foo", "bar"))
+
+
+def test_session(acs):
+    acs.responses = [
+        (200, {"Set-Cookie": "session=42"}, b"<soap:Body><cwmp:InformResponse />"),
+    ]
+
+    async def session():
+        c = AsyncClient(acs.url, log=False)
+        await c.inform()
+        assert c.messages[-1].status_code == 200
+        await c.done()
+        assert c.messages[-1].status_code == 204
+        await c.get_rpc_methods()
+        await c.replay()
+        c.close()
+        return c
+
+    c = run(session())
+    assert len(c.messages) == 4
+    (inform_headers, inform), (done_headers, done), (get_rpc_methods_headers, _), replayed = acs.requests
+    assert b"cwmp:Inform" in inform
+    assert inform_headers["SOAPAction"] == "cwmp:Inform"
+    assert "User-Agent" not in inform_headers
+    assert done == b""
+    assert "Content-Type" not in done_headers
+    assert get_rpc_methods_headers["Cookie"] == "session=42"
+    assert replayed[1] == c.messages[2].request.body
+
+
+def test_handle_server_rpcs(acs):
+    acs.responses = [
+        (200, {}, b"""
+            <soapenv:Body>
+                <cwmp:SetParameterValues>
+                    <ParameterList soap:arrayType="cwmp:ParameterValueStruct[1]">
+                        <ParameterValueStruct>
+                            <Name>Foo</Name>
+                            <Value>Bar</Value>
+                        </ParameterValueStruct>
+                    </ParameterList>
+                </cwmp:SetParameterValues>
+            </soapenv:Body>
+        """),
+        (200, {}, b"""
+            <soapenv:Body>
+                <cwmp:GetParameterValues>
+                    <ParameterNames soap:arrayType="xsd:string[1]">
+                        <string>Foo</string>
+                    </ParameterNames>
+                </cwmp:GetParameterValues>
+            </soapenv:Body>
+        """),
+    ]
+
+    async def session():
+        c = AsyncClient(acs.url, log=False, device=device.Device("a", "b", "c", "d"))
+        await c.done()
+        assert await c.handle_server_rpcs() == 2
+        return c
+
+    c = run(session())
+    assert c.device.params["Foo"].value == "Bar"
+    assert b"cwmp:GetParameterValuesResponse" in acs.requests[-1][1]
+    assert b"<Value xsi:type=\"xsd:string\">Bar</Value>" in acs.requests[-1][1]
+
+
+def test_handle_server_rpcs_overridden(acs):
+    class Custom(AsyncClient):
+        async def set_parameter_values_response(self):
+            replies.append("SetParameterValues")
+            return await super().set_parameter_values_response()
+
+    replies = []
+    acs.responses = [(200, {}, b"<soapenv:Body><cwmp:SetParameterValues></cwmp:SetParameterValues></soapenv:Body>")]
+
+    async def session():
+        c = Custom(acs.url, log=False)
+        await c.done()
+        assert await c.handle_server_rpcs() == 1
+
+    run(session())
+    assert replies == ["SetParameterValues"]
+
+
+def test_digest_auth(acs):
+    acs.responses = [
+        (401, {"WWW-Authenticate": 'Digest realm="acs", nonce="abc", qop="auth"'}, b""),
+    ]
+
+    async def session():
+        c = AsyncClient(acs.url, log=False, digest_auth=("user", "pass"))
+        await c.get_rpc_methods()
+        return c
+
+    c = run(session())
+    assert len(c.messages) == 1
+    assert len(acs.requests) == 2
+    assert acs.requests[1][0]["Authorization"].startswith("Digest ")
+
+
+def test_handle_server_rpcs_unknown_rpc(acs):
+    acs.responses = [(200, {}, b"<soap:Body><cwmp:Unknown />")]
+
+    async def session():
+        c = AsyncClient(acs.url, log=False, device=device.Device("a", "b", "c", "d"))
+        await c.done()
+        await c.handle_server_rpcs()
+
+    with pytest.raises(NotImplementedError):
+        run(session())
+
+
+def test_log(acs, capsys):
+    async def session():
+        c = AsyncClient(acs.url, device=device.Device("a", "b", "c", "d"))
+        await c.get_parameter_values_response([parameters.Parameter("foo", "bar")])
+        c.close()
+
+    run(session())
+    out = capsys.readouterr()[0]
+    assert "GetParameterValuesResponse" in out
+    assert "Connection closed." in out
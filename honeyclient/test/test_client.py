@@ -1,8 +1,15 @@
+import io
+
 import mock
 import pytest
 import requests
 
 from tr069 import Client
+from tr069 import fleet
+from tr069 import testing
+from tr069 import util
+from tr069.data import device
+from tr069.data import event
 
 
 def test_init():
@@ -31,6 +38,17 @@ def test_basic(client: Client, capsys):
     assert isinstance(client._session, requests.Session)
 
 
+def test_flow_logger(client: Client, response, capsys):
+    out = io.StringIO()
+    client.log = util.FlowLogger("jsonl", out)
+    client._session.post.return_value = response
+    client.request("qux")
+    client.close()
+    client.log.close()
+    assert '"body": "quux"' in out.getvalue()
+    assert not capsys.readouterr()[0]
+
+
 def test_rpcs(client: Client):
     assert client.get_rpc_methods()
     assert client.inform()
@@ -42,10 +60,22 @@ def test_rpcs(client: Client):
     assert client.done()
 
 
+def test_envelope(client: Client):
+    client._session.post.return_value.content = b"<soap:Body><cwmp:Download>"
+    first = client.get_rpc_methods()
+    assert client.envelope() is client.envelope()
+    assert client.envelope().rpc_name == "cwmp:Download"
+    assert client.envelope(first) is client.envelope()
+    client._session.post.return_value = mock.MagicMock(content=b"", headers={})
+    client.done()
+    assert client.envelope(first) is not client.envelope(first)
+    assert client.envelope().rpc_name is None
+
+
 def test_handle_server_rpcs(client: Client):
     """Properly handle all known RPCs and terminate on 204"""
     get_parameter_names = mock.MagicMock()
-    get_parameter_names.text = """
+    get_parameter_names.content = b"""
         <soapenv:Body>
             <cwmp:GetParameterNames>
                 <ParameterPath>InternetGatewayDevice.</ParameterPath>
@@ -54,7 +84,7 @@ def test_handle_server_rpcs(client: Client):
         </soapenv:Body>
     """
     set_parameter_values = mock.MagicMock()
-    set_parameter_values.text = """
+    set_parameter_values.content = b"""
         <soapenv:Body>
             <cwmp:SetParameterValues>
                 <ParameterList soap:arrayType="cwmp:ParameterValueStruct[1]">
@@ -67,7 +97,7 @@ def test_handle_server_rpcs(client: Client):
         </soapenv:Body>
     """
     get_parameter_values = mock.MagicMock()
-    get_parameter_values.text = """
+    get_parameter_values.content = b"""
         <soapenv:Body>
             <cwmp:GetParameterValues>
                 <ParameterNames soap:arrayType="xsd:string[1]">
@@ -77,7 +107,7 @@ def test_handle_server_rpcs(client: Client):
         </soapenv:Body>
     """
     set_parameter_attributes = mock.MagicMock()
-    set_parameter_attributes.text = """
+    set_parameter_attributes.content = b"""
         <soapenv:Body>
         <cwmp:SetParameterAttributes>
           <ParameterList SOAP-ENC:arrayType="cwmp:SetParameterAttributesStruct[1]">
@@ -106,10 +136,58 @@ def test_handle_server_rpcs(client: Client):
     assert client.device.params["Foo"].value == "Bar"
 
 
+def test_get_parameter_names_next_level(client: Client):
+    get_parameter_names = mock.MagicMock()
+    get_parameter_names.content = b"""
+        <soapenv:Body>
+            <cwmp:GetParameterNames>
+                <ParameterPath>InternetGatewayDevice.</ParameterPath>
+                <NextLevel>true</NextLevel>
+            </cwmp:GetParameterNames>
+        </soapenv:Body>
+    """
+    done = mock.MagicMock()
+    done.status_code = 204
+    client._session.post.side_effect = [get_parameter_names, done]
+    client.done()
+    assert client.handle_server_rpcs() == 1
+    body = client._session.post.call_args_list[-1][1]["data"]
+    assert b"<Name>InternetGatewayDevice.DeviceInfo.</Name>" in body
+    assert b"<Name>InternetGatewayDevice.DeviceInfo.SerialNumber</Name>" not in body
+
+
+def test_handle_server_rpcs_overridden(client: Client):
+    """Automatic handling sends responses through the public methods, which subclasses may override."""
+    class Custom(Client):
+        def get_parameter_values_response(self, params):
+            replies.append(params)
+            return super().get_parameter_values_response(params)
+
+    replies = []
+    get_parameter_values = mock.MagicMock()
+    get_parameter_values.content = b"""
+        <soapenv:Body>
+            <cwmp:GetParameterValues>
+                <ParameterNames soap:arrayType="xsd:string[1]">
+                    <string>InternetGatewayDevice.DeviceInfo.HardwareVersion</string>
+                </ParameterNames>
+            </cwmp:GetParameterValues>
+        </soapenv:Body>
+    """
+    done = mock.MagicMock()
+    done.status_code = 204
+    c = Custom("http://acs.example.com/", log=False)
+    c._session = client._session
+    c._session.post.side_effect = [get_parameter_values, done]
+    c.done()
+    assert c.handle_server_rpcs() == 1
+    assert [[p.name for p in params] for params in replies] == [["InternetGatewayDevice.DeviceInfo.HardwareVersion"]]
+
+
 def test_handle_server_rpcs_unknown_rpc(client: Client):
     """Raise a NotImplementedError if we don't know the RPC"""
     unknown = mock.MagicMock()
-    unknown.text = "<soap:Body><cwmp:Unknown />"
+    unknown.content = b"<soap:Body><cwmp:Unknown />"
     client._session.post.side_effect = [
         unknown
     ]
@@ -122,3 +200,50 @@ def test_replay(client: Client):
     assert client.get_rpc_methods()
     assert client.replay()
     assert client.replay(client.messages[0])
+
+
+def test_value_change_notification():
+    d = fleet.make_device(device.DEFAULT, "SERIAL")
+    url = "InternetGatewayDevice.ManagementServer.ConnectionRequestURL"
+    key = "InternetGatewayDevice.ManagementServer.ParameterKey"
+    script = [
+        testing.set_parameter_attributes({"InternetGatewayDevice.ManagementServer.": 2}),
+        testing.set_parameter_values({key: "acs"}),
+    ]
+    with testing.MockACS(script) as acs:
+        client = Client(acs.url, d, log=False)
+        client.inform(events=[event.Boot])
+        client.done()
+        assert client.handle_server_rpcs() == 2
+        assert d.params[key].notification_level == 2
+        # Changes made by the ACS are not notified.
+        assert d.params.changes() == []
+
+        d.params[url] = "http://changed"
+        client.close()
+        client.inform(events=[event.Periodic])
+        assert d.params.changes() == []
+    session = list(acs.sessions.values())[-1]
+    assert "4 VALUE CHANGE" in session.inform.xml
+    assert session.device.params[url].value == "http://changed"
+
+
+def test_request_bytes(acs):
+    client = Client(acs.url, log=False)
+    response = client.request("<soap:Body><cwmp:Foo>€</cwmp:Foo>")
+    assert response.request.body == "<soap:Body><cwmp:Foo>€</cwmp:Foo>".encode()
+    assert response.request.headers["SOAPAction"] == "cwmp:Foo"
+    client.request(b"<soap:Body><cwmp:FooResponse/>")
+    (headers, body), (response_headers, _) = acs.requests
+    assert body == "<soap:Body><cwmp:Foo>€</cwmp:Foo>".encode()
+    assert headers["Content-Length"] == str(len(body))
+    assert response_headers["SOAPAction"] == ""
+
+
+def test_response_without_charset(acs):
+    body = "<soap:Body><cwmp:GetParameterValues><ParameterNames><string>Grüße</string>".encode()
+    acs.responses = [(200, {"Content-Type": "text/xml"}, body)]
+    client = Client(acs.url, log=False)
+    client.get_rpc_methods()
+    assert client.envelope().arguments == ["Grüße"]
+    assert client.envelope().xml == body.decode()
@@ -1,4 +1,5 @@
 import socket
+import time
 
 from tr069 import connection_request_server
 
@@ -39,3 +40,67 @@ def test_server_manual():
 
     sock.close()
     serv.shutdown()
+
+
+def test_server_concurrent():
+    serv = connection_request_server.ConnectionRequestServer(("127.0.0.1", 0), log=False, max_request_size=8)
+
+    # A silent connection must not block other connection requests.
+    silent = socket.create_connection(serv.sock.getsockname())
+    assert serv.queue.get()
+
+    sock = socket.create_connection(serv.sock.getsockname())
+    sock.settimeout(5)
+    assert sock.recv(4096) == connection_request_server.DEFAULT_REPLY
+    sock.sendall(b"GET / HT")
+    # The connection is closed once max_request_size has been read.
+    assert sock.recv(4096) == b""
+    assert serv.queue.get()
+
+    sock.close()
+    silent.close()
+    serv.shutdown()
+    assert serv.handled == 2
+
+
+def test_server_manual_keeps_accepting():
+    serv = connection_request_server.ConnectionRequestServer(("127.0.0.1", 0), handle_manually=True, log=False)
+
+    socks = [socket.create_connection(serv.sock.getsockname()) for _ in range(3)]
+    received = [serv.queue.get(timeout=5) for _ in range(3)]
+    assert len(received) == 3
+
+    for csock, _ in received:
+        csock.close()
+    for sock in socks:
+        sock.close()
+    serv.shutdown()
+
+
+
+def test_server_deadline():
+    serv = connection_request_server.ConnectionRequestServer(("127.0.0.1", 0), log=False, timeout=0.5)
+
+    sock = socket.create_connection(serv.sock.getsockname())
+    sock.settimeout(0.1)
+    received = b""
+    start = time.monotonic()
+    # Dripping data does not extend the deadline.
+    while time.monotonic() - start < 5:
+        try:
+            sock.send(b"x")
+            data = sock.recv(4096)
+        except socket.timeout:
+            continue
+        except OSError:
+            break
+        if not data:
+            break
+        received += data
+    assert received == connection_request_server.DEFAULT_REPLY
+    assert time.monotonic() - start < 2
+
+    sock.close()
+    serv.shutdown()
+    serv.shutdown()
+    assert serv.handled == 1
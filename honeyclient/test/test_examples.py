@@ -9,7 +9,7 @@ example_dir = root_dir / 'examples'
 
 @mock.patch('requests.Session')
 def test_01_introduction(Session):
-    Session().post().text = ""
+    Session().post().content = b""
     Session().post().status_code = 204
     runpy.run_path(str(example_dir / "01_introduction.py"))
 
@@ -21,7 +21,7 @@ def test_02_devices():
 
 @mock.patch('requests.Session')
 def test_03_rpcs(Session):
-    Session().post().text = ""
+    Session().post().content = b""
     Session().send = Session().post
     runpy.run_path(str(example_dir / "03_rpcs.py"))
 
@@ -0,0 +1,246 @@
+import asyncio
+import random
+import re
+import shutil
+import socket
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from tr069 import fleet
+from tr069 import transport
+from tr069 import udp_connection_request
+from tr069.data import device
+
+
+def inform_acs(headers, body):
+    """Accept every Inform and ask for the serial number once per session."""
+    if b"<cwmp:Inform>" in body:
+        return 200, {}, b"<soap:Body><cwmp:InformResponse><MaxEnvelopes>1</MaxEnvelopes></cwmp:InformResponse>"
+    if body == b"":
+        return 200, {}, b"""
+            <soap:Body><cwmp:GetParameterValues><ParameterNames>
+                <string>InternetGatewayDevice.DeviceInfo.ManufacturerOUI</string>
+            </ParameterNames></cwmp:GetParameterValues>
+        """
+    return 204, {}, b""
+
+
+def test_make_devices():
+    devices = fleet.make_devices(device.DEFAULT, 3, ouis=["A", "B"])
+    assert len({d.serial for d in devices}) == 3
+    assert [d.oui for d in devices] == ["A", "B", "A"]
+    assert devices[1].params["InternetGatewayDevice.DeviceInfo.ManufacturerOUI"].value == "B"
+    assert device.DEFAULT.params["InternetGatewayDevice.DeviceInfo.ManufacturerOUI"].value == "00040E"
+    assert devices[0].params is not devices[1].params
+
+
+def test_percentile():
+    assert fleet.percentile([1, 2, 3, 4], 50) == 2
+    assert fleet.percentile([1, 2, 3, 4], 99) == 4
+    assert fleet.percentile([1, 2, 3, 4], 0) == 1
+    assert str(fleet.percentile([], 50)) == "nan"
+
+
+def test_fleet(acs):
+    acs.responses = inform_acs
+    f = fleet.Fleet(acs.url, 5, concurrency=2)
+    assert repr(f) == f"Fleet({acs.url}, 5 devices)"
+
+    stats = f.run(sessions=2)
+    assert stats.sessions == 10
+    assert stats.rpcs == 10
+    assert not stats.errors
+    assert stats.error_rate == 0
+    assert stats.sessions_per_second > 0
+    assert len(stats.request_latencies) == 30
+    assert "Sessions:     10" in stats.summary()
+
+    informs = [body for _, body in acs.requests if b"<cwmp:Inform>" in body]
+    assert len({re.search(rb"<SerialNumber>(.+)</SerialNumber>", x).group(1) for x in informs}) == 5
+    assert sum(b"0 BOOTSTRAP" in x for x in informs) == 5
+    assert sum(b"2 PERIODIC" in x for x in informs) == 5
+
+
+def test_fleet_errors(acs):
+    f = fleet.Fleet(acs.url, 2)
+    stats = f.run()
+    assert stats.errors == {"HTTP 204": 2}
+    assert stats.error_rate == 1
+    assert repr(stats) == "FleetStats(0 sessions, 2 errors)"
+    assert "HTTP 204: 2" in stats.summary()
+
+
+def test_cli(acs, tmp_path):
+    acs.responses = inform_acs
+    log = tmp_path / "flows.jsonl"
+    result = CliRunner().invoke(fleet.cli, [acs.url, "-n", "3", "-c", "2", "--log", str(log)])
+    assert result.exit_code == 0
+    assert "Sessions:     3" in result.output
+    assert len(log.read_text().splitlines()) == 9
+
+
+def test_shared_transport(acs):
+    acs.responses = inform_acs
+    t = transport.Transport(pool_size=2)
+    f = fleet.Fleet(acs.url, 4, concurrency=2, transport=t)
+    stats = f.run(2)
+    assert stats.sessions == 8
+    assert t.stats["requests"] == 24
+    assert t.stats["connections"] <= 2
+    assert not t._idle
+
+    result = CliRunner().invoke(fleet.cli, [acs.url, "-n", "3", "-c", "2", "-p", "2"])
+    assert result.exit_code == 0
+    assert "Transport(9 requests" in result.output
+
+
+def test_answer_connection_requests(acs):
+    acs.responses = inform_acs
+    f = fleet.Fleet(acs.url, 3)
+
+    async def run():
+        listener = udp_connection_request.UDPConnectionRequestListener(log=False)
+        address = await listener.start(("127.0.0.1", 0))
+        host, port = address.split(":")
+        answered = asyncio.ensure_future(f.answer_connection_requests(listener, "secret"))
+        await asyncio.sleep(0)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for client in f.clients:
+            assert client.device.params[
+                "InternetGatewayDevice.ManagementServer.ConnectionRequestUsername"
+            ].value == client.device.serial
+            request = udp_connection_request.make_connection_request(address, client.device.serial, "secret")
+            sock.sendto(request, (host, int(port)))
+        stats = await asyncio.wait_for(answered, 10)
+        sock.close()
+        listener.close()
+        return stats
+
+    loop = asyncio.new_event_loop()
+    try:
+        stats = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert stats.sessions == 3
+    assert len(stats.wakeup_latencies) == 3
+    assert "Wake-up latency" in stats.summary()
+    assert sum(b"6 CONNECTION REQUEST" in body for _, body in acs.requests) == 3
+
+
+def test_cli_data_model(acs, tmp_path):
+    acs.responses = inform_acs
+    definition = tmp_path / "datamodel.xml"
+    shutil.copy(Path(__file__).parent / "data" / "datamodel.xml", definition)
+    result = CliRunner().invoke(fleet.cli, [acs.url, "-n", "2", "-m", str(definition), "-i", "2"])
+    assert result.exit_code == 0
+    assert "Loaded InternetGatewayDevice:1.4 with 17 parameters" in result.output
+    assert "Sessions:     2" in result.output
+    serial = f"<SerialNumber>{device.DEFAULT.serial}000001</SerialNumber>".encode()
+    assert any(serial in body for _, body in acs.requests)
+
+
+def _periodic_devices(n, **params):
+    devices = fleet.make_devices(device.DEFAULT, n)
+    for d in devices:
+        for name, value in params.items():
+            d.params[f"InternetGatewayDevice.ManagementServer.{name}"] = value
+    return devices
+
+
+def test_periodic_inform_settings():
+    d, = _periodic_devices(1)
+    assert fleet.periodic_inform_settings(d) == (None, None)
+    assert fleet.periodic_inform_settings(d, 60) == (60, None)
+    d, = _periodic_devices(1, PeriodicInformInterval="300", PeriodicInformTime="1970-01-01T00:01:00Z")
+    assert fleet.periodic_inform_settings(d) == (300, 60)
+    d, = _periodic_devices(1, PeriodicInformInterval="300", PeriodicInformTime="0001-01-01T00:00:00Z")
+    assert fleet.periodic_inform_settings(d) == (300, None)
+    d, = _periodic_devices(1, PeriodicInformInterval="300", PeriodicInformEnable="false")
+    assert fleet.periodic_inform_settings(d) == (None, None)
+    d, = _periodic_devices(1, PeriodicInformInterval="0")
+    assert fleet.periodic_inform_settings(d, 60) == (None, None)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1970-01-01T00:01:00Z", 60),
+    ("1970-01-01T00:01:00", 60),
+    (" 1970-01-01T00:01:00Z ", 60),
+    ("1970-01-01T00:01:00.5Z", 60.5),
+    ("1970-01-01T00:01:00.25Z", 60.25),
+    ("1970-01-01T00:01:00.1234567Z", 60.1234567),
+    ("1970-01-01T01:01:00+01:00", 60),
+    ("1970-01-01T01:01:00+0100", 60),
+    ("1969-12-31T23:31:00-00:30", 60),
+    ("2018-03-01T12:00:00Z", 1519905600),
+    ("0001-01-01T00:00:00Z", None),
+    ("0001-01-01T00:00:00", None),
+    ("2018-02-30T00:00:00Z", None),
+    ("2018-03-01", None),
+    ("2018-03-01T12:00:00+1", None),
+    ("", None),
+])
+def test_parse_time(value, expected):
+    t = fleet._parse_time(value)
+    if expected is None:
+        assert t is None
+    else:
+        assert t == pytest.approx(expected)
+
+
+def test_periodic_inform_schedule():
+    devices = _periodic_devices(1000, PeriodicInformInterval="100")
+    schedule = fleet.PeriodicInformSchedule(devices, 0, jitter=0.1, rng=random.Random(1))
+    assert repr(schedule) == "PeriodicInformSchedule(1000 of 1000 devices)"
+    # Start times are spread over the first interval.
+    assert 0 <= schedule.next_due < 1
+    due = schedule.pop_due(50)
+    assert 400 < len(due) < 600
+    assert all(0 <= nominal <= 50 for _, nominal in due)
+    for index, nominal in due:
+        assert nominal + 100 <= schedule.schedule(index, 50, nominal) <= nominal + 110
+    assert len(schedule) == 1000
+    # Informs do not drift, even if the session took a while.
+    index, nominal = due[0]
+    later = fleet.PeriodicInformSchedule(devices[index:index + 1], 0, jitter=0.1, rng=random.Random(1))
+    assert later.schedule(0, nominal + 30, nominal) - nominal - 100 < 10
+
+    # Missed informs are skipped.
+    schedule = fleet.PeriodicInformSchedule(devices[:1], 0, jitter=0)
+    (index, nominal), = schedule.pop_due(100)
+    assert schedule.schedule(index, 1000, nominal) == pytest.approx(nominal + 1000)
+
+
+def test_periodic_inform_schedule_reference_time():
+    devices = _periodic_devices(3, PeriodicInformInterval="60", PeriodicInformTime="1970-01-01T00:00:30")
+    devices[2].params["InternetGatewayDevice.ManagementServer.PeriodicInformEnable"] = "0"
+    schedule = fleet.PeriodicInformSchedule(devices, 1000, jitter=0)
+    assert len(schedule) == 2
+    assert schedule.next_due == 1050
+    assert schedule.pop_due(1049) == []
+    assert schedule.pop_due(1050) == [(0, 1050), (1, 1050)]
+    # Changes of the parameters are honoured when rescheduling.
+    devices[0].params["InternetGatewayDevice.ManagementServer.PeriodicInformInterval"] = "3600"
+    assert schedule.schedule(0, 1050, 1050) == 3630
+    assert schedule.schedule(1, 1050, 1050) == 1110
+    assert schedule.schedule(2, 1050) is None
+
+
+def test_run_periodic(acs):
+    acs.responses = inform_acs
+    f = fleet.Fleet(acs.url, 3)
+    f.clients[0].device.params["InternetGatewayDevice.ManagementServer.PeriodicInformInterval"] = "0.2"
+    stats = f.run_periodic_blocking(0.9, jitter=0)
+    assert not stats.errors
+    assert 3 <= stats.sessions <= 5
+    informs = [body for _, body in acs.requests if b"<cwmp:Inform>" in body]
+    assert all(b"2 PERIODIC" in x for x in informs)
+    assert len({re.search(rb"<SerialNumber>(.+)</SerialNumber>", x).group(1) for x in informs}) == 1
+
+    stats = f.run_periodic_blocking(0.5, default_interval=0.4)
+    assert stats.sessions >= 3
+
+    result = CliRunner().invoke(fleet.cli, [acs.url, "-n", "2", "-t", "0.3", "--interval", "0.2"])
+    assert result.exit_code == 0
+    assert "Running periodic informs on 2 virtual CPEs" in result.output
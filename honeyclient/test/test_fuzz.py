@@ -0,0 +1,125 @@
+import random
+import time
+
+from click.testing import CliRunner
+
+from tr069 import fuzz
+from tr069 import transport
+from tr069.data import rpcs
+from tr069.data import soap
+
+INFORM_RESPONSE = b"<soap:Body><cwmp:InformResponse><MaxEnvelopes>1</MaxEnvelopes></cwmp:InformResponse>"
+
+
+def fragile_acs(headers, body):
+    """Crashes on nested elements and reflects CDATA sections."""
+    if b"<cwmp:Inform>" in body:
+        return 200, {}, INFORM_RESPONSE
+    if b"<a><a>" in body:
+        return 500, {}, b"Internal Server Error"
+    if b"CDATA" in body:
+        return 400, {}, b"Invalid value: " + body[body.index(b"CDATA"):][:50]
+    return 204, {}, b""
+
+
+def test_mutators():
+    seed = rpcs.make_request_download(file_type_arg={"Version": "1.0"})
+    for name, mutator in fuzz.MUTATORS.items():
+        mutated = [mutator(seed, random.Random(i)) for i in range(5)]
+        assert any(m != seed for m in mutated), name
+        assert mutated == [mutator(seed, random.Random(i)) for i in range(5)], name
+    assert soap.get_cwmp_id(fuzz.MUTATORS["cwmp:ID"](seed, random.Random(0))) != "1"
+
+
+def test_default_seeds():
+    seeds = fuzz.default_seeds()
+    assert "cwmp:Inform" in seeds
+    assert "cwmp:GetParameterValuesResponse" in seeds
+    assert all(soap.extract_rpc_name(xml) == name for name, xml in seeds.items())
+
+
+def test_fuzzer(acs, tmp_path):
+    acs.responses = fragile_acs
+    seeds = {"cwmp:GetRPCMethods": rpcs.make_get_rpc_methods()}
+    f = fuzz.Fuzzer(
+        acs.url,
+        seeds,
+        mutators={name: fuzz.MUTATORS[name] for name in ["nesting", "replace value", "truncate"]},
+        workers=4,
+        random_seed=1,
+    )
+    corpus = f.run(60)
+    assert f.baselines["cwmp:GetRPCMethods"][0] == 204
+    assert f.stats["cases"] == 60
+    assert f.stats["HTTP 500"] > 1
+    # All crashes caused by nesting have the same signature.
+    assert [c.mutator for c in corpus if "HTTP 500" in c.anomalies] == ["nesting"]
+    assert all(c.mutator == "replace value" for c in corpus if "reflected" in c.anomalies)
+    assert len(corpus) < f.stats["anomalies"]
+    assert repr(f) == f"Fuzzer({acs.url}, 60 cases, {len(corpus)} in corpus)"
+    # Every case runs in its own session.
+    assert sum(b"<cwmp:Inform>" in body for _, body in acs.requests) == 61
+
+    path = str(tmp_path / "corpus.jsonl")
+    corpus.save(path)
+    loaded = fuzz.Corpus.load(path)
+    assert [c.signature for c in loaded] == [c.signature for c in corpus]
+    assert not loaded.add(next(iter(corpus)))
+
+
+def test_rate(acs):
+    acs.responses = fragile_acs
+    f = fuzz.Fuzzer(acs.url, {"cwmp:Inform": fuzz.default_seeds()["cwmp:Inform"]}, rate=50, random_seed=0)
+    start = time.perf_counter()
+    f.run(10)
+    assert f.stats["cases"] == 10
+    assert time.perf_counter() - start >= 9 / 50
+
+
+def test_cli(acs, tmp_path):
+    acs.responses = fragile_acs
+    path = tmp_path / "corpus.jsonl"
+    for _ in range(2):
+        result = CliRunner().invoke(fuzz.cli, [acs.url, "-n", "30", "-s", "3", "-o", str(path)])
+        assert result.exit_code == 0, result.output
+        assert "Cases:      30" in result.output
+    assert "(0 new)" in result.output
+    assert path.exists()
+
+
+def test_baseline_errors(acs):
+    def rejecting_acs(headers, body):
+        if b"<cwmp:Inform>" in body:
+            return 401, {}, b""
+        return 204, {}, b""
+
+    acs.responses = rejecting_acs
+    f = fuzz.Fuzzer(acs.url, {"cwmp:GetRPCMethods": rpcs.make_get_rpc_methods()}, workers=1, random_seed=0)
+    f.run(5)
+    assert f.baselines == {}
+    assert f.baseline_errors == {"cwmp:GetRPCMethods": "SessionError: Inform: HTTP 401"}
+    assert f.stats["baseline errors"] == 1
+    assert f.stats["SessionError"] == 5
+    # Nothing was sent after the rejected Informs.
+    assert all(b"<cwmp:Inform>" in body for _, body in acs.requests)
+
+    acs.responses = fragile_acs
+    f.run(1)
+    assert f.baselines["cwmp:GetRPCMethods"][0] == 204
+    assert f.baseline_errors == {}
+
+
+def test_shared_transport(acs):
+    acs.responses = fragile_acs
+    shared = transport.Transport()
+    session = shared.session()
+    session.post(acs.url, data=b"")
+    f = fuzz.Fuzzer(acs.url, {"cwmp:GetRPCMethods": rpcs.make_get_rpc_methods()}, transport=shared, random_seed=0)
+    f.run(3)
+    f.run(3)
+    assert f.stats["cases"] == 6
+    # Only the asyncio connections of each run's event loop are closed, the caller's pool is kept.
+    connections = shared.stats["connections"]
+    session.post(acs.url, data=b"")
+    assert shared.stats["connections"] == connections
+    shared.close()
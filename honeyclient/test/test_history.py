@@ -0,0 +1,70 @@
+import pytest
+
+from tr069 import Client
+from tr069 import history
+
+
+def make_response(response, body: bytes):
+    response._content = body
+    return response
+
+
+def test_history(response):
+    h = history.History()
+    h.append(response)
+    assert h == [response]
+    assert h[-1] is response
+    assert h != [response, response]
+    assert repr(h) == "History(1 messages, 0 evicted)"
+    h.clear()
+    assert len(h) == 0
+
+    with pytest.raises(ValueError):
+        history.History(0)
+
+
+def test_max_messages(response):
+    h = history.History(2)
+    for _ in range(5):
+        h.append(response)
+    assert len(h) == 2
+    assert h.evicted == 3
+
+
+def test_compress(response):
+    h = history.History(compress=True)
+    h.append(response)
+    h.append(response)
+    assert h[-1] is response
+    restored = h[0]
+    assert restored is not response
+    assert restored.content == response.content
+    assert restored.status_code == 200
+    assert restored.headers["bar"] == "baz"
+    assert restored.request.body == "qux"
+    assert restored.request.headers["foo"] == "bar"
+    assert h[:1][0].content == response.content
+
+
+def test_spill(tmp_path, response):
+    path = str(tmp_path / "history.jsonl")
+    h = history.History(1, compress=True, spill=path)
+    h.append(make_response(response, b"\xff\xfe invalid utf-8"))
+    h.append(response)
+    h.append(response)
+    h.close()
+    spilled = list(history.load(path))
+    assert len(spilled) == 2
+    assert spilled[0].content == b"\xff\xfe invalid utf-8"
+    assert spilled[0].request.url == "http://acs.example.com/"
+    assert spilled[0].elapsed == response.elapsed
+
+
+def test_client_history(client: Client):
+    client.messages = history.History(1)
+    client._session.post.return_value.content = b'<cwmp:ID soap:mustUnderstand="1">42</cwmp:ID>'
+    client.get_rpc_methods()
+    client.get_rpc_methods()
+    assert len(client.messages) == 1
+    assert client.messages.evicted == 1
+    assert b"<cwmp:ID soap:mustUnderstand=\"1\">42</cwmp:ID>" in client._session.post.call_args[1]["data"]
@@ -0,0 +1,107 @@
+import pytest
+import requests
+
+import tr069
+from tr069 import fleet
+from tr069 import testing
+from tr069.data import device
+from tr069.data import parameters
+
+SCRIPT = [
+    testing.get_parameter_values(["InternetGatewayDevice.DeviceInfo."]),
+    testing.set_parameter_values({"InternetGatewayDevice.ManagementServer.PeriodicInformInterval": "60"}),
+    testing.get_parameter_names("InternetGatewayDevice.", next_level=True),
+    testing.download("http://example.com/firmware.bin"),
+]
+
+
+@pytest.fixture()
+def mock_acs():
+    with testing.MockACS(SCRIPT) as acs:
+        yield acs
+
+
+def session(client: tr069.Client) -> int:
+    client.inform()
+    client.done()
+    return client.handle_server_rpcs()
+
+
+def test_session(mock_acs):
+    dev = device.Device("Vendor", "001122", "Gateway", "S1", parameters.Parameters(device.DEFAULT.params.values()))
+    client = tr069.Client(mock_acs.url, dev, log=False)
+    assert session(client) == len(SCRIPT)
+    assert dev.params["InternetGatewayDevice.ManagementServer.PeriodicInformInterval"].value == "60"
+
+    s, = mock_acs.sessions.values()
+    assert s.done
+    assert s.device.serial == "S1"
+    assert [r.rpc_name for r in s.responses] == [
+        "cwmp:GetParameterValuesResponse",
+        "cwmp:SetParameterValuesResponse",
+        "cwmp:GetParameterNamesResponse",
+        "cwmp:DownloadResponse",
+    ]
+    assert "InternetGatewayDevice.DeviceInfo.SoftwareVersion" in s.responses[0].xml
+    assert [r.cwmp_id for r in s.responses] == ["1", "2", "3", "4"]
+    assert mock_acs.stats == {"sessions": 1, "rpcs": 4, "sessions completed": 1}
+    assert repr(mock_acs) == f"MockACS({mock_acs.url}, 1 sessions)"
+
+    session(client)
+    assert len(mock_acs.sessions) == 2
+
+
+def test_no_session(mock_acs):
+    resp = requests.post(mock_acs.url, data="")
+    assert resp.status_code == 400
+    assert mock_acs.stats["no session"] == 1
+
+
+def test_script_function():
+    def script(inform):
+        assert inform.rpc_name == "cwmp:Inform"
+        return [testing.get_parameter_names()]
+
+    with testing.MockACS(script, keep_sessions=False) as acs:
+        client = tr069.Client(acs.url, log=False)
+        assert session(client) == 1
+        assert session(client) == 1
+        assert len(acs.sessions) == 0
+
+
+def test_digest_auth():
+    with testing.MockACS(SCRIPT[:1], digest_auth=("user", "pass")) as acs:
+        client = tr069.Client(acs.url, log=False, digest_auth=("user", "pass"))
+        assert session(client) == 1
+        assert acs.stats["sessions completed"] == 1
+
+        client = tr069.Client(acs.url, log=False, digest_auth=("user", "wrong"))
+        assert client.inform().status_code == 401
+        client = tr069.Client(acs.url, log=False)
+        assert client.inform().status_code == 401
+        assert acs.stats["sessions"] == 1
+
+
+def test_expiry():
+    with testing.MockACS(SCRIPT[:1], keep_sessions=False, digest_auth=("user", "pass")) as acs:
+        acs.SESSION_TIMEOUT = 0
+        client = tr069.Client(acs.url, log=False, digest_auth=("user", "pass"))
+        assert client.inform().status_code == 200
+        assert len(acs.sessions) == 1
+        assert session(client) == 1
+        assert len(acs.sessions) == 0
+        assert acs.stats["sessions expired"] == 1
+
+        acs.NONCE_TTL = 0
+        client = tr069.Client(acs.url, log=False, digest_auth=("user", "pass"))
+        assert client.inform().status_code == 401
+
+
+def test_fleet():
+    with testing.MockACS(SCRIPT[:2], digest_auth=("user", "pass")) as acs:
+        f = fleet.Fleet(acs.url, 10, concurrency=5, digest_auth=("user", "pass"))
+        stats = f.run(2)
+        assert stats.sessions == 20
+        assert stats.rpcs == 40
+        assert not stats.errors
+        assert acs.stats["sessions completed"] == 20
@@ -0,0 +1,79 @@
+import pytest
+from click.testing import CliRunner
+
+import tr069
+from tr069 import testing
+from tr069 import transcript
+from tr069.data import device
+
+SCRIPT = [
+    testing.get_parameter_values(["InternetGatewayDevice.DeviceInfo."]),
+    testing.set_parameter_values({"InternetGatewayDevice.ManagementServer.PeriodicInformInterval": "60"}),
+]
+
+
+@pytest.fixture()
+def sessions():
+    with testing.MockACS(SCRIPT) as acs:
+        recorder = transcript.Recorder()
+        client = tr069.Client(acs.url, log=False, history=recorder)
+        for _ in range(2):
+            client.inform()
+            client.done()
+            client.handle_server_rpcs()
+            client.messages.clear()
+    assert repr(recorder) == "Recorder(2 sessions)"
+    return recorder.sessions
+
+
+def test_record(sessions, tmp_path):
+    session = sessions[0]
+    assert len(session) == 4
+    assert session.serial == device.DEFAULT.serial
+    assert [m["time"] for m in session.messages] == sorted(m["time"] for m in session.messages)
+    assert 0 < session.duration < 5
+    assert [r.status_code for r in session.responses()] == [200, 200, 200, 204]
+
+    for name in ["transcript.jsonl", "transcript.jsonl.gz"]:
+        path = str(tmp_path / name)
+        transcript.save(sessions, path)
+        loaded = list(transcript.load(path))
+        assert [s.to_record() for s in loaded] == [s.to_record() for s in sessions]
+    assert (tmp_path / "transcript.jsonl.gz").stat().st_size < (tmp_path / "transcript.jsonl").stat().st_size
+
+
+def test_replay(sessions):
+    with testing.MockACS(SCRIPT, digest_auth=("user", "pass")) as acs:
+        stats = transcript.replay(acs.url, sessions, 3, speed=0, digest_auth=("user", "pass"))
+        assert not stats.errors
+        assert stats.sessions == 6
+        assert stats.rpcs == 12
+        serials = {s.device.serial for s in acs.sessions.values()}
+        assert serials == {f"{device.DEFAULT.serial}{i:06X}" for i in range(3)}
+        # cwmp:IDs are taken from the ACS' requests.
+        assert all([r.cwmp_id for r in s.responses] == ["1", "2"] for s in acs.sessions.values())
+
+    with testing.MockACS(SCRIPT[:1]) as acs:
+        stats = transcript.replay(acs.url, sessions[:1], serials=["A", "B"], speed=0)
+        assert stats.errors == {"Expected cwmp:SetParameterValues, got HTTP 204": 2}
+        assert {s.device.serial for s in acs.sessions.values()} == {"A", "B"}
+
+
+def test_replay_speed(sessions):
+    session = sessions[0]
+    for i, message in enumerate(session.messages):
+        message["time"] = i * 0.1
+    with testing.MockACS(SCRIPT) as acs:
+        stats = transcript.replay(acs.url, [session], speed=2)
+    assert stats.sessions == 1
+    assert stats.session_latencies[0] >= 0.15
+
+
+def test_cli(sessions, tmp_path):
+    path = str(tmp_path / "transcript.jsonl")
+    transcript.save(sessions, path)
+    with testing.MockACS(SCRIPT) as acs:
+        result = CliRunner().invoke(transcript.cli, [path, acs.url, "-n", "2", "-x", "0"])
+    assert result.exit_code == 0
+    assert "Replaying 2 session(s) on 2 virtual CPEs" in result.output
+    assert "Sessions:     4" in result.output
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import ssl
+
+import pytest
+
+import tr069
+from tr069 import testing
+from tr069 import transport
+
+CERT = os.path.join(os.path.dirname(__file__), "data", "acs.pem")
+SCRIPT = [testing.get_parameter_values(["InternetGatewayDevice.DeviceInfo."])]
+
+
+@pytest.fixture()
+def https_acs():
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(CERT)
+    with testing.MockACS(SCRIPT, ssl_context=ctx) as acs:
+        yield acs
+
+
+def session(client: tr069.Client) -> None:
+    client.inform()
+    client.done()
+    assert client.handle_server_rpcs() == 1
+    client.close()
+
+
+def test_shared_pool():
+    t = transport.Transport(pool_size=2)
+    with testing.MockACS(SCRIPT) as acs:
+        clients = [tr069.Client(acs.url, log=False, transport=t) for _ in range(5)]
+        for client in clients:
+            session(client)
+        assert acs.stats["sessions completed"] == 5
+        assert len(acs.sessions) == 5
+    assert t.stats["requests"] == 15
+    assert t.stats["connections"] == 1
+    assert "ssl_context" not in vars(t) and t._ssl_context is None
+    assert repr(t) == "Transport(15 requests, 1 connections, 0/0 TLS sessions resumed)"
+
+
+def test_tls_resumption(https_acs):
+    t = transport.Transport(verify=CERT)
+    client = tr069.Client(https_acs.url, log=False, transport=t)
+    session(client)
+    session(client)
+    assert t.stats["tls handshakes"] == 1
+    t.close()
+    session(client)
+    assert t.stats["connections"] == 2
+    assert t.stats["tls handshakes"] == 2
+    assert t.stats["tls resumed"] == 1
+
+
+def test_async_tls_resumption(https_acs):
+    t = transport.Transport(pool_size=1, verify=CERT)
+
+    async def main():
+        clients = [tr069.AsyncClient(https_acs.url, log=False, transport=t) for _ in range(3)]
+        for _ in range(2):
+            for client in clients:
+                await client.inform()
+                await client.done()
+                await client.handle_server_rpcs()
+            for client in clients:
+                client.close()
+        t.close()
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(main())
+    loop.close()
+    assert https_acs.stats["sessions completed"] == 6
+    # Three connections in the first round, all but one are closed because the pool is full.
+    assert t.stats["connections"] == 5
+    assert t.stats["tls handshakes"] == 5
+    assert t.stats["tls resumed"] >= 3
+
+
+def test_verify(https_acs):
+    client = tr069.Client(https_acs.url, log=False, transport=transport.Transport())
+    with pytest.raises(Exception, match="CERTIFICATE_VERIFY_FAILED"):
+        client.inform()
+    client = tr069.Client(https_acs.url, log=False, transport=transport.Transport(verify=False))
+    assert client.inform().status_code == 200
+
+
+def test_tls_settings_on_transport():
+    with pytest.raises(ValueError):
+        tr069.Client("https://acs.example.com/", transport=transport.Transport(), verify=False)
+    with pytest.raises(ValueError):
+        tr069.AsyncClient("https://acs.example.com/", transport=transport.Transport(), cert=CERT)
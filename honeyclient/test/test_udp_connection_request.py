@@ -0,0 +1,87 @@
+import asyncio
+import socket
+
+import pytest
+
+from tr069 import udp_connection_request as udp
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_parse():
+    data = udp.make_connection_request("10.0.0.1:7547", "cpe", "secret", ts=1120673700, id=1234, cnonce="XTGR")
+    request = udp.parse(data, ("10.0.0.2", 1234), 1.5)
+    assert request.ts == 1120673700
+    assert request.id == 1234
+    assert request.username == "cpe"
+    assert request.cnonce == "XTGR"
+    assert request.address == ("10.0.0.2", 1234)
+    assert request.timestamp == 1.5
+    assert request.verify("secret")
+    assert not request.verify("wrong")
+    assert repr(request) == "UDPConnectionRequest(cpe, id=1234, ts=1120673700)"
+
+    for invalid in [b"", b"\xff", b"POST / HTTP/1.1\r\n", b"GET /?ts=1&id=2 HTTP/1.1\r\n", b"GET /?ts=x&id=2&un=a&cn=b&sig=c HTTP/1.1"]:
+        with pytest.raises(ValueError):
+            udp.parse(invalid)
+
+
+def test_listener():
+    async def session():
+        listener = udp.UDPConnectionRequestListener(log=False)
+        address = await listener.start(("127.0.0.1", 0))
+        assert repr(listener) == f"UDPConnectionRequestListener({address}, 0 CPEs)"
+        a = listener.register("a", "secret")
+        b = listener.register("b", "other")
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        host, port = address.split(":")
+        request = udp.make_connection_request(address, "a", "secret", ts=100, id=1)
+        for datagram in [
+            request,
+            request,  # retransmission
+            udp.make_connection_request(address, "a", "secret", ts=99, id=2),  # stale
+            udp.make_connection_request(address, "a", "wrong", ts=101, id=3),  # invalid signature
+            udp.make_connection_request(address, "c", "secret"),  # unknown username
+            b"foo",
+            udp.make_connection_request(address, "b", "other", ts=100, id=1),
+        ]:
+            sock.sendto(datagram, (host, int(port)))
+        received_a = await asyncio.wait_for(a.get(), 5)
+        received_b = await asyncio.wait_for(b.get(), 5)
+        sock.close()
+        listener.close()
+        return listener, received_a, received_b
+
+    listener, a, b = run(session())
+    assert (a.username, a.id) == ("a", 1)
+    assert (b.username, b.id) == ("b", 1)
+    assert a.timestamp <= b.timestamp
+    assert listener.stats == {
+        "accepted": 2,
+        "duplicate": 1,
+        "stale": 1,
+        "invalid signature": 1,
+        "unknown username": 1,
+        "malformed": 1,
+    }
+
+
+def test_listener_queue_full():
+    async def session():
+        listener = udp.UDPConnectionRequestListener(log=False)
+        queue = listener.register("a", "secret")
+        for i in range(udp.QUEUE_SIZE + 2):
+            datagram = udp.make_connection_request("127.0.0.1:7547", "a", "secret", ts=100 + i, id=i)
+            listener.datagram_received(datagram, ("127.0.0.1", 7547))
+        return listener, queue
+
+    listener, queue = run(session())
+    assert queue.qsize() == udp.QUEUE_SIZE
+    assert listener.stats == {"accepted": udp.QUEUE_SIZE, "queue full": 2}
@@ -1,5 +1,8 @@
+import io
+import json
 import textwrap
 
+import pytest
 from hypothesis import example
 from hypothesis import given
 from hypothesis.strategies import text
@@ -47,5 +50,34 @@ def test_print_http_flow(capsys, response):
     """).strip()
 
 
+def test_flow_logger_console(response):
+    out = io.StringIO()
+    logger = util.FlowLogger(file=out)
+    logger.log(response)
+    logger.flush()
+    assert "POST / HTTP/1.1" in out.getvalue()
+    assert repr(logger) == "FlowLogger(console, 0 pending)"
+    logger.close()
+    logger.close()
+    with pytest.raises(RuntimeError):
+        logger.log(response)
+
+
+def test_flow_logger_jsonl(response):
+    out = io.StringIO()
+    logger = util.FlowLogger("jsonl", out)
+    logger.log(response)
+    logger.log(response)
+    logger.close()
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(records) == 2
+    assert records[0]["request"]["body"] == "qux"
+    assert records[0]["response"]["body"] == "quux"
+    assert records[0]["timestamp"] > 0
+
+    with pytest.raises(ValueError):
+        util.FlowLogger("unknown")
+
+
 def test_get_ip():
     assert util.get_ip()
@@ -0,0 +1,77 @@
+import asyncio
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+import tr069
+from tr069 import testing
+from tr069 import xml_attacks
+
+
+def size(stream) -> int:
+    return sum(len(chunk) for chunk in stream)
+
+
+def test_quadratic_blowup():
+    payload = xml_attacks.quadratic_blowup(3, 5)
+    assert payload == '<!DOCTYPE bomb [\n    <!ENTITY a "BBBBB">\n]>\n<bomb>&a;&a;&a;</bomb>'
+    assert b"".join(xml_attacks.quadratic_blowup_stream(3, 5)).decode() == payload
+    assert size(xml_attacks.quadratic_blowup_stream(1_000, 100_000)) == len(xml_attacks.quadratic_blowup())
+
+
+def test_billion_laughs():
+    payload = b"".join(xml_attacks.billion_laughs(depth=3, width=2)).decode()
+    assert '<!ENTITY lol3 "&lol2;&lol2;">' in payload
+    assert ET.fromstring(payload).text == "lol" * 8
+
+
+def test_nested_elements():
+    payload = b"".join(xml_attacks.nested_elements(100)).decode()
+    assert payload == "<a>" * 100 + "</a>" * 100
+    ET.fromstring(payload)
+
+
+def test_many_attributes():
+    element = ET.fromstring(b"".join(xml_attacks.many_attributes(10_000)))
+    assert len(element.attrib) == 10_000
+    assert element.attrib["a9999"] == "9999"
+
+
+def test_constant_memory():
+    for stream in [
+        xml_attacks.quadratic_blowup_stream(10_000_000, 1_000_000),
+        xml_attacks.nested_elements(10_000_000),
+        xml_attacks.many_attributes(1_000_000),
+    ]:
+        tracemalloc.start()
+        try:
+            assert size(stream) > 10_000_000
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak < 1_000_000
+
+
+def test_stream_request():
+    with testing.MockACS() as acs:
+        client = tr069.Client(acs.url, log=False)
+        client.inform()
+        resp = client.request(xml_attacks.nested_elements(100_000))
+        assert resp.status_code == 204
+        assert resp.request.headers["Transfer-Encoding"] == "chunked"
+        assert len(client.messages) == 2
+        s, = acs.sessions.values()
+        assert len(s.responses[0].xml) == 700_000
+
+        async def stream():
+            client = tr069.AsyncClient(acs.url, log=False)
+            await client.inform()
+            resp = await client.request(xml_attacks.quadratic_blowup_stream(10, 100_000))
+            client.close()
+            return resp
+
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(stream()).status_code == 204
+        finally:
+            loop.close()
+        assert len(acs.sessions["2"].responses[0].xml) == len(xml_attacks.quadratic_blowup(10, 100_000))
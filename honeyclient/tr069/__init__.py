@@ -1,23 +1,63 @@
 """
 A TR-069 Honeyclient implementation.
+
+Submodules and classes are imported on first access, so that importing tr069 stays cheap
+for short-lived command line invocations and worker processes.
 """
-from . import proxy
-from . import xml_attacks
-from .client import Client
-from .connection_request_server import ConnectionRequestServer
-from .data import device
-from .data import event
-from .data import parameters
-from .data import rpcs
+import importlib
 
 __version__ = '1.0'
 __all__ = [
+    "fleet",
+    "fuzz",
+    "history",
     "proxy",
+    "transcript",
+    "transport",
     "Client",
+    "AsyncClient",
     "ConnectionRequestServer",
+    "UDPConnectionRequestListener",
+    "udp_connection_request",
     "device",
     "event",
     "parameters",
     "rpcs",
     "xml_attacks",
 ]
+
+# name -> (module, attribute)
+_lazy = {
+    "fleet": ("tr069.fleet", None),
+    "fuzz": ("tr069.fuzz", None),
+    "history": ("tr069.history", None),
+    "proxy": ("tr069.proxy", None),
+    "transcript": ("tr069.transcript", None),
+    "transport": ("tr069.transport", None),
+    "udp_connection_request": ("tr069.udp_connection_request", None),
+    "xml_attacks": ("tr069.xml_attacks", None),
+    "Client": ("tr069.client", "Client"),
+    "AsyncClient": ("tr069.async_client", "AsyncClient"),
+    "ConnectionRequestServer": ("tr069.connection_request_server", "ConnectionRequestServer"),
+    "UDPConnectionRequestListener": ("tr069.udp_connection_request", "UDPConnectionRequestListener"),
+    "device": ("tr069.data.device", None),
+    "event": ("tr069.data.event", None),
+    "parameters": ("tr069.data.parameters", None),
+    "rpcs": ("tr069.data.rpcs", None),
+}
+
+
+def __getattr__(name: str):
+    try:
+        module, attr = _lazy[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = importlib.import_module(module)
+    if attr:
+        value = getattr(value, attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,331 @@
+import asyncio
+import datetime
+import email.parser
+import http.client
+import re
+import ssl
+import types
+import urllib.parse
+from typing import Iterable, Optional, Tuple, Union
+
+import requests
+import requests.auth
+import requests.cookies
+import requests.structures
+import requests.utils
+
+from tr069 import transport as mtransport
+from tr069.client import BaseClient, _wrap_rpc
+from tr069.data import rpcs
+
+_digest_rex = re.compile(r"digest ", re.IGNORECASE)
+
+
+class _Connection:
+    """
+    A single persistent HTTP/1.1 connection to the ACS.
+
+    This implements only what is needed to talk to an ACS: POST requests with a known body length
+    or a streamed body with chunked transfer encoding, responses with Content-Length, chunked encoding or read-until-close semantics.
+    """
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    closed: bool
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    @classmethod
+    async def open(cls, url: str, ssl_context: Optional[ssl.SSLContext]) -> "_Connection":
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme == "https":
+            port = parts.port or 443
+        else:
+            port = parts.port or 80
+            ssl_context = None
+        reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=ssl_context)
+        return cls(reader, writer)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+    async def send(self, request: requests.PreparedRequest) -> Tuple[requests.Response, http.client.HTTPMessage]:
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        parts = urllib.parse.urlsplit(request.url)
+        head = [f"{request.method} {request.path_url} HTTP/1.1"]
+        if "Host" not in request.headers:
+            head.append(f"Host: {parts.netloc.rsplit('@', 1)[-1]}")
+        for name, value in request.headers.items():
+            if name.lower() not in ("content-length", "transfer-encoding"):
+                head.append(f"{name}: {value}")
+        if isinstance(body, bytes):
+            head.append(f"Content-Length: {len(body)}")
+            self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        else:
+            head.append("Transfer-Encoding: chunked")
+            self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+            for chunk in body:
+                if chunk:
+                    self.writer.write(b"%x\r\n" % len(chunk))
+                    self.writer.write(chunk)
+                    self.writer.write(b"\r\n")
+                    await self.writer.drain()
+            self.writer.write(b"0\r\n\r\n")
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection.")
+        _, status_code, *reason = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        header_lines = []
+        while True:
+            line = await self.reader.readline()
+            if not line.strip():
+                break
+            header_lines.append(line)
+        msg = email.parser.BytesParser(_class=http.client.HTTPMessage).parsebytes(b"".join(header_lines))
+
+        response = requests.Response()
+        response.status_code = int(status_code)
+        response.reason = reason[0] if reason else ""
+        response.headers = requests.structures.CaseInsensitiveDict(msg.items())
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response._content = await self._read_body(request, response)
+
+        if response.headers.get("Connection", "").lower() == "close":
+            self.close()
+        return response, msg
+
+    async def _read_body(self, request: requests.PreparedRequest, response: requests.Response) -> bytes:
+        if request.method == "HEAD" or response.status_code in (204, 304) or response.status_code < 200:
+            return b""
+        if "chunked" in response.headers.get("Transfer-Encoding", "").lower():
+            chunks = []
+            while True:
+                size_line = await self.reader.readline()
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # Skip trailers.
+                    while (await self.reader.readline()).strip():
+                        pass
+                    return b"".join(chunks)
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+        if "Content-Length" in response.headers:
+            return await self.reader.readexactly(int(response.headers["Content-Length"]))
+        body = await self.reader.read()
+        self.close()
+        return body
+
+
+class AsyncClient(BaseClient):
+    """
+    A TR-069 Client instance to interact with an ACS, running on an asyncio event loop.
+
+    The API mirrors :py:class:`tr069.Client`, but all methods that talk to the ACS are coroutines.
+    Only the auth, cert, verify and timeout arguments of requests are supported.
+    Responses are regular requests.Response objects.
+    """
+
+    _connection: Optional[_Connection] = None
+    _ssl_context: Optional[ssl.SSLContext] = None
+
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        if self.transport:
+            return self.transport.ssl_context
+        if self._ssl_context is None:
+            self._ssl_context = mtransport.make_ssl_context(
+                self.requests_kwargs.get("verify", True),
+                self.requests_kwargs.get("cert", None),
+            )
+        return self._ssl_context
+
+    async def _open(self, url: str) -> _Connection:
+        # Loading CA certificates is expensive, so plain HTTP connections do not create a TLS context.
+        ssl_context = self._get_ssl_context() if url.lower().startswith("https:") else None
+        connection = await _Connection.open(url, ssl_context)
+        if self.transport:
+            self.transport.connected(url, connection)
+        return connection
+
+    async def _send(self, request: requests.PreparedRequest) -> requests.Response:
+        timeout = self.requests_kwargs.get("timeout", None)
+        if isinstance(timeout, tuple):
+            timeout = sum(timeout)
+        for attempt in range(2):
+            reused = self._connection is not None and not self._connection.closed
+            if not reused and self.transport:
+                self._connection = self.transport.acquire(request.url)
+                reused = self._connection is not None
+            if not reused:
+                self._connection = await asyncio.wait_for(self._open(request.url), timeout)
+            if self.transport:
+                self.transport.stats["requests"] += 1
+            try:
+                start = datetime.datetime.now()
+                response, msg = await asyncio.wait_for(self._connection.send(request), timeout)
+                response.elapsed = datetime.datetime.now() - start
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self._connection.close()
+                # The ACS may have closed an idle keep-alive connection, retry once on a fresh one.
+                if not reused or attempt:
+                    raise
+            except BaseException:
+                self._connection.close()
+                raise
+        # extract_cookies_to_jar expects a urllib3 response wrapping a http.client response.
+        raw = types.SimpleNamespace(_original_response=types.SimpleNamespace(msg=msg))
+        requests.cookies.extract_cookies_to_jar(self._session.cookies, request, raw)
+        return response
+
+    async def _post(self, data: Union[bytes, Iterable[bytes]], headers) -> requests.Response:
+        auth = self.requests_kwargs.get("auth", None)
+        request = requests.Request("POST", self.acs_url, data=data, headers=headers, auth=auth)
+        response = await self._send(self._session.prepare_request(request))
+
+        www_authenticate = response.headers.get("WWW-Authenticate", "")
+        if (
+                response.status_code == 401
+                and isinstance(auth, requests.auth.HTTPDigestAuth)
+                and "digest" in www_authenticate.lower()
+        ):
+            # Mirror requests.auth.HTTPDigestAuth.handle_401, which relies on synchronous response hooks.
+            auth._thread_local.chal = requests.utils.parse_dict_header(
+                _digest_rex.sub("", www_authenticate, count=1)
+            )
+            prepared = self._session.prepare_request(request)
+            prepared.headers["Authorization"] = auth.build_digest_header(prepared.method, prepared.url)
+            response = await self._send(prepared)
+        return response
+
+    async def request(
+            self,
+            data: Union[str, bytes, Iterable[bytes]],
+            *,
+            fix_cwmp_id: bool = True,
+            headers=None,
+    ) -> requests.Response:
+        """
+        Send a HTTP request to the ACS.
+
+        Args:
+            data: The request body. Text is encoded as UTF-8 once and sent as bytes,
+                iterables of bytes are streamed, see :py:meth:`tr069.Client.request`.
+            fix_cwmp_id: If true, the cwmp:ID in the body will replaced with the cwmp:ID in the last response.
+            headers: Request headers. If not set, the default TR-069 headers will be used.
+
+        Returns:
+            The ACS' response.
+        """
+        data = self._encode(data)
+        if headers is None:
+            headers = self._default_headers(data)
+
+        if fix_cwmp_id:
+            data = self._fix_cwmp_id(data)
+
+        resp = await self._post(data, headers)
+        self._record_response(resp)
+        return resp
+
+    async def replay(self, request: Optional[requests.PreparedRequest] = None) -> requests.Response:
+        """
+        Replay a request that has previously been sent.
+        Useful to e.g. test for nonce re-use.
+
+        Args:
+            request: The request to replay. If no request is passed, the last request
+                     will be replayed.
+        """
+        if request is None:
+            request = self.messages[-1].request.copy()
+
+        resp = await self._send(request)
+        self._record_response(resp)
+        return resp
+
+    async def done(self) -> requests.Response:
+        """Indicate to the ACS that the client has finished sending RPCs"""
+        return await self.request("")
+
+    async def handle_server_rpcs(self) -> int:
+        """
+        Handle server RPCs automatically, starting with the last already transmitted RPC.
+        This is usually called immediately after .done()
+
+        Returns:
+            The number of handled RPCs
+
+        Raises:
+            NotImplementedError if automated handling of the RPC is not implemented.
+        """
+        count = 0
+        while True:
+            rpc = self.messages[-1]
+            if self._is_last_rpc(rpc):
+                break
+            reply, args = self._server_rpc_reply(rpc)
+            await reply(*args)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        """
+        Close any existing connections to the ACS and reset the session.
+        Connections of a shared transport are returned to its pool instead.
+        """
+        if self._connection:
+            if self.transport:
+                self.transport.release(self.acs_url, self._connection)
+            else:
+                self._connection.close()
+            self._connection = None
+        self._session = self._new_session()
+        self._log_status("Connection closed.")
+
+    @_wrap_rpc(rpcs.make_inform)
+    async def inform(self, **kwargs):
+        kwargs.setdefault("device", self.device)
+        kwargs.setdefault("value_changes", kwargs["device"].params.changes())
+        response = await self.request(self._make_inform(**kwargs))
+        if response.status_code == 200:
+            kwargs["device"].params.clear_changes(kwargs["value_changes"])
+        return response
+
+    @_wrap_rpc(rpcs.make_get_rpc_methods)
+    async def get_rpc_methods(self) -> requests.Response:
+        return await self.request(rpcs.make_get_rpc_methods())
+
+    @_wrap_rpc(rpcs.make_request_download)
+    async def request_download(self, *args, **kwargs):
+        return await self.request(rpcs.make_request_download(*args, **kwargs))
+
+    @_wrap_rpc(rpcs.make_set_parameter_values_response)
+    async def set_parameter_values_response(self, *args, **kwargs):
+        return await self.request(rpcs.make_set_parameter_values_response(*args, **kwargs))
+
+    @_wrap_rpc(rpcs.make_get_parameter_values_response)
+    async def get_parameter_values_response(self, *args, **kwargs):
+        return await self.request(rpcs.make_get_parameter_values_response(*args, **kwargs))
+
+    @_wrap_rpc(rpcs.make_set_parameter_attributes_response)
+    async def set_parameter_attributes_response(self):
+        return await self.request(rpcs.make_set_parameter_attributes_response())
+
+    @_wrap_rpc(rpcs.make_get_parameter_names_response)
+    async def get_parameter_names_response(self, *args, **kwargs):
+        return await self.request(rpcs.make_get_parameter_names_response(*args, **kwargs))
+
+    @_wrap_rpc(rpcs.make_download_response)
+    async def download_response(self, *args, **kwargs):
+        return await self.request(rpcs.make_download_response(*args, **kwargs))
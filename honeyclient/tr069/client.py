@@ -1,11 +1,13 @@
-import warnings
 
 import requests
 import requests.auth
-from typing import List, Tuple, Any, Dict, Union, Optional
+from typing import Tuple, Any, Callable, Dict, Iterable, Union, Optional
 
+from tr069 import history as mhistory
+from tr069 import transport as mtransport
 from tr069 import util
 from tr069.data import device as mdevice
+from tr069.data import envelope as menvelope
 from tr069.data import rpcs
 from tr069.data import soap
 
@@ -25,38 +27,53 @@ def _wrap_rpc(rpc):
     return decorator
 
 
-class Client:
-    """A TR-069 Client instance to interact with an ACS."""
+class BaseClient:
+    """
+    Functionality shared by the blocking and the asyncio-based TR-069 client.
+    Subclasses provide the transport.
+    """
 
     acs_url: str
     requests_kwargs: Dict[str, Any]
     device: mdevice.Device
-    log: bool
+    log: Union[bool, util.FlowLogger]
+    transport: Optional[mtransport.Transport]
     _session: requests.Session
-    messages: List[requests.Response]
+    _envelope: Optional[menvelope.Envelope]
+    _inform_builder: Optional[rpcs.InformBuilder]
+    messages: mhistory.History
 
     def __init__(
             self,
             acs_url: str,
-            device: mdevice.Device = mdevice.DEFAULT,
+            device: Optional[mdevice.Device] = None,
             *,
-            log: bool = True,
+            log: Union[bool, util.FlowLogger] = True,
             basic_auth: Optional[Tuple[str, str]] = None,
             digest_auth: Optional[Tuple[str, str]] = None,
             cert: Union[Tuple[str, str], str] = None,
+            history: Optional[mhistory.History] = None,
+            transport: Optional[mtransport.Transport] = None,
             **requests_kwargs
     ):
         """
         Args:
             acs_url: The ACS URL.
-            device: The device represented by the client.
+            device: The device represented by the client. Defaults to :py:data:`tr069.data.device.DEFAULT`.
             log: If True, all requests and responses are logged to stdout.
+                Pass a :py:class:`tr069.util.FlowLogger` to log from a background thread instead.
             basic_auth: A (user, pass) tuple used for HTTP basic authentication.
             digest_auth: A (user, pass) tuple used for HTTP digest authentication.
             cert: TLS Client Certificate, see http://docs.python-requests.org/en/master/user/advanced/#ssl-cert-verification
+            history: Where exchanged messages are stored, e.g. to bound memory usage in long-running sessions.
+                Defaults to an unbounded in-memory history.
+            transport: A connection pool and TLS context shared with other clients.
+                TLS settings (cert and verify) need to be passed to the transport instead.
             **requests_kwargs: Additional arguments passed to subsequent internal calls of requests.post().
         """
         self.acs_url = acs_url
+        if device is None:
+            device = mdevice.DEFAULT
         self.device = device
         self.log = log
 
@@ -69,14 +86,34 @@ class Client:
         if digest_auth:
             requests_kwargs["auth"] = requests.auth.HTTPDigestAuth(*digest_auth)
 
+        if transport and (cert or "verify" in requests_kwargs):
+            raise ValueError("TLS settings of clients with a shared transport need to be set on the transport.")
         if cert:
             requests_kwargs["cert"] = cert
         self.requests_kwargs = requests_kwargs
-        self._session = requests.Session()
-        self.messages = []
+        self.transport = transport
+        self._session = self._new_session()
+        self._envelope = None
+        self._inform_builder = None
+        if history is None:
+            history = mhistory.History()
+        self.messages = history
+
+    def _new_session(self) -> requests.Session:
+        if self.transport:
+            return self.transport.session()
+        return requests.Session()
+
+    @staticmethod
+    def _encode(data: Union[str, bytes, Iterable[bytes]]) -> Union[bytes, Iterable[bytes]]:
+        # Bodies are encoded exactly once, as declared in the Content-Type header.
+        # All further processing (headers, cwmp:ID) works on the encoded body.
+        if isinstance(data, str):
+            return data.encode("utf-8")
+        return data
 
     @staticmethod
-    def _default_headers(data: str):
+    def _default_headers(data: Union[str, bytes, Iterable[bytes]]):
         default_headers = {
             "User-Agent": None,
         }
@@ -84,6 +121,9 @@ class Client:
         # TR-069 3.4.1: An empty HTTP POST MUST NOT contain a Content-Type header
         if data:
             default_headers["Content-Type"] = 'text/xml; charset="utf-8"'
+        if not isinstance(data, (str, bytes)):
+            # Streamed bodies are not inspected, that would consume them.
+            return default_headers
 
         # Add proper SOAPAction header (TR-069 3.4.1)
         soap_action = soap.extract_rpc_name(data)
@@ -96,26 +136,126 @@ class Client:
 
         return default_headers
 
-    def request(self, data: str, *, fix_cwmp_id: bool = True, **kwargs) -> requests.Response:
+    def envelope(self, response: Optional[requests.Response] = None) -> menvelope.Envelope:
+        """
+        The parsed envelope of a response. Envelopes are parsed lazily and
+        the envelope of the last response is cached.
+
+        Args:
+            response: The response to parse. Defaults to the last response.
+        """
+        if response is None:
+            response = self.messages[-1]
+        if self._envelope is not None and self._envelope.response is response:
+            return self._envelope
+        return menvelope.Envelope(response=response)
+
+    def _make_inform(self, *, device: mdevice.Device, **kwargs) -> str:
+        # Informs of the client's device are built incrementally, see rpcs.InformBuilder.
+        if self._inform_builder is None or self._inform_builder.device is not device:
+            self._inform_builder = rpcs.InformBuilder(device)
+        return self._inform_builder.build(**kwargs)
+
+    def _fix_cwmp_id(self, data: Union[bytes, Iterable[bytes]]) -> Union[bytes, Iterable[bytes]]:
+        # Re-use the cwmp:ID transmitted in the last response.
+        # For client RPCs, that's going to be our default id, so nothing should be changed.
+        # For server RPCs, that's the id sent by the server, which we need to account for.
+        if self.messages and isinstance(data, (str, bytes)):
+            cwmp_id = self.envelope().cwmp_id
+            if cwmp_id:
+                data = soap.set_cwmp_id(data, cwmp_id)
+        return data
+
+    def _record_response(self, response: requests.Response) -> None:
+        self.messages.append(response)
+        self._envelope = menvelope.Envelope(response=response)
+        # don't log request before sending it, requests adds its own headers after that.
+        if isinstance(self.log, util.FlowLogger):
+            self.log.log(response)
+        elif self.log:
+            # Share the decoded body with the envelope.
+            util.print_http_flow(response, text=self._envelope.xml)
+
+    def _log_status(self, message: str) -> None:
+        # Status messages are only part of the synchronous console log.
+        if self.log and not isinstance(self.log, util.FlowLogger):
+            print(message)
+
+    def __repr__(self) -> str:
+        return f"tr069.{type(self).__name__}({self.acs_url}, {len(self.messages)} messages)"
+
+    def _is_last_rpc(self, rpc: requests.Response) -> bool:
+        return rpc.status_code == 204 or (rpc.status_code == 200 and self.envelope(rpc).xml == "")
+
+    def _server_rpc_reply(self, rpc: requests.Response) -> Tuple[Callable, tuple]:
+        """
+        Process a server RPC and return the public method that sends our response, and its arguments,
+        so that subclasses can override how responses are sent.
+
+        Raises:
+            NotImplementedError if automated handling of the RPC is not implemented.
+        """
+        envelope = self.envelope(rpc)
+        rpc_name = envelope.rpc_name or "unknown"
+        if rpc_name == "cwmp:SetParameterValues":
+            # Changes requested by the ACS are not notified.
+            for p in envelope.arguments:
+                self.device.params.set_value(p.name, p.value, p.type, notify=False)
+            return self.set_parameter_values_response, ()
+        elif rpc_name == "cwmp:GetParameterValues":
+            param_names = envelope.arguments
+            params = []
+            for p in param_names:
+                params.extend(self.device.params.all(p))
+            return self.get_parameter_values_response, (params,)
+        elif rpc_name == "cwmp:SetParameterAttributes":
+            for name, notification_level in envelope.arguments:
+                if notification_level is not None:
+                    self.device.params.set_notification(name, notification_level)
+            return self.set_parameter_attributes_response, ()
+        elif rpc_name == "cwmp:GetParameterNames":
+            path, next_level = envelope.arguments
+            if next_level:
+                params = self.device.params.next_level(path)
+            else:
+                params = self.device.params.all(path)
+            return self.get_parameter_names_response, (params,)
+        elif rpc_name == "cwmp:Download":
+            return self.download_response, ()
+        else:
+            raise NotImplementedError(f"Unknown server RPC: {rpc_name}")
+
+
+class Client(BaseClient):
+    """A TR-069 Client instance to interact with an ACS."""
+
+    def request(
+            self,
+            data: Union[str, bytes, Iterable[bytes]],
+            *,
+            fix_cwmp_id: bool = True,
+            **kwargs
+    ) -> requests.Response:
         """
         Send a HTTP request to the ACS.
 
         Args:
-            data: The request body
+            data: The request body. Text is encoded as UTF-8 once and sent as bytes.
+                Iterables of bytes, e.g. the streams of :py:mod:`tr069.xml_attacks`,
+                are sent with chunked transfer encoding without holding the body in memory.
+                They can only be sent once, so they cannot be replayed or resent after an authentication challenge.
             fix_cwmp_id: If true, the cwmp:ID in the body will replaced with the cwmp:ID in the last response.
             **kwargs: Arguments passed to self._session.post()
 
         Returns:
             The ACS' response.
         """
+        data = self._encode(data)
         kwargs.update(self.requests_kwargs)
         kwargs.setdefault("headers", self._default_headers(data))
 
-        # Re-use the cwmp:ID transmitted in the last response.
-        # For client RPCs, that's going to be our default id, so nothing should be changed.
-        # For server RPCs, that's the id sent by the server, which we need to account for.
-        if fix_cwmp_id and self.messages:
-            data = soap.fix_cwmp_id(data, self.messages[-1].text)
+        if fix_cwmp_id:
+            data = self._fix_cwmp_id(data)
 
         resp = self._session.post(self.acs_url, data=data, **kwargs)
         self._record_response(resp)
@@ -137,15 +277,6 @@ class Client:
         self._record_response(resp)
         return resp
 
-    def _record_response(self, response: requests.Response) -> None:
-        self.messages.append(response)
-        if self.log:
-            # don't log request before sending it, requests adds its own headers after that.
-            util.print_http_flow(response)
-
-    def __repr__(self) -> str:
-        return f"tr069.Client({self.acs_url}, {len(self.messages)} messages)"
-
     def done(self) -> requests.Response:
         """Indicate to the ACS that the client has finished sending RPCs"""
         return self.request("")
@@ -164,50 +295,34 @@ class Client:
         count = 0
         while True:
             rpc = self.messages[-1]
-            if rpc.status_code == 204 or (rpc.status_code == 200 and rpc.text == ""):
+            if self._is_last_rpc(rpc):
                 break
             self._handle_server_rpc(rpc)
             count += 1
         return count
 
-    def _handle_server_rpc(self, rpc: requests.Response):
-        rpc_name = soap.extract_rpc_name(rpc.text) or "unknown"
-        if rpc_name == "cwmp:SetParameterValues":
-            new_params = rpcs.parse_set_parameter_values(rpc.text)
-            self.device.params.update({p.name: p for p in new_params})
-            self.set_parameter_values_response()
-        elif rpc_name == "cwmp:GetParameterValues":
-            param_names = rpcs.parse_get_parameter_values(rpc.text)
-            params = []
-            for p in param_names:
-                params.extend(self.device.params.all(p))
-            self.get_parameter_values_response(params)
-        elif rpc_name == "cwmp:SetParameterAttributes":
-            warnings.warn("Ignoring cwmp:SetParameterAttributes")
-            self.set_parameter_attributes_response()
-        elif rpc_name == "cwmp:GetParameterNames":
-            # We ignore next_level because no-one validates that anyways.
-            path, _ = rpcs.parse_get_parameter_names(rpc.text)
-            params = self.device.params.all(path)
-            self.get_parameter_names_response(params)
-        elif rpc_name == "cwmp:Download":
-            self.download_response()
-        else:
-            raise NotImplementedError(f"Unknown server RPC: {rpc_name}")
+    def _handle_server_rpc(self, rpc: requests.Response) -> requests.Response:
+        reply, args = self._server_rpc_reply(rpc)
+        return reply(*args)
 
     def close(self) -> None:
         """
         Close any existing connections to the ACS and reset the session.
+        Connections of a shared transport are returned to its pool instead.
         """
-        self._session.close()
-        self._session = requests.Session()
-        if self.log:
-            print("Connection closed.")
+        if not self.transport:
+            self._session.close()
+        self._session = self._new_session()
+        self._log_status("Connection closed.")
 
     @_wrap_rpc(rpcs.make_inform)
     def inform(self, **kwargs):
         kwargs.setdefault("device", self.device)
-        return self.request(rpcs.make_inform(**kwargs))
+        kwargs.setdefault("value_changes", kwargs["device"].params.changes())
+        response = self.request(self._make_inform(**kwargs))
+        if response.status_code == 200:
+            kwargs["device"].params.clear_changes(kwargs["value_changes"])
+        return response
 
     @_wrap_rpc(rpcs.make_get_rpc_methods)
     def get_rpc_methods(self) -> requests.Response:
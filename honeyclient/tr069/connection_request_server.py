@@ -1,8 +1,10 @@
-import io
+import collections
 import queue
+import selectors
 import socket
 import threading
-from typing import Tuple, Optional
+import time
+from typing import Deque, Dict, Optional, Tuple
 
 import click
 
@@ -21,6 +23,18 @@ DEFAULT_REPLY = (
 )
 
 
+class _Connection:
+    """The state of an automatically handled connection request."""
+    __slots__ = ("sock", "addr", "outgoing", "received", "deadline")
+
+    def __init__(self, sock: socket.socket, addr: Tuple, deadline: float):
+        self.sock = sock
+        self.addr = addr
+        self.outgoing = DEFAULT_REPLY
+        self.received = bytearray()
+        self.deadline = deadline
+
+
 class ConnectionRequestServer:
     """
     A minimal TR-069 Connection Request Server.
@@ -30,29 +44,67 @@ class ConnectionRequestServer:
     Connection requests are acknowledged automatically by default
     and will be printed to stdout. For non-interactive use, users may
     call instance.queue.get() to wait for a connection request.
+
+    All connections are multiplexed on a single thread, so that slow or silent
+    requesting entities do not delay other connection requests.
+    Every connection is closed at the latest timeout seconds after it was accepted.
     """
     sock: socket.socket
     thread: threading.Thread
     queue: queue.Queue
     handle_manually: bool
     address: str
+    timeout: float
+    max_request_size: int
+    log: bool
+    handled: int
+    _selector: selectors.BaseSelector
+    _wakeup: Tuple[socket.socket, socket.socket]
+    _connections: Dict[socket.socket, _Connection]
+    # All connections by deadline, which is the order they were accepted in. Finished connections are skipped.
+    _deadlines: Deque[_Connection]
 
     def __init__(
             self,
             address: Tuple[str, int] = ("", 7547),
-            handle_manually: bool = False
+            handle_manually: bool = False,
+            *,
+            timeout: float = 1.0,
+            max_request_size: int = 64 * 1024,
+            log: bool = True,
     ) -> None:
+        """
+        Args:
+            address: The address to listen on.
+            handle_manually: If True, connection requests are not answered.
+                Instead, the (socket, address) tuples put into the queue need to be handled and closed by the consumer.
+            timeout: Connections are closed timeout seconds after they were accepted.
+            max_request_size: The maximum number of bytes read from a connection.
+            log: If True, connection requests are printed to stdout.
+        """
         self.handle_manually = handle_manually
+        self.timeout = timeout
+        self.max_request_size = max_request_size
+        self.log = log
+        self.handled = 0
 
         self.queue = queue.Queue()
         self.sock = socket.socket()
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.sock.bind(address)
-        self.sock.listen(5)
+        self.sock.listen(128)
+        self.sock.setblocking(False)
         host, port = self.sock.getsockname()
         self.address = f"{host}:{port}"
 
-        click.secho(
+        self._connections = {}
+        self._deadlines = collections.deque()
+        self._wakeup = socket.socketpair()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.sock, selectors.EVENT_READ)
+        self._selector.register(self._wakeup[0], selectors.EVENT_READ)
+
+        self._log(
             f"=== Connection request server listening on {self.address} ===",
             fg="magenta", bold=True
         )
@@ -69,42 +121,101 @@ class ConnectionRequestServer:
     def __repr__(self):
         return f"ConnectionRequestServer({self.address})"
 
+    def _log(self, message: str, **styles) -> None:
+        if self.log:
+            click.secho(message, **styles)
+
     def shutdown(self) -> None:
-        self.sock.close()
+        if not self.thread.is_alive():
+            return
+        self._wakeup[1].send(b"\x00")
         self.thread.join()
 
+    def _next_deadline(self) -> Optional[float]:
+        while self._deadlines and self._connections.get(self._deadlines[0].sock) is not self._deadlines[0]:
+            self._deadlines.popleft()
+        return self._deadlines[0].deadline if self._deadlines else None
+
     def run(self):
+        try:
+            while True:
+                deadline = self._next_deadline()
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                events = self._selector.select(timeout)
+                if any(key.fileobj is self._wakeup[0] for key, _ in events):
+                    break
+                for key, mask in events:
+                    if key.fileobj is self.sock:
+                        self._accept()
+                    else:
+                        self._handle(self._connections[key.fileobj], mask)
+                now = time.monotonic()
+                deadline = self._next_deadline()
+                while deadline is not None and deadline <= now:
+                    self._finish(self._deadlines.popleft())
+                    deadline = self._next_deadline()
+        finally:
+            for conn in list(self._connections.values()):
+                self._finish(conn)
+            self._selector.close()
+            self.sock.close()
+            for s in self._wakeup:
+                s.close()
+        self._log(
+            f"=== Connection request server closed on {self.address} ===",
+            fg="magenta", bold=True
+        )
+
+    def _accept(self) -> None:
+        # Accept all pending connections at once, there may be many under load.
         while True:
             try:
                 sock, addr = self.sock.accept()
-            except OSError:
-                break
-            sock.settimeout(1)
-            click.secho(f"\n=== Connection request from {addr[0]} ===", fg="magenta", bold=True)
-            self.queue.put((sock, addr))
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:  # pragma: no cover
+                return
+            self._log(f"\n=== Connection request from {addr[0]} ===", fg="magenta", bold=True)
             if self.handle_manually:
-                self.queue.join()
-            else:
-                try:
-                    sock.sendall(DEFAULT_REPLY)
-                except OSError:  # pragma: no cover
-                    pass
-
-                # Read from the socket until timeout kicks in.
-                received = io.BytesIO()
-                for _ in range(1024):
-                    try:
-                        received.write(sock.recv(4096))
-                    except OSError:  # pragma: no cover
-                        break
-
-                click.secho(
-                    received.getvalue().decode("ascii", "backslashreplace").rstrip(),
-                )
-            sock.close()
-        click.secho(
-            f"=== Connection request server closed on {self.address} ===",
-            fg="magenta", bold=True
+                sock.setblocking(True)
+                sock.settimeout(self.timeout)
+                self.queue.put((sock, addr))
+                self.handled += 1
+                continue
+            self.queue.put((sock, addr))
+            sock.setblocking(False)
+            conn = _Connection(sock, addr, time.monotonic() + self.timeout)
+            self._connections[sock] = conn
+            self._deadlines.append(conn)
+            self._selector.register(sock, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    def _handle(self, conn: _Connection, mask: int) -> None:
+        try:
+            if mask & selectors.EVENT_WRITE and conn.outgoing:
+                sent = conn.sock.send(conn.outgoing)
+                conn.outgoing = conn.outgoing[sent:]
+                if not conn.outgoing:
+                    self._selector.modify(conn.sock, selectors.EVENT_READ)
+            if mask & selectors.EVENT_READ:
+                data = conn.sock.recv(min(4096, self.max_request_size - len(conn.received)))
+                if not data:
+                    self._finish(conn)
+                    return
+                conn.received += data
+                if len(conn.received) >= self.max_request_size:
+                    self._finish(conn)
+        except (BlockingIOError, InterruptedError):  # pragma: no cover
+            pass
+        except OSError:
+            self._finish(conn)
+
+    def _finish(self, conn: _Connection) -> None:
+        del self._connections[conn.sock]
+        self._selector.unregister(conn.sock)
+        conn.sock.close()
+        self.handled += 1
+        self._log(
+            conn.received.decode("ascii", "backslashreplace").rstrip(),
         )
 
 
@@ -0,0 +1,406 @@
+"""
+Broadband Forum data model definitions, e.g. TR-098 (InternetGatewayDevice) or TR-181 (Device).
+
+:py:func:`load` reads a data model XML definition as published by the Broadband Forum
+(https://cwmp-data-models.broadband-forum.org/) and creates a parameter for every parameter it defines,
+with its type, writability and default value.
+Multi-instance objects are instantiated a configurable number of times.
+
+Parsing a definition takes a while, so the result is cached as a binary index next to the XML file.
+Later runs memory-map the index and only decode the parameters that are accessed.
+Use the "full" XML files, which contain the complete model: imports of other documents are not resolved.
+"""
+import collections.abc
+import itertools
+import mmap
+import os
+import struct
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from . import device as mdevice
+from . import parameters
+
+TYPES = (
+    "xsd:string",
+    "xsd:int",
+    "xsd:unsignedInt",
+    "xsd:long",
+    "xsd:unsignedLong",
+    "xsd:boolean",
+    "xsd:dateTime",
+    "xsd:base64",
+    "xsd:hexBinary",
+    "xsd:decimal",
+)
+"""All parameter types, the position of a type is its id in the index."""
+
+_type_ids = {t: i for i, t in enumerate(TYPES)}
+_type_defaults = {
+    "xsd:int": "0",
+    "xsd:unsignedInt": "0",
+    "xsd:long": "0",
+    "xsd:unsignedLong": "0",
+    "xsd:boolean": "false",
+    "xsd:dateTime": "0001-01-01T00:00:00Z",
+    "xsd:decimal": "0",
+}
+
+# Index layout, all integers are little-endian:
+#  - header: magic, parameter count, instances, source size, source mtime, model name length,
+#  - one fixed-size record per parameter, sorted by name: name offset and length, value offset and length,
+#    type id and flags,
+#  - the string table, starting with the model name.
+MAGIC = b"TR069DM1"
+_header = struct.Struct("<8sIIQqH")
+_record = struct.Struct("<IHIIBB")
+_WRITABLE = 1
+
+
+def _local(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+class _Definition:
+    __slots__ = ("type", "value", "writable")
+
+    def __init__(self, type: str, value: Optional[str], writable: bool):
+        self.type = type
+        self.value = value
+        self.writable = writable
+
+
+class _Parser:
+    """Collects the parameter definitions of a model, resolving components, named data types and base objects."""
+    data_types: Dict[str, ElementTree.Element]
+    components: Dict[str, ElementTree.Element]
+    definitions: Dict[str, _Definition]
+    # The NumberOfEntries parameters of multi-instance objects.
+    entry_counts: List[str]
+
+    def __init__(self, root: ElementTree.Element):
+        self.data_types = {}
+        self.components = {}
+        for element in root:
+            tag = _local(element.tag)
+            if tag == "dataType":
+                self.data_types[element.get("name")] = element
+            elif tag == "component":
+                self.components[element.get("name")] = element
+        self.definitions = {}
+        self.entry_counts = []
+
+    def resolve_type(self, data_type: str, depth: int = 0) -> str:
+        element = self.data_types.get(data_type)
+        if element is None or depth > 16:
+            return "xsd:string"
+        if element.get("base"):
+            return self.resolve_type(element.get("base"), depth + 1)
+        for child in element:
+            t = self.syntax_type(child, depth + 1)
+            if t:
+                return t
+        return "xsd:string"
+
+    def syntax_type(self, element: ElementTree.Element, depth: int = 0) -> Optional[str]:
+        tag = _local(element.tag)
+        if tag == "dataType":
+            return self.resolve_type(element.get("ref") or element.get("base"), depth)
+        if f"xsd:{tag}" in _type_ids:
+            return f"xsd:{tag}"
+        return None
+
+    def add_parameter(self, path: str, element: ElementTree.Element) -> None:
+        name = path + (element.get("name") or element.get("base"))
+        definition = self.definitions.get(name)
+        if definition is None:
+            definition = self.definitions[name] = _Definition("xsd:string", None, False)
+        if element.get("access"):
+            definition.writable = element.get("access") == "readWrite"
+        syntax = next((c for c in element if _local(c.tag) == "syntax"), None)
+        if syntax is None:
+            return
+        for child in syntax:
+            tag = _local(child.tag)
+            if tag == "default":
+                definition.value = child.get("value", "")
+            elif tag == "list":
+                # Comma-separated lists are strings on the wire.
+                definition.type = "xsd:string"
+            else:
+                definition.type = self.syntax_type(child) or definition.type
+
+    def add_object(self, path: str, element: ElementTree.Element) -> None:
+        name = path + (element.get("name") or element.get("base"))
+        entries_parameter = element.get("numEntriesParameter")
+        if entries_parameter and name.endswith(".{i}."):
+            table = name[:-len("{i}.")]
+            parent = table[:table.rstrip(".").rfind(".") + 1]
+            self.entry_counts.append(parent + entries_parameter)
+        for child in element:
+            if _local(child.tag) == "parameter":
+                self.add_parameter(name, child)
+
+    def add_items(self, path: str, element: ElementTree.Element, depth: int = 0) -> None:
+        for child in element:
+            tag = _local(child.tag)
+            if tag == "object":
+                self.add_object(path, child)
+            elif tag == "parameter":
+                self.add_parameter(path, child)
+            elif tag == "component" and depth < 16:
+                component = self.components.get(child.get("ref"))
+                if component is not None:
+                    self.add_items(path + child.get("path", ""), component, depth + 1)
+
+
+def _expand(name: str, instances: int) -> Iterator[str]:
+    parts = name.split("{i}")
+    if len(parts) == 1:
+        yield name
+        return
+    for numbers in itertools.product(range(1, instances + 1), repeat=len(parts) - 1):
+        yield "".join(itertools.chain.from_iterable(zip(parts, map(str, numbers)))) + parts[-1]
+
+
+def parse(path: str, instances: int = 1, model: Optional[str] = None) -> Tuple[str, List[parameters.Parameter]]:
+    """
+    Parse a data model XML definition.
+
+    Args:
+        path: The XML file.
+        instances: The number of instances created of every multi-instance object.
+        model: The name of the model to load, e.g. "Device:2.11". Defaults to the first model that is not a service.
+
+    Returns:
+        The model's name and its parameters, sorted by name.
+
+    Raises:
+        ValueError, if the file does not contain a (matching) model.
+    """
+    root = ElementTree.parse(path).getroot()
+    models = [m for m in root if _local(m.tag) == "model"]
+    if model:
+        models = [m for m in models if m.get("name") == model]
+    else:
+        models = [m for m in models if m.get("isService") != "true"] or models
+    if not models:
+        raise ValueError(f"No model {model!r} found in {path}." if model else f"No model found in {path}.")
+
+    parser = _Parser(root)
+    parser.add_items("", models[0])
+    for name in parser.entry_counts:
+        if name in parser.definitions:
+            parser.definitions[name].value = str(instances)
+
+    params = []
+    for name, definition in parser.definitions.items():
+        value = definition.value
+        if value is None:
+            value = _type_defaults.get(definition.type, "")
+        for expanded in _expand(name, instances):
+            params.append(parameters.Parameter(expanded, value, definition.type, writable=definition.writable))
+    params.sort(key=lambda p: p.name)
+    return models[0].get("name"), params
+
+
+def build_index(
+        name: str,
+        params: List[parameters.Parameter],
+        instances: int = 1,
+        source_size: int = 0,
+        source_mtime: int = 0,
+) -> bytes:
+    """
+    Serialize a parsed model into the binary index format read by :py:class:`DataModel`.
+    params must be sorted by name.
+    """
+    strings = bytearray(name.encode())
+    records = bytearray()
+    values = {}
+    for param in params:
+        encoded_name = param.name.encode()
+        name_offset = len(strings)
+        strings += encoded_name
+        # Default values repeat a lot, store each of them once.
+        value_offset = values.get(param.value)
+        if value_offset is None:
+            value_offset = values[param.value] = len(strings)
+            strings += param.value.encode()
+        records += _record.pack(
+            name_offset, len(encoded_name),
+            value_offset, len(param.value.encode()),
+            _type_ids.get(param.type, 0),
+            _WRITABLE if param.writable else 0,
+        )
+    header = _header.pack(MAGIC, len(params), instances, source_size, source_mtime, len(name.encode()))
+    return header + bytes(records) + bytes(strings)
+
+
+class DataModel(collections.abc.Sequence):
+    """
+    A data model loaded from a binary index, usually created with :py:func:`load`.
+
+    Parameters are decoded on access, so opening even a large index is cheap.
+    Each access returns a new :py:class:`tr069.data.parameters.Parameter`.
+    """
+    name: str
+    instances: int
+    source_size: int
+    source_mtime: int
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]):
+        self._buffer = buffer
+        magic, self._count, self.instances, self.source_size, self.source_mtime, name_length = (
+            _header.unpack_from(buffer)
+        )
+        if magic != MAGIC:
+            raise ValueError("Not a data model index.")
+        self._strings = _header.size + self._count * _record.size
+        self.name = bytes(buffer[self._strings:self._strings + name_length]).decode()
+
+    @classmethod
+    def open(cls, path: str) -> "DataModel":
+        """Memory-map an index file."""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __repr__(self):
+        return f"DataModel({self.name}, {len(self)} parameters)"
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._buffer[start:start + length].decode()
+
+    def _name(self, index: int) -> str:
+        name_offset, name_length, *_ = _record.unpack_from(self._buffer, _header.size + index * _record.size)
+        return self._string(name_offset, name_length)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("DataModel index out of range")
+        name_offset, name_length, value_offset, value_length, type_id, flags = _record.unpack_from(
+            self._buffer, _header.size + index * _record.size
+        )
+        return parameters.Parameter(
+            self._string(name_offset, name_length),
+            self._string(value_offset, value_length),
+            TYPES[type_id],
+            writable=bool(flags & _WRITABLE),
+        )
+
+    def _bisect(self, name: str) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(mid) < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get(self, name: str) -> Optional[parameters.Parameter]:
+        """Look up a parameter by name, without decoding any other parameter."""
+        i = self._bisect(name)
+        if i < self._count and self._name(i) == name:
+            return self[i]
+        return None
+
+    def all(self, key: str = "") -> List[parameters.Parameter]:
+        """
+        Like :py:meth:`tr069.data.parameters.Parameters.all`:
+        all parameters in an object if key ends with a dot, otherwise the parameter with the given name.
+        """
+        if key and not key.endswith("."):
+            param = self.get(key)
+            return [param] if param else []
+        start = self._bisect(key)
+        # "/" sorts directly after ".", so this is the first name past all names with the prefix.
+        end = self._bisect(key[:-1] + "/") if key else self._count
+        return self[start:end]
+
+    def to_parameters(self) -> parameters.Parameters:
+        return parameters.Parameters(self[i] for i in range(self._count))
+
+    def to_device(
+            self,
+            manufacturer: str,
+            oui: str,
+            product_class: str,
+            serial: str,
+    ) -> mdevice.Device:
+        """
+        Create a device with all parameters of the model.
+        The DeviceInfo parameters are set to the device's identity.
+        """
+        params = self.to_parameters()
+        root = self.name.partition(":")[0]
+        for field, value in [
+            ("Manufacturer", manufacturer),
+            ("ManufacturerOUI", oui),
+            ("ProductClass", product_class),
+            ("SerialNumber", serial),
+        ]:
+            name = f"{root}.DeviceInfo.{field}"
+            if name in params:
+                params[name].value = value
+        return mdevice.Device(manufacturer, oui, product_class, serial, params)
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def load(
+        path: str,
+        instances: int = 1,
+        *,
+        model: Optional[str] = None,
+        index: Optional[str] = None,
+) -> DataModel:
+    """
+    Load a data model XML definition, or a binary index created by a previous call.
+
+    Args:
+        path: The XML definition or the index.
+        instances: The number of instances created of every multi-instance object.
+        model: The name of the model to load, see :py:func:`parse`.
+        index: The path of the index. Defaults to the XML file's path with an .idx suffix.
+            If the index is missing or outdated, it is (re-)created. If it cannot be written, the model is kept in memory.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) == MAGIC:
+            return DataModel.open(path)
+    if index is None:
+        index = path + ".idx"
+    stat = os.stat(path)
+    try:
+        with open(index, "rb") as f:
+            header = f.read(_header.size)
+        magic, _, indexed_instances, size, mtime, _ = _header.unpack(header)
+        if (magic, indexed_instances, size, mtime) == (MAGIC, instances, stat.st_size, stat.st_mtime_ns):
+            data_model = DataModel.open(index)
+            if model is None or data_model.name == model:
+                return data_model
+            data_model.close()
+    except (OSError, struct.error):
+        pass
+
+    name, params = parse(path, instances, model)
+    data = build_index(name, params, instances, stat.st_size, stat.st_mtime_ns)
+    try:
+        # Write atomically, other processes may be reading the previous index.
+        tmp = f"{index}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, index)
+    except OSError:
+        return DataModel(data)
+    return DataModel.open(index)
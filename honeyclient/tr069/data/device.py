@@ -1,9 +1,17 @@
-import textwrap
 from typing import Optional
 
-from bs4 import BeautifulSoup
-
 from . import parameters
+from . import pullparser
+from .template import Template
+
+DEVICE_ID_TEMPLATE = Template("""
+    <DeviceId>
+        <Manufacturer>{manufacturer}</Manufacturer>
+        <OUI>{oui}</OUI>
+        <ProductClass>{product_class}</ProductClass>
+        <SerialNumber>{serial}</SerialNumber>
+    </DeviceId>
+""", indent=12)
 
 
 class Device:
@@ -43,32 +51,44 @@ class Device:
         )
 
     def to_xml(self) -> str:
-        return textwrap.dedent(f"""
-            <DeviceId>
-                <Manufacturer>{self.manufacturer}</Manufacturer>
-                <OUI>{self.oui}</OUI>
-                <ProductClass>{self.product_class}</ProductClass>
-                <SerialNumber>{self.serial}</SerialNumber>
-            </DeviceId>
-        """).strip()
+        return DEVICE_ID_TEMPLATE.format(
+            manufacturer=self.manufacturer,
+            oui=self.oui,
+            product_class=self.product_class,
+            serial=self.serial,
+        )
 
 
-def from_xml(xml: str) -> Device:
+def from_xml(xml: pullparser.Source) -> Device:
     """Construct a device from an Inform XML."""
-    tree = BeautifulSoup(xml, "html.parser")
-    device = tree.find("DeviceId".lower())
+    device_id = None
+    params = parameters.Parameters()
+    structs = {
+        "deviceid": ("manufacturer", "oui", "productclass", "serialnumber"),
+        "parametervaluestruct": parameters.VALUE_STRUCT_FIELDS,
+    }
+    # Collect the DeviceId and all parameters in a single pass.
+    for tag, struct in pullparser.iter_structs(xml, structs):
+        if tag == "deviceid":
+            if device_id is None:
+                device_id = struct
+        else:
+            param = parameters.from_struct(struct)
+            if param is not None:
+                params[param.name] = param
+    if device_id is None:
+        raise ValueError("No DeviceId found.")
     m, o, p, s = [
-        device.find(x.lower()).get_text(strip=True)
-        for x in ["Manufacturer", "OUI", "ProductClass", "SerialNumber"]
+        device_id.text(x, "")
+        for x in ["manufacturer", "oui", "productclass", "serialnumber"]
     ]
-    params = parameters.from_xml(xml)
     return Device(
         m, o, p, s, params
     )
 
 
 # Taken from https://www.redteam-pentesting.de/en/advisories/rt-sa-2015-005/-o2-telefonica-germany-acs-discloses-voip-sip-credentials
-AVM_FRITZ_BOX_7490 = from_xml("""
+_AVM_FRITZ_BOX_7490_INFORM = """
     <cwmp:Inform>
     <DeviceId>
         <Manufacturer>AVM</Manufacturer>
@@ -137,10 +157,10 @@ AVM_FRITZ_BOX_7490 = from_xml("""
         </ParameterValueStruct>
     </ParameterList>
     </cwmp:Inform>
-""")
+"""
 
 # OpenWRT with freecwmp (default configuration)
-FREECWMP = from_xml("""
+_FREECWMP_INFORM = """
 <cwmp:Inform><DeviceId><Manufacturer>freecwmp</Manufacturer><OUI>FFFFFF</OUI><ProductClass>freecwmp</ProductClass><SerialNumber>FFFFFF123456</SerialNumber></DeviceId><Event
 soap_enc:arrayType="cwmp:EventStruct[2]"><EventStruct><EventCode>0 BOOTSTRAP</EventCode><CommandKey /></EventStruct><EventStruct><EventCode>1 BOOT</EventCode><CommandKey /></EventStruct></Event><MaxEnvelopes>1</MaxEnvelopes><CurrentTime>2017-01-09T17:40:23+0000</CurrentTime><RetryCount>1</RetryCount><ParameterList
 soap_enc:arrayType="cwmp:ParameterValueStruct[11]"><ParameterValueStruct><Name>InternetGatewayDevice.DeviceInfo.SpecVersion</Name>
@@ -155,6 +175,26 @@ soap_enc:arrayType="cwmp:ParameterValueStruct[11]"><ParameterValueStruct><Name>I
 <Value xsi:type="xsd:string" /></ParameterValueStruct><ParameterValueStruct><Name>InternetGatewayDevice.ManagementServer.ConnectionRequestURL</Name>
 <Value xsi:type="xsd:string" /></ParameterValueStruct><ParameterValueStruct><Name>InternetGatewayDevice.WANDevice.1.WANConnectionDevice.1.WANIPConnection.1.ExternalIPAddress</Name>
 <Value xsi:type="xsd:string" /></ParameterValueStruct></ParameterList></cwmp:Inform>
-""")
+"""
 
-DEFAULT = AVM_FRITZ_BOX_7490
+_INFORMS = {
+    "AVM_FRITZ_BOX_7490": _AVM_FRITZ_BOX_7490_INFORM,
+    "FREECWMP": _FREECWMP_INFORM,
+}
+_ALIASES = {
+    "DEFAULT": "AVM_FRITZ_BOX_7490",
+}
+
+
+def __getattr__(name: str) -> Device:
+    """
+    The built-in devices AVM_FRITZ_BOX_7490, FREECWMP and DEFAULT are only parsed from their Informs on first access,
+    which keeps importing this module cheap.
+    """
+    profile = _ALIASES.get(name, name)
+    if profile not in _INFORMS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if profile not in globals():
+        globals()[profile] = from_xml(_INFORMS[profile])
+    globals()[name] = globals()[profile]
+    return globals()[name]
@@ -0,0 +1,105 @@
+import re
+from typing import Any, Dict, Optional
+
+import requests
+
+from . import rpcs
+from . import soap
+
+_unset = object()
+
+header_rex = re.compile(r"<((?:[-\w]+:)?)Header\b[^>]*>(.*?)</\1Header\s*>", re.IGNORECASE | re.DOTALL)
+header_field_rex = re.compile(r"<([-\w:.]+)[^>]*?(?:/>|>(.*?)</\1\s*>)", re.DOTALL)
+
+
+def decode(response: requests.Response) -> str:
+    """
+    Decode the body of a response.
+
+    CWMP messages are encoded as UTF-8, so bodies without a declared charset are decoded as UTF-8
+    instead of letting requests guess the encoding, which runs charset detection over the entire body
+    on every access of Response.text. Only bodies that are not valid UTF-8 fall back to detection.
+    The response is not modified, so that it can be decoded from several threads, e.g. by a :py:class:`tr069.util.FlowLogger`.
+    """
+    content = response.content
+    if "charset" in response.headers.get("Content-Type", "").lower():
+        encoding = requests.utils.get_encoding_from_headers(response.headers)
+        if encoding:
+            try:
+                return str(content, encoding, errors="replace")
+            except LookupError:
+                pass
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return str(content, response.apparent_encoding or "utf-8", errors="replace")
+
+
+class Envelope:
+    """
+    A SOAP envelope, e.g. an RPC sent by the ACS.
+
+    The envelope is parsed lazily: each field is computed on first access and then cached,
+    so that dispatching an RPC, parsing its arguments and re-using its cwmp:ID only pay for parsing once.
+    """
+    response: Optional[requests.Response]
+
+    def __init__(self, xml: Optional[str] = None, response: Optional[requests.Response] = None):
+        """
+        Args:
+            xml: The envelope.
+            response: Alternatively, a response containing the envelope.
+                Its body is only decoded when needed, and at most once, see :py:func:`decode`.
+        """
+        if (xml is None) == (response is None):
+            raise ValueError("Either xml or response must be passed.")
+        self.response = response
+        self._xml = xml
+        self._rpc_name = _unset
+        self._cwmp_id = _unset
+        self._header = None
+        self._arguments = _unset
+
+    def __repr__(self):
+        return f"Envelope({self.rpc_name})"
+
+    @property
+    def xml(self) -> str:
+        if self._xml is None:
+            self._xml = decode(self.response)
+        return self._xml
+
+    @property
+    def rpc_name(self) -> Optional[str]:
+        """The name of the RPC in the envelope's body, e.g. cwmp:GetParameterValues."""
+        if self._rpc_name is _unset:
+            self._rpc_name = soap.extract_rpc_name(self.xml)
+        return self._rpc_name
+
+    @property
+    def cwmp_id(self) -> Optional[str]:
+        if self._cwmp_id is _unset:
+            self._cwmp_id = soap.get_cwmp_id(self.xml)
+        return self._cwmp_id
+
+    @property
+    def header(self) -> Dict[str, str]:
+        """All fields in the SOAP header, e.g. {"cwmp:ID": "1", "cwmp:HoldRequests": "0"}."""
+        if self._header is None:
+            self._header = {}
+            header = header_rex.search(self.xml)
+            if header:
+                for name, value in header_field_rex.findall(header.group(2)):
+                    self._header[name] = value.strip()
+        return self._header
+
+    @property
+    def arguments(self) -> Any:
+        """
+        The parsed arguments of the RPC, as returned by the respective parser in rpcs.PARSERS,
+        or None if the RPC is unknown.
+        """
+        if self._arguments is _unset:
+            parser = rpcs.PARSERS.get(self.rpc_name, None)
+            self._arguments = parser(self.xml) if parser else None
+        return self._arguments
@@ -1,7 +1,14 @@
-import textwrap
 from typing import List
 
-from bs4 import BeautifulSoup
+from . import pullparser
+from .template import Template
+
+EVENT_STRUCT_TEMPLATE = Template("""
+    <EventStruct>
+        <EventCode>{code}</EventCode>
+        <CommandKey>{command_key}</CommandKey>
+    </EventStruct>
+""", indent=12)
 
 
 class Event:
@@ -23,23 +30,17 @@ class Event:
         return f"Event({self.code})"
 
     def to_xml(self) -> str:
-        return textwrap.dedent(f"""
-            <EventStruct>
-                <EventCode>{self.code}</EventCode>
-                <CommandKey>{self.command_key}</CommandKey>
-            </EventStruct>
-        """).strip()
+        return EVENT_STRUCT_TEMPLATE.format(code=self.code, command_key=self.command_key)
 
 
-def from_xml(xml: str) -> List[Event]:
-    tree = BeautifulSoup(xml, "html.parser")
-    nodes = tree.find_all("EventStruct".lower())
+def from_xml(xml: pullparser.Source) -> List[Event]:
+    structs = {"eventstruct": ("eventcode", "commandkey")}
     return [
         Event(
-            node.find("eventcode").get_text(strip=True),
-            node.find("commandkey").get_text(strip=True),
+            struct.text("eventcode", ""),
+            struct.text("commandkey", ""),
         )
-        for node in nodes
+        for _, struct in pullparser.iter_structs(xml, structs)
     ]
 
 
@@ -1,8 +1,12 @@
+import array
+import bisect
 import collections.abc
+import sys
 import textwrap
-from typing import List, Union, Dict, Iterable
+from typing import List, Union, Dict, Iterable, Iterator, Optional, Set, Tuple
 
-from bs4 import BeautifulSoup
+from . import pullparser
+from .template import Template
 
 REQUIRED_INFORM_PARAMETERS = [
     "InternetGatewayDevice.DeviceSummary",
@@ -15,16 +19,34 @@ REQUIRED_INFORM_PARAMETERS = [
     "InternetGatewayDevice.WANDevice.1.WANConnectionDevice.1.WANIPConnection.1.ExternalIPAddress",
 ]
 
+VALUE_STRUCT_TEMPLATE = Template("""
+    <ParameterValueStruct>
+        <Name>{name}</Name>
+        <Value xsi:type="{type}">{value}</Value>
+    </ParameterValueStruct>
+""", indent=12)
+INFO_STRUCT_TEMPLATE = Template("""
+    <ParameterInfoStruct>
+        <Name>{name}</Name>
+        <Writable>{writable}</Writable>
+    </ParameterInfoStruct>
+""", indent=12)
+
 
 class Parameter:
     """
     A TR-069 ParameterValueStruct.
     Represents a parameter on the device as specified by the TR-069 data models.
+
+    Parameters are slotted and their names and types are interned,
+    so that large data models and many devices with the same data model share their strings.
     """
+    __slots__ = ("name", "value", "type", "notification_level", "writable")
     name: str
     value: str
     type: str
     notification_level: int
+    writable: bool
 
     def __init__(
             self,
@@ -34,9 +56,9 @@ class Parameter:
             notification_level: int = 0,
             writable: bool = True,
     ):
-        self.name = name
+        self.name = sys.intern(name)
         self.value = value
-        self.type = type
+        self.type = sys.intern(type)
         self.notification_level = notification_level
         self.writable = writable
 
@@ -46,30 +68,82 @@ class Parameter:
         return f'Parameter({notify}{self.name}{type} = "{self.value}")'
 
     def to_xml(self) -> str:
-        return textwrap.dedent(f"""
-            <ParameterValueStruct>
-                <Name>{self.name}</Name>
-                <Value xsi:type="{self.type}">{self.value}</Value>
-            </ParameterValueStruct>
-        """).strip()
+        return VALUE_STRUCT_TEMPLATE.format(name=self.name, type=self.type, value=self.value)
 
     def to_info_xml(self) -> str:
-        return textwrap.dedent(f"""
-            <ParameterInfoStruct>
-                <Name>{self.name}</Name>
-                <Writable>{int(self.writable)}</Writable>
-            </ParameterInfoStruct>
-        """).strip()
+        return INFO_STRUCT_TEMPLATE.format(name=self.name, writable=int(self.writable))
+
+
+def _prefix_range(index: List[str], prefix: str) -> Tuple[int, int]:
+    """The slice of a sorted list of names that contains all names starting with prefix, which ends with a dot."""
+    # All names starting with "foo." sort between "foo." and "foo/".
+    start = bisect.bisect_left(index, prefix)
+    end = bisect.bisect_left(index, prefix[:-1] + "/", start)
+    return start, end
+
+
+def _index_insert(index: List[str], seqs: array.array, name: str, seq: int) -> None:
+    """Insert a name and its insertion sequence number into a sorted list of names and the parallel array."""
+    i = bisect.bisect_left(index, name)
+    index.insert(i, name)
+    seqs.insert(i, seq)
+
+
+def _index_remove(index: List[str], seqs: array.array, name: str) -> None:
+    i = bisect.bisect_left(index, name)
+    del index[i]
+    del seqs[i]
+
+
+def _insertion_order(index: List[str], seqs: array.array, start: int, end: int) -> List[str]:
+    """The names in a slice of a sorted list of names, in the order they were inserted."""
+    return [index[i] for i in sorted(range(start, end), key=seqs.__getitem__)]
+
+
+def _child_names(index: List[str], start: int, end: int, key: str) -> Iterator[str]:
+    """
+    The names of the direct children of key in a slice of a sorted list of names.
+    Objects are returned once, as their partial path ending with a dot.
+    """
+    i = start
+    while i < end:
+        name = index[i]
+        dot = name.find(".", len(key))
+        if dot == -1:
+            yield name
+            i += 1
+        else:
+            yield name[:dot + 1]
+            # Skip over all other parameters of this object.
+            i = bisect.bisect_left(index, name[:dot] + "/", i, end)
 
 
 class Parameters(collections.abc.MutableMapping):
     """
     A collection of TR-069 parameters representing a device.
+
+    Prefix queries are answered from a sorted index of all parameter names,
+    which is built on the first query and then kept up to date.
+    The index also records the insertion order, so that results are ordered like the parameters themselves.
+
+    Value changes of parameters with passive or active notification are recorded as they are written,
+    so that the next Inform can report them without scanning the data model, see :py:meth:`changes`.
+    Assigning a string keeps the type and attributes of an existing parameter.
+    Changing the value attribute of a parameter directly bypasses the change tracking.
     """
     _dict: Dict[str, Parameter]
+    _index: Optional[List[str]]
+    # The insertion sequence numbers of the names in _index.
+    _seqs: Optional[array.array]
+    _seq: int
+    _changes: Dict[str, Parameter]
 
     def __init__(self, params: Iterable[Parameter] = (), **kwargs: Dict[str, str]):
         self._dict = {}
+        self._index = None
+        self._seqs = None
+        self._seq = 0
+        self._changes = {}
         for param in params:
             self[param.name] = param
         self.update(**kwargs)
@@ -77,18 +151,114 @@ class Parameters(collections.abc.MutableMapping):
     def __getitem__(self, key: str) -> Parameter:
         return self._dict[key]
 
+    def __contains__(self, key: object) -> bool:
+        return self._get(key) is not None
+
     def __setitem__(self, key: str, value: Union[str, Parameter]):
         if isinstance(value, str):
-            self._dict[key] = Parameter(key, value)
-        elif isinstance(value, Parameter):
-            if key != value.name:
-                raise ValueError(f"Key ({key}) does not match parameter name ({value.name})")
-            self._dict[key] = value
-        else:
+            self.set_value(key, value)
+            return
+        elif not isinstance(value, Parameter):
             raise TypeError(f"Expected str or Parameter, but got {type(value)} instead.")
+        if key != value.name:
+            raise ValueError(f"Key ({key}) does not match parameter name ({value.name})")
+        self._store(value, True)
 
     def __delitem__(self, key: str):
         del self._dict[key]
+        self._changes.pop(key, None)
+        self._remove_name(key)
+
+    def _get(self, key: str) -> Optional[Parameter]:
+        return self._dict.get(key)
+
+    def _values(self) -> Iterable[Parameter]:
+        return self._dict.values()
+
+    def _insert_name(self, name: str) -> None:
+        """Called before a new parameter is stored."""
+        if self._index is not None:
+            _index_insert(self._index, self._seqs, name, self._seq)
+            self._seq += 1
+
+    def _remove_name(self, name: str) -> None:
+        """Called after a parameter has been deleted."""
+        if self._index is not None:
+            _index_remove(self._index, self._seqs, name)
+
+    def _store(self, param: Parameter, notify: bool) -> None:
+        old = self._get(param.name)
+        if old is None:
+            self._insert_name(param.name)
+        elif notify and param.notification_level > 0 and param.value != old.value:
+            self._changes[param.name] = param
+        elif param.name in self._changes:
+            # Keep the recorded change up to date, e.g. if the attributes changed.
+            self._changes[param.name] = param
+        self._dict[param.name] = param
+
+    def set_value(self, key: str, value: str, type: Optional[str] = None, *, notify: bool = True) -> None:
+        """
+        Set the value of a parameter, keeping the attributes of an existing parameter.
+
+        Args:
+            key: The parameter name.
+            value: The new value.
+            type: The new type. Defaults to the existing parameter's type or xsd:string.
+            notify: If false, the change is not recorded for notification,
+                which is how changes requested by the ACS itself are treated.
+        """
+        old = self._get(key)
+        if old is None:
+            param = Parameter(key, value, type or "xsd:string")
+        else:
+            param = Parameter(key, value, type or old.type, old.notification_level, old.writable)
+        self._store(param, notify)
+
+    def set_notification(self, key: str, notification_level: int) -> int:
+        """
+        Set the notification attribute, as requested by SetParameterAttributes:
+        0 (off), 1 (passive) or 2 (active).
+
+        Args:
+            key: A parameter name, or a partial path ending with a dot for all parameters of an object.
+            notification_level: The new notification level.
+
+        Returns:
+            The number of updated parameters.
+        """
+        params = self.all(key)
+        for p in params:
+            # Parameters are replaced instead of modified as they may be shared with other devices.
+            self._store(Parameter(p.name, p.value, p.type, notification_level, p.writable), False)
+            if notification_level == 0:
+                self._changes.pop(p.name, None)
+        return len(params)
+
+    def changes(self, min_notification_level: int = 1) -> List[Parameter]:
+        """
+        The parameters whose values have changed since their changes were last cleared,
+        in the order of their first change. This takes time proportional to the number of changes.
+
+        Args:
+            min_notification_level: 1 for all changes, 2 for changes that need to be reported immediately.
+        """
+        return [p for p in self._changes.values() if p.notification_level >= min_notification_level]
+
+    def clear_changes(self, params: Optional[Iterable[Parameter]] = None) -> None:
+        """
+        Forget recorded changes, e.g. once they have been reported to the ACS.
+
+        Args:
+            params: The changes to forget, as returned by :py:meth:`changes`.
+                Parameters that have changed again since are kept. By default, all changes are forgotten.
+        """
+        if params is None:
+            self._changes.clear()
+            return
+        for param in params:
+            if self._changes.get(param.name) is param:
+                del self._changes[param.name]
 
     def __iter__(self):
         return iter(self._dict)
@@ -104,40 +274,210 @@ class Parameters(collections.abc.MutableMapping):
             f"""
             Parameters({{
                 {''',
-                '''.join(f'"{p.name}": "{p.value}"' for p in self._dict.values())}
+                '''.join(f'"{p.name}": "{p.value}"' for p in self._values())}
             }})"""
         ).strip()
 
+    def _range(self, prefix: str) -> Tuple[List[str], int, int]:
+        """
+        Returns:
+            The sorted index and the slice of it that contains all names starting with prefix,
+            which is either empty or ends with a dot.
+        """
+        if self._index is None:
+            names = list(self._dict)
+            order = sorted(range(len(names)), key=names.__getitem__)
+            self._index = [names[i] for i in order]
+            self._seqs = array.array("Q", order)
+            self._seq = len(names)
+        if not prefix:
+            return self._index, 0, len(self._index)
+        start, end = _prefix_range(self._index, prefix)
+        return self._index, start, end
+
+    def _names(self, prefix: str) -> Iterable[str]:
+        """The names of all parameters starting with prefix, which ends with a dot, in insertion order."""
+        index, start, end = self._range(prefix)
+        return _insertion_order(index, self._seqs, start, end)
+
     def all(self, key: str = "", min_notification_level: int = 0) -> List[Parameter]:
         """
         Returns:
             A list containing...
              - all parameter starting with the common prefix key, if key is empty or ends with a dot.
              - the requested parameter key.
+            Parameters are ordered by insertion.
         """
-        if key == "" or key.endswith("."):
-            matches = lambda param: param.startswith(key)
+        if key == "":
+            matches = self._values()
+        elif key.endswith("."):
+            matches = [self[name] for name in self._names(key)]
         else:
-            matches = lambda param: param == key
+            param = self._get(key)
+            matches = [param] if param is not None else []
         return [
             param
-            for param in self._dict.values()
-            if matches(param.name) and param.notification_level >= min_notification_level
+            for param in matches
+            if param.notification_level >= min_notification_level
         ]
 
+    def next_level(self, key: str = "") -> List[Parameter]:
+        """
+        The direct children of a partial path, as requested by GetParameterNames with NextLevel set to true.
+        Objects are represented by non-writable placeholder parameters whose names end with a dot.
 
-def from_xml(xml: str) -> Parameters:
+        Args:
+            key: A partial path, e.g. "InternetGatewayDevice.", or the empty string for the root object.
+        """
+        if key and not key.endswith("."):
+            return self.all(key)
+        index, start, end = self._range(key)
+        return [
+            self._dict[name] if name[-1] != "." else Parameter(name, "", writable=False)
+            for name in _child_names(index, start, end, key)
+        ]
+
+
+class LayeredParameters(Parameters):
+    """
+    Copy-on-write parameters: a shared base model and an overlay that only holds what differs,
+    e.g. a device's serial number, addresses and the values written by the ACS.
+
+    Many devices of the same model can share one base, so that each additional device
+    only needs memory for its own changes. The base and its parameters must not be modified
+    while layers use them; all writes to a layer, including deletions, only affect its overlay.
+    """
+    base: Parameters
+    _deleted: Set[str]
+
+    def __init__(self, base: Parameters, params: Iterable[Parameter] = (), **kwargs: Dict[str, str]):
+        """
+        Args:
+            base: The shared base model.
+            params: Parameters stored in the overlay.
+            **kwargs: Values stored in the overlay.
+        """
+        self.base = base
+        # The overlay is stored in _dict, _index holds the sorted names of parameters that are not in the base.
+        self._dict = {}
+        self._index = []
+        self._seqs = array.array("Q")
+        self._seq = 0
+        self._changes = {}
+        self._deleted = set()
+        for param in params:
+            self[param.name] = param
+        self.update(**kwargs)
+
+    def __getitem__(self, key: str) -> Parameter:
+        param = self._get(key)
+        if param is None:
+            raise KeyError(key)
+        return param
+
+    def __iter__(self):
+        deleted = self._deleted
+        for name in self.base:
+            if name not in deleted:
+                yield name
+        yield from _insertion_order(self._index, self._seqs, 0, len(self._index))
+
+    def __len__(self):
+        return len(self.base) - len(self._deleted) + len(self._index)
+
+    def __repr__(self):
+        return f"LayeredParameters({len(self)} values, {len(self._dict)} in overlay)"
+
+    def __delitem__(self, key: str):
+        if self._get(key) is None:
+            raise KeyError(key)
+        self._dict.pop(key, None)
+        self._changes.pop(key, None)
+        self._remove_name(key)
+
+    def _get(self, key: str) -> Optional[Parameter]:
+        param = self._dict.get(key)
+        if param is None and key not in self._deleted:
+            param = self.base._get(key)
+        return param
+
+    def _values(self) -> Iterable[Parameter]:
+        return [self._get(name) for name in self]
+
+    def _insert_name(self, name: str) -> None:
+        if name in self._deleted:
+            self._deleted.discard(name)
+        else:
+            _index_insert(self._index, self._seqs, name, self._seq)
+            self._seq += 1
+
+    def _remove_name(self, name: str) -> None:
+        if self.base._get(name) is not None:
+            self._deleted.add(name)
+        else:
+            _index_remove(self._index, self._seqs, name)
+
+    def _names(self, prefix: str) -> Iterable[str]:
+        own = _insertion_order(self._index, self._seqs, *_prefix_range(self._index, prefix))
+        deleted = self._deleted
+        base = self.base._names(prefix)
+        if deleted:
+            base = [name for name in base if name not in deleted]
+        if not own:
+            return base
+        return [*base, *own]
+
+    def next_level(self, key: str = "") -> List[Parameter]:
+        if key and not key.endswith("."):
+            return self.all(key)
+        children = {p.name: p for p in self.base.next_level(key)}
+        if self._index:
+            start, end = _prefix_range(self._index, key) if key else (0, len(self._index))
+            for name in _child_names(self._index, start, end, key):
+                children.setdefault(name, Parameter(name, "", writable=False))
+        for name in self._deleted:
+            if name.startswith(key):
+                dot = name.find(".", len(key))
+                child = name if dot == -1 else name[:dot + 1]
+                if dot == -1 or not self.all(child):
+                    children.pop(child, None)
+        return [
+            self._dict.get(name, param) if name[-1] != "." else param
+            for name, param in sorted(children.items())
+        ]
+
+
+VALUE_STRUCT_FIELDS = ("name", "value")
+
+
+def from_struct(struct: pullparser.Struct) -> Optional[Parameter]:
+    """
+    Construct a parameter from the fields of a ParameterValueStruct.
+    """
+    name = struct.text("name")
+    if name is None:
+        return None
+    return Parameter(
+        name,
+        struct.text("value", ""),
+        struct.attr("value", "xsi:type") or "xsd:string"
+    )
+
+
+def iter_from_xml(xml: pullparser.Source) -> Iterator[Parameter]:
+    """
+    Yield a parameter for every ParameterValueStruct in the XML as soon as the struct is closed.
+    The XML may also be passed as an iterable of chunks.
+    """
+    for _, struct in pullparser.iter_structs(xml, {"parametervaluestruct": VALUE_STRUCT_FIELDS}):
+        param = from_struct(struct)
+        if param is not None:
+            yield param
+
+
+def from_xml(xml: pullparser.Source) -> Parameters:
     """
     Construct a parameters object from XML that contains a ParameterValueStruct, 
     e.g., an Inform RPC.
     """
-    tree = BeautifulSoup(xml, "html.parser")
-    nodes = tree.find_all("ParameterValueStruct".lower())
-    return Parameters(
-        Parameter(
-            node.find("name").get_text(strip=True),
-            node.find("value").get_text(strip=True),
-            node.find("value").get("xsi:type") or "xsd:string"
-        )
-            for node in nodes
-    )
+    return Parameters(iter_from_xml(xml))
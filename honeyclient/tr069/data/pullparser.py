@@ -0,0 +1,257 @@
+"""
+A fast and tolerant pull parser for the XML spoken by CPEs and ACSs.
+
+Instead of building a tree, the parser emits start, end and data events, and the helpers
+in this module only collect the text of the elements we are interested in.
+Like html.parser, which was used before, it ignores namespaces, lowercases tag and attribute names,
+drops stray end tags and implicitly closes unclosed elements.
+The emitted events are always well-nested.
+"""
+import html
+import re
+from typing import Iterable, Iterator, List, Tuple, Union, Optional, Dict, Collection, Mapping
+
+Source = Union[str, Iterable[str]]
+Event = Tuple[str, Optional[str], Optional[str]]
+
+_markup_rex = re.compile(r"""
+    <(/?)([a-zA-Z][^\s/>]*)((?:[^>"']|"[^"]*"|'[^']*')*)>  # start or end tag
+    | <!--.*?-->                                            # comment
+    | <!\[CDATA\[(.*?)\]\]>                                 # CDATA section
+    | </\s+([a-zA-Z][-.a-zA-Z0-9:_]*)\s*>                   # end tag with leading whitespace
+    | <[!?/][^>]*>                                          # doctype, processing instruction, bogus comment
+""", re.VERBOSE | re.DOTALL)
+
+_attr_rex = re.compile(r"""([^\s=/>]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]+))?""")
+
+
+def _is_unterminated(markup: str) -> bool:
+    # Terminated comments and CDATA sections are matched by their own alternatives in _markup_rex.
+    return markup.startswith("<![CDATA[") or (markup.startswith("<!--") and not markup.endswith("-->"))
+
+
+def parse_attrs(raw: str) -> Dict[str, Optional[str]]:
+    """
+    Parse the raw attribute string of a start event.
+    """
+    attrs = {}
+    for name, value in _attr_rex.findall(raw):
+        if value[:1] in ("'", '"'):
+            value = value[1:-1]
+        if "&" in value:
+            value = html.unescape(value)
+        attrs.setdefault(name.lower(), value)
+    return attrs
+
+
+class PullParser:
+    """
+    An incremental parser. Feed it with str chunks and read the events that became available.
+
+    Events are (event, tag, value) tuples:
+     - ("start", tag, raw_attributes), see parse_attrs(),
+     - ("end", tag, None),
+     - ("data", None, text), with entities already resolved.
+    """
+    _buffer: str
+    _stack: List[str]
+    _events: List[Event]
+
+    def __init__(self):
+        self._buffer = ""
+        self._stack = []
+        self._events = []
+
+    def feed(self, data: str) -> None:
+        self._buffer += data
+        self._events.extend(self._parse(final=False))
+
+    def close(self) -> None:
+        self._events.extend(self._parse(final=True))
+
+    def read_events(self) -> Iterator[Event]:
+        events, self._events = self._events, []
+        return iter(events)
+
+    def _parse(self, final: bool) -> Iterator[Event]:
+        buf = self._buffer
+        stack = self._stack
+        pos = 0
+        for match in _markup_rex.finditer(buf):
+            start = match.start()
+            if start > pos:
+                text = buf[pos:start]
+                yield "data", None, html.unescape(text) if "&" in text else text
+            pos = match.end()
+
+            tag = match.group(2) or match.group(5)
+            if tag is not None:
+                tag = tag.lower()
+                if match.group(1) or match.group(5):
+                    if tag in stack:
+                        while True:
+                            opened = stack.pop()
+                            yield "end", opened, None
+                            if opened == tag:
+                                break
+                else:
+                    attrs = match.group(3)
+                    yield "start", tag, attrs
+                    if attrs.endswith("/"):
+                        yield "end", tag, None
+                    else:
+                        stack.append(tag)
+            elif match.group(4) is not None:
+                yield "data", None, match.group(4)
+            elif _is_unterminated(match.group(0)):
+                # A comment or CDATA section that has not been terminated (yet).
+                # Wait for more data, or treat it as text if there is none.
+                pos = start
+                break
+
+        if final:
+            if pos < len(buf):
+                text = buf[pos:]
+                yield "data", None, html.unescape(text) if "&" in text else text
+            while stack:
+                yield "end", stack.pop(), None
+            self._buffer = ""
+        else:
+            # Keep trailing text, it may end in an incomplete tag or entity reference.
+            self._buffer = buf[pos:]
+
+
+def iterparse(source: Source) -> Iterator[Event]:
+    """
+    Iterate over the events of a document, which is either a str or an iterable of str chunks.
+    """
+    parser = PullParser()
+    if isinstance(source, str):
+        source = (source,)
+    for chunk in source:
+        parser._buffer += chunk
+        yield from parser._parse(final=False)
+    yield from parser._parse(final=True)
+
+
+class Struct:
+    """
+    The text and attributes of the fields collected from an element,
+    see iter_structs() and parse_struct().
+    Each field is stored as a [text, raw attributes] pair.
+    Text follows BeautifulSoup's get_text(strip=True) semantics.
+    """
+    __slots__ = ("fields",)
+    fields: Dict[str, List[List[str]]]
+
+    def __init__(self):
+        self.fields = {}
+
+    def __repr__(self):
+        return f"Struct({self.fields})"
+
+    def text(self, tag: str, default: Optional[str] = None) -> Optional[str]:
+        """The text of the first field named tag."""
+        values = self.fields.get(tag)
+        if values:
+            return values[0][0]
+        return default
+
+    def texts(self, tag: str) -> List[str]:
+        """The text of all fields named tag."""
+        return [text for text, _ in self.fields.get(tag, ())]
+
+    def attr(self, tag: str, name: str, default: Optional[str] = None) -> Optional[str]:
+        """An attribute of the first field named tag."""
+        values = self.fields.get(tag)
+        if values:
+            return parse_attrs(values[0][1]).get(name, default)
+        return default
+
+
+class _Collector:
+    """Collects the fields of a single struct from a stream of well-nested events."""
+
+    def __init__(self, fields: Collection[str]):
+        self.fields = fields
+        self.struct = Struct()
+        self._stack = []  # one entry per open element: None or a (text pieces, field) capture.
+        self._captures = []
+
+    def handle(self, event: str, tag: Optional[str], value: Optional[str]) -> bool:
+        """
+        Process an event.
+
+        Returns:
+            True if the struct element has been closed.
+        """
+        if event == "data":
+            for pieces, _ in self._captures:
+                pieces.append(value)
+        elif event == "start":
+            if tag in self.fields:
+                # Add the field right away so that nested fields are ordered by their start tag.
+                field = ["", value]
+                self.struct.fields.setdefault(tag, []).append(field)
+                capture = ([], field)
+                self._captures.append(capture)
+                self._stack.append(capture)
+            else:
+                self._stack.append(None)
+        else:
+            if not self._stack:
+                return True
+            capture = self._stack.pop()
+            if capture is not None:
+                self._captures.pop()
+                pieces, field = capture
+                field[0] = "".join(x.strip() for x in pieces)
+        return False
+
+
+def iter_structs(source: Source, structs: Mapping[str, Collection[str]]) -> Iterator[Tuple[str, Struct]]:
+    """
+    Yield a (tag, Struct) tuple whenever an element in structs is closed.
+
+    If structs are nested, which happens if a struct's end tag is malformed,
+    they are yielded in document order once the outermost struct is closed.
+
+    Args:
+        source: The document, either as a str or as an iterable of str chunks.
+        structs: A mapping from lowercase element names to the descendant element names that should be collected.
+    """
+    active = []  # (position, tag, collector) for all currently open structs, outermost first.
+    nested = []  # closed structs that are nested in a struct that is still open.
+    position = 0
+    for event, name, value in iterparse(source):
+        if active:
+            closed = False
+            for _, _, collector in active:
+                closed |= collector.handle(event, name, value)
+            if closed:
+                # Events are well-nested, so it's always the innermost struct that is closed.
+                entry = active.pop()
+                if active:
+                    nested.append(entry)
+                else:
+                    if nested:
+                        nested.append(entry)
+                        nested.sort(key=lambda x: x[0])
+                        for _, tag, collector in nested:
+                            yield tag, collector.struct
+                        nested.clear()
+                    else:
+                        yield entry[1], entry[2].struct
+        if event == "start" and name in structs:
+            active.append((position, name, _Collector(structs[name])))
+            position += 1
+
+
+def parse_struct(source: Source, fields: Collection[str]) -> Struct:
+    """
+    Collect fields from the entire document.
+    """
+    collector = _Collector(fields)
+    for event, name, value in iterparse(source):
+        collector.handle(event, name, value)
+    return collector.struct
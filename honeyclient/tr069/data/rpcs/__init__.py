@@ -2,18 +2,27 @@ from .get_set_parameters import (
     make_set_parameter_values_response, parse_set_parameter_values,
     make_get_parameter_values_response, parse_get_parameter_values,
     make_get_parameter_names_response, parse_get_parameter_names,
-    make_set_parameter_attributes_response,
+    make_set_parameter_attributes_response, parse_set_parameter_attributes,
 )
-from .inform import make_inform
+from .inform import make_inform, InformBuilder
 from .request_download import make_request_download, make_download_response
 from .rpc_methods import make_get_rpc_methods
 
+PARSERS = {
+    "cwmp:SetParameterValues": parse_set_parameter_values,
+    "cwmp:GetParameterValues": parse_get_parameter_values,
+    "cwmp:GetParameterNames": parse_get_parameter_names,
+    "cwmp:SetParameterAttributes": parse_set_parameter_attributes,
+}
+"""Parsers for the arguments of server RPCs, by RPC name."""
+
 __all__ = [
     "make_get_rpc_methods",
-    "make_inform",
+    "make_inform", "InformBuilder",
     "make_set_parameter_values_response", "parse_set_parameter_values",
     "make_get_parameter_values_response", "parse_get_parameter_values",
     "make_get_parameter_names_response", "parse_get_parameter_names",
-    "make_set_parameter_attributes_response",
+    "make_set_parameter_attributes_response", "parse_set_parameter_attributes",
     "make_request_download", "make_download_response",
+    "PARSERS",
 ]
@@ -1,8 +1,7 @@
-from typing import Collection, List, Tuple
-
-from bs4 import BeautifulSoup
+from typing import Collection, List, Optional, Tuple
 
 from .. import parameters
+from .. import pullparser
 from .. import soap
 
 
@@ -32,9 +31,9 @@ def parse_get_parameter_values(xml: str) -> List[str]:
     Returns:
         List of requested parameters.
     """
-    tree = BeautifulSoup(xml, "html.parser")
-    params = tree.find("ParameterNames".lower()).find_all("string")
-    return [x.get_text(strip=True) for x in params]
+    for _, struct in pullparser.iter_structs(xml, {"parameternames": ("string",)}):
+        return struct.texts("string")
+    raise ValueError("No ParameterNames found.")
 
 
 def make_get_parameter_values_response(params: Collection[parameters.Parameter] = ()) -> str:
@@ -48,6 +47,27 @@ def make_get_parameter_values_response(params: Collection[parameters.Parameter]
     """)
 
 
+def parse_set_parameter_attributes(xml: str) -> List[Tuple[str, Optional[int]]]:
+    """
+    Parse a SetParameterAttributes RPC.
+
+    Returns:
+        List of (name, notification level) tuples.
+        The notification level is None if NotificationChange is false.
+    """
+    structs = {"setparameterattributesstruct": ("name", "notificationchange", "notification")}
+    attributes = []
+    for _, struct in pullparser.iter_structs(xml, structs):
+        name = struct.text("name")
+        if name is None:
+            continue
+        notification = None
+        if struct.text("notificationchange", "").lower() in ("true", "1"):
+            notification = int(struct.text("notification") or 0)
+        attributes.append((name, notification))
+    return attributes
+
+
 def make_set_parameter_attributes_response() -> str:
     """Make a SetParameterAttributesResponse"""
     return soap.soapify("<cwmp:SetParameterAttributesResponse />")
@@ -60,14 +80,14 @@ def parse_get_parameter_names(xml: str) -> Tuple[str, bool]:
     Returns:
         A (path, next_level) tuple.
     """
-    tree = BeautifulSoup(xml, "html.parser")
-    path = tree.find("ParameterPath".lower()).get_text(strip=True)
+    struct = pullparser.parse_struct(xml, ("parameterpath", "nextlevel"))
+    path = struct.text("parameterpath", "")
     next_level = {
         "true": True,
         "1": True,
         "false": False,
         "0": False
-    }[tree.find("NextLevel".lower()).get_text(strip=True).lower()]
+    }[struct.text("nextlevel", "").lower()]
     return path, next_level
 
 
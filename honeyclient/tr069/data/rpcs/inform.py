@@ -1,45 +1,194 @@
 import datetime
+import re
 import warnings
-from typing import Optional, Collection
+from typing import Optional, Collection, Dict, List, Sequence, Tuple
 
 from .. import device
 from .. import event as mevents
 from .. import parameters
 from .. import soap
 
+DEFAULT_EVENTS = (mevents.ValueChange, mevents.Boot, mevents.Bootstrap)
 
-def make_inform(
-        *,
+
+def _inform_params(
         device: device.Device,
-        events: Collection[mevents.Event] = (
-                mevents.ValueChange, mevents.Boot, mevents.Bootstrap
-        ),
-        params: Optional[Collection[parameters.Parameter]] = None,
-        time: Optional[datetime.datetime] = None,
-        retry_count: int = 0
-) -> str:
-    """Create a Inform RPC"""
-    if time is None:
-        time = datetime.datetime.now()
+        params: Optional[Collection[parameters.Parameter]],
+        value_changes: Collection[parameters.Parameter],
+) -> Collection[parameters.Parameter]:
     if params is None:
         params = []
         for x in parameters.REQUIRED_INFORM_PARAMETERS:
-            if x in device.params:
-                params.append(device.params[x])
+            param = device.params.get(x)
+            if param is not None:
+                params.append(param)
             else:
                 warnings.warn(f"Missing required inform parameter: {x}")
+    if value_changes:
+        names = {param.name for param in params}
+        params = [*params, *(param for param in value_changes if param.name not in names)]
+    return params
+
 
+def _inform_events(
+        events: Collection[mevents.Event],
+        value_changes: Collection[parameters.Parameter],
+) -> Collection[mevents.Event]:
+    if value_changes and all(event.code != mevents.ValueChange.code for event in events):
+        events = [*events, mevents.ValueChange]
+    return events
+
+
+def _render_inform(
+        device_xml: str,
+        events_xml: Sequence[str],
+        time: str,
+        retry_count: str,
+        params_xml: Sequence[str],
+) -> str:
     return soap.soapify(f"""
         <cwmp:Inform>
-            {device.to_xml()}
-            <Event soap-enc:arrayType="cwmp:EventStruct[{len(events)}]">
-                {"".join(event.to_xml() for event in events)}
+            {device_xml}
+            <Event soap-enc:arrayType="cwmp:EventStruct[{len(events_xml)}]">
+                {"".join(events_xml)}
             </Event>
             <MaxEnvelopes>1</MaxEnvelopes>
-            <CurrentTime>{time.isoformat()}</CurrentTime>
+            <CurrentTime>{time}</CurrentTime>
             <RetryCount>{retry_count}</RetryCount>
-            <ParameterList soap-enc:arrayType="cwmp:ParameterValueStruct[{len(params)}]">
-                {"".join(param.to_xml() for param in params)}
+            <ParameterList soap-enc:arrayType="cwmp:ParameterValueStruct[{len(params_xml)}]">
+                {"".join(params_xml)}
             </ParameterList>
         </cwmp:Inform>
     """)
+
+
+def make_inform(
+        *,
+        device: device.Device,
+        events: Collection[mevents.Event] = DEFAULT_EVENTS,
+        params: Optional[Collection[parameters.Parameter]] = None,
+        time: Optional[datetime.datetime] = None,
+        retry_count: int = 0,
+        value_changes: Collection[parameters.Parameter] = (),
+) -> str:
+    """
+    Create a Inform RPC
+
+    Args:
+        value_changes: Changed parameters to notify the ACS of, e.g. from
+            :py:meth:`tr069.data.parameters.Parameters.changes`.
+            They are added to the parameter list, together with a 4 VALUE CHANGE event if there is none yet.
+    """
+    if time is None:
+        time = datetime.datetime.now()
+    params = _inform_params(device, params, value_changes)
+    events = _inform_events(events, value_changes)
+    return _render_inform(
+        device.to_xml(),
+        [event.to_xml() for event in events],
+        time.isoformat(),
+        str(retry_count),
+        [param.to_xml() for param in params],
+    )
+
+
+_field_rex = re.compile("\x00([0-9]+)\x00")
+
+
+def _field(index: int) -> str:
+    return f"\x00{index}\x00"
+
+
+class InformBuilder:
+    """
+    Creates the Inform RPCs of a device, like :py:func:`make_inform`, but much faster for repeated Informs.
+
+    The envelope is rendered once for each combination of device identity, number of events
+    and inform parameters, with placeholders for the event codes, CurrentTime, RetryCount and parameter values.
+    Subsequent Informs only fill in these fields, so that dedenting, SOAP wrapping
+    and rendering the static parts are not repeated.
+    The result is identical to :py:func:`make_inform`.
+    """
+    device: device.Device
+    # By cache key: the envelope split into parts, and the parts' indices that are fields.
+    _skeletons: Dict[tuple, Tuple[List[str], List[Tuple[int, int]]]]
+
+    MAX_SKELETONS = 16
+
+    def __init__(self, device: device.Device):
+        self.device = device
+        self._skeletons = {}
+
+    def __repr__(self):
+        return f"InformBuilder({self.device.serial}, {len(self._skeletons)} cached envelopes)"
+
+    def _skeleton(
+            self,
+            events: Collection[mevents.Event],
+            params: Collection[parameters.Parameter],
+    ) -> Tuple[List[str], List[Tuple[int, int]]]:
+        d = self.device
+        key = (
+            d.manufacturer, d.oui, d.product_class, d.serial, len(events),
+            tuple((param.name, param.type) for param in params),
+        )
+        skeleton = self._skeletons.get(key)
+        if skeleton is None:
+            # Fields: 0 is CurrentTime, 1 is RetryCount, then event codes, command keys and parameter values.
+            n = len(events)
+            xml = _render_inform(
+                d.to_xml(),
+                [mevents.Event(_field(2 + i), _field(2 + n + i)).to_xml() for i in range(n)],
+                _field(0),
+                _field(1),
+                [
+                    parameters.Parameter(param.name, _field(2 + 2 * n + i), param.type).to_xml()
+                    for i, param in enumerate(params)
+                ],
+            )
+            parts = _field_rex.split(xml)
+            # Every odd part is the index of a field.
+            fields = [(i, int(parts[i])) for i in range(1, len(parts), 2)]
+            skeleton = (parts, fields)
+            if len(self._skeletons) >= self.MAX_SKELETONS:
+                self._skeletons.clear()
+            self._skeletons[key] = skeleton
+        return skeleton
+
+    def build(
+            self,
+            *,
+            events: Collection[mevents.Event] = DEFAULT_EVENTS,
+            params: Optional[Collection[parameters.Parameter]] = None,
+            time: Optional[datetime.datetime] = None,
+            retry_count: int = 0,
+            value_changes: Collection[parameters.Parameter] = (),
+    ) -> str:
+        """
+        Create a Inform RPC for the device. See :py:func:`make_inform` for the arguments.
+        """
+        if time is None:
+            time = datetime.datetime.now()
+        params = _inform_params(self.device, params, value_changes)
+        events = _inform_events(events, value_changes)
+        values = [
+            time.isoformat(),
+            str(retry_count),
+            *(event.code for event in events),
+            *(event.command_key for event in events),
+            *(param.value for param in params),
+        ]
+        if any("\n" in value or "\x00" in value for value in values):
+            # Line breaks change how the envelope is dedented.
+            return _render_inform(
+                self.device.to_xml(),
+                [event.to_xml() for event in events],
+                values[0],
+                values[1],
+                [param.to_xml() for param in params],
+            )
+        parts, fields = self._skeleton(events, params)
+        parts = parts.copy()
+        for index, field in fields:
+            parts[index] = values[field]
+        return "".join(parts)
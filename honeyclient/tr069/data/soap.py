@@ -1,51 +1,70 @@
 import re
-import textwrap
-from typing import Optional
+from typing import AnyStr, Optional, Union
+
+from .template import Template
 
 CWMP_VERSION = "cwmp-1-0"
 HEADER = '<cwmp:ID soap:mustUnderstand="1">1</cwmp:ID>'
 
+ENVELOPE_TEMPLATE = Template(f"""
+    <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
+                   xmlns:soap-enc="http://schemas.xmlsoap.org/soap/encoding/"
+                   xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+                   xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:cwmp="urn:dslforum-org:{CWMP_VERSION}">
+        <soap:Header>
+            {HEADER}
+        </soap:Header>
+        <soap:Body>
+            {{xml}}
+        </soap:Body>
+    </soap:Envelope>
+""", indent=8)
+
 
 def soapify(xml: str) -> str:
     """
     Wrap CWMP RPC in SOAP.
     """
-    return textwrap.dedent(f"""
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
-                       xmlns:soap-enc="http://schemas.xmlsoap.org/soap/encoding/"
-                       xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                       xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:cwmp="urn:dslforum-org:{CWMP_VERSION}">
-            <soap:Header>
-                {HEADER}
-            </soap:Header>
-            <soap:Body>
-                {xml}
-            </soap:Body>
-        </soap:Envelope>
-    """).strip()
-
-
-def extract_rpc_name(xml: str) -> Optional[str]:
-    message_type = re.search(r"<[-\w]+:Body>\s*<(.+?)[ /]*>", xml, re.IGNORECASE)
-    if message_type:
-        return message_type.group(1)
-    return None
+    return ENVELOPE_TEMPLATE.format(xml=xml)
 
 
+rpc_name_rex = re.compile(r"<[-\w]+:Body>\s*<(.+?)[ /]*>", re.IGNORECASE)
 cwmp_id_rex = re.compile(r"(<cwmp:ID[^>]*>)(.*?)(?=</cwmp:ID>)", re.IGNORECASE)
+# The same expressions for encoded envelopes, so that request bodies do not need to be decoded.
+_rpc_name_rex_bytes = re.compile(rpc_name_rex.pattern.encode(), re.IGNORECASE)
+_cwmp_id_rex_bytes = re.compile(cwmp_id_rex.pattern.encode(), re.IGNORECASE)
+
+
+def extract_rpc_name(xml: Union[str, bytes]) -> Optional[str]:
+    if isinstance(xml, bytes):
+        message_type = _rpc_name_rex_bytes.search(xml)
+        if message_type:
+            return message_type.group(1).decode("utf-8", "replace")
+        return None
+    message_type = rpc_name_rex.search(xml)
+    if message_type:
+        return message_type.group(1)
+    return None
 
 
-def get_cwmp_id(xml: str) -> Optional[str]:
+def get_cwmp_id(xml: Union[str, bytes]) -> Optional[str]:
     """Get a cwmp:ID from the provided xml"""
-    cwmp_id = re.search(cwmp_id_rex, xml)
+    if isinstance(xml, bytes):
+        cwmp_id = _cwmp_id_rex_bytes.search(xml)
+        if cwmp_id:
+            return cwmp_id.group(2).decode("utf-8", "replace")
+        return None
+    cwmp_id = cwmp_id_rex.search(xml)
     if cwmp_id:
         return cwmp_id.group(2)
     return None
 
 
-def set_cwmp_id(xml: str, cwmp_id: str) -> str:
+def set_cwmp_id(xml: AnyStr, cwmp_id: str) -> AnyStr:
     """Replace the cwmp:ID in xml with the provided one"""
-    return re.sub(cwmp_id_rex, r"\g<1>" + cwmp_id, xml)
+    if isinstance(xml, bytes):
+        return _cwmp_id_rex_bytes.sub(lambda m: m.group(1) + cwmp_id.encode("utf-8"), xml)
+    return cwmp_id_rex.sub(lambda m: m.group(1) + cwmp_id, xml)
 
 
 def fix_cwmp_id(xml: str, from_xml: str) -> str:
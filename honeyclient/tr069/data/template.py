@@ -0,0 +1,81 @@
+"""
+Precompiled XML templates.
+
+All XML in this package used to be written as textwrap.dedent(f\"\"\"...\"\"\").strip(),
+which is easy to read, but dedents the entire result on every call.
+Templates produce byte-identical output, but only dedent once on construction.
+"""
+import re
+import string
+import textwrap
+from typing import Any, FrozenSet
+
+_unindented_line_rex = re.compile(r"^[^ \t\n]", re.MULTILINE)
+# Equivalent to textwrap's ^[ \t]+$, but much faster as the regex engine can skip to the next line break.
+_whitespace_only_rex = re.compile(r"\n[ \t]+(?=\n|\Z)")
+_leading_whitespace_only_rex = re.compile(r"[ \t]+(?=\n|\Z)")
+
+
+def dedent(text: str) -> str:
+    """
+    Equivalent to textwrap.dedent(), but fast for large texts that contain unindented lines,
+    e.g. envelopes that contain many ParameterValueStructs.
+    """
+    if _unindented_line_rex.search(text):
+        # There is nothing to dedent, we only need to normalize whitespace-only lines.
+        first_line = _leading_whitespace_only_rex.match(text)
+        if first_line:
+            text = text[first_line.end():]
+        return _whitespace_only_rex.sub("\n", text)
+    return textwrap.dedent(text)
+
+
+class Template:
+    """
+    A replacement for textwrap.dedent(f\"\"\"...\"\"\").strip() using str.format() syntax.
+
+    The template is dedented once on construction. As long as fields do not contain line breaks,
+    formatting the dedented template yields the same result as dedenting the formatted template.
+    Otherwise, we fall back to the latter.
+    """
+    template: str
+    compiled: str
+    _line_breaks: int
+    _line_start_fields: FrozenSet[str]
+
+    def __init__(self, template: str, indent: int = 0):
+        """
+        Args:
+            template: The template.
+            indent: The indentation of the template within the formatted text.
+                This only matters if fields contain line breaks, as their indentation is relative to it.
+        """
+        self.template = textwrap.indent(textwrap.dedent(template), " " * indent)
+        self.compiled = textwrap.dedent(template).strip()
+        self._line_breaks = self.compiled.count("\n")
+        # Fields at the beginning of a line determine the line's indentation,
+        # so we need to make sure they don't make it whitespace-only.
+        line_start_fields = set()
+        for literal, field, _, _ in string.Formatter().parse(self.template):
+            if field is None:
+                continue
+            if not field:
+                raise ValueError("Template fields must be named.")
+            line = literal.rpartition("\n")[2]
+            if not line.strip():
+                line_start_fields.add(field)
+        self._line_start_fields = frozenset(line_start_fields)
+
+    def __repr__(self):
+        return f"Template({self.compiled!r})"
+
+    def format(self, **fields: Any) -> str:
+        for name in self._line_start_fields:
+            value = format(fields[name])
+            if not value or value[0] in " \t" or "\n" in value:
+                return dedent(self.template.format(**fields)).strip()
+        result = self.compiled.format(**fields)
+        if result.count("\n") != self._line_breaks:
+            # A field contains a line break.
+            return dedent(self.template.format(**fields)).strip()
+        return result
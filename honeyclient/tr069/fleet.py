@@ -0,0 +1,611 @@
+"""
+A simulator for fleets of virtual CPEs, used to capacity-test an ACS.
+
+Every virtual CPE has its own serial number and parameters and runs full TR-069 sessions
+(Inform, server RPCs, empty POST) concurrently with all other CPEs on a single asyncio event loop.
+CPEs can also keep periodic contact with the ACS on their own, see :py:meth:`Fleet.run_periodic`.
+"""
+import asyncio
+import collections
+import datetime
+import heapq
+import math
+import random
+import re
+import time
+from typing import List, Sequence, Dict, Optional, Tuple
+
+import click
+
+from tr069 import transport as mtransport
+from tr069 import udp_connection_request
+from tr069 import util
+from tr069.async_client import AsyncClient
+from tr069.data import datamodel
+from tr069.data import device as mdevice
+from tr069.data import event
+from tr069.data import parameters
+
+SERIAL_NUMBER_PARAMETERS = [
+    "InternetGatewayDevice.DeviceInfo.SerialNumber",
+    "Device.DeviceInfo.SerialNumber",
+]
+OUI_PARAMETERS = [
+    "InternetGatewayDevice.DeviceInfo.ManufacturerOUI",
+    "Device.DeviceInfo.ManufacturerOUI",
+]
+MANAGEMENT_SERVER_OBJECTS = [
+    "InternetGatewayDevice.ManagementServer.",
+    "Device.ManagementServer.",
+]
+
+
+class SessionError(Exception):
+    """Raised if the ACS does not accept a session."""
+
+
+def make_device(template: mdevice.Device, serial: str, oui: Optional[str] = None) -> mdevice.Device:
+    """
+    Create a copy of template with the given serial number and OUI.
+
+    The copy's parameters are a copy-on-write layer on top of the template's parameters,
+    see :py:class:`tr069.data.parameters.LayeredParameters`. The template must not be modified afterwards.
+    """
+    if oui is None:
+        oui = template.oui
+    params = parameters.LayeredParameters(template.params)
+    for name in SERIAL_NUMBER_PARAMETERS:
+        if name in params:
+            params.set_value(name, serial, notify=False)
+    for name in OUI_PARAMETERS:
+        if name in params:
+            params.set_value(name, oui, notify=False)
+    return mdevice.Device(template.manufacturer, oui, template.product_class, serial, params)
+
+
+def make_devices(
+        template: mdevice.Device,
+        count: int,
+        ouis: Sequence[str] = (),
+) -> List[mdevice.Device]:
+    """
+    Create count virtual CPEs from template.
+    Serial numbers are derived from the template's serial number, OUIs are cycled through if given.
+    """
+    return [
+        make_device(
+            template,
+            f"{template.serial}{i:06X}",
+            ouis[i % len(ouis)] if ouis else None
+        )
+        for i in range(count)
+    ]
+
+
+# xsd:dateTime, with any number of fractional digits and offsets with or without a colon.
+_time_rex = re.compile(
+    r"(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(\.\d+)?(Z|([+-])(\d\d):?(\d\d))?"
+)
+
+
+def _parse_time(value: str) -> Optional[float]:
+    """Parse an xsd:dateTime as a UNIX timestamp. Naive times are assumed to be UTC."""
+    match = _time_rex.fullmatch(value.strip())
+    if not match:
+        return None
+    year, month, day, hour, minute, second, fraction, _, sign, offset_hours, offset_minutes = match.groups()
+    if int(year) <= 1:
+        # 0001-01-01T00:00:00Z is the Unknown Time.
+        return None
+    try:
+        t = datetime.datetime(
+            int(year), int(month), int(day), int(hour), int(minute), int(second), tzinfo=datetime.timezone.utc
+        )
+    except ValueError:
+        return None
+    timestamp = t.timestamp() + float(fraction or 0)
+    if sign:
+        offset = int(offset_hours) * 3600 + int(offset_minutes) * 60
+        timestamp -= offset if sign == "+" else -offset
+    return timestamp
+
+
+def periodic_inform_settings(
+        device: mdevice.Device,
+        default_interval: Optional[float] = None,
+) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Read a device's PeriodicInformEnable, PeriodicInformInterval and PeriodicInformTime parameters.
+
+    Args:
+        device: The device.
+        default_interval: The interval of devices that do not have a PeriodicInformInterval parameter.
+
+    Returns:
+        The interval in seconds, or None if the device does not send periodic Informs,
+        and the reference time informs are aligned to, or None if informs are not aligned.
+    """
+    params = device.params
+    for obj in MANAGEMENT_SERVER_OBJECTS:
+        interval = params.get(f"{obj}PeriodicInformInterval")
+        if interval is None:
+            continue
+        enable = params.get(f"{obj}PeriodicInformEnable")
+        if enable is not None and enable.value.strip().lower() in ("0", "false"):
+            return None, None
+        try:
+            seconds = float(interval.value)
+        except ValueError:
+            return None, None
+        reference = params.get(f"{obj}PeriodicInformTime")
+        return (seconds if seconds > 0 else None), (reference and _parse_time(reference.value))
+    return default_interval, None
+
+
+class PeriodicInformSchedule:
+    """
+    When each device of a fleet sends its next periodic Inform.
+
+    Due times are kept in a heap, so that finding the next due device and rescheduling a device are O(log n),
+    and a single timer serves any number of devices.
+    Each device's interval and reference time are read from its parameters whenever it is scheduled,
+    so changes made by the ACS take effect after the next periodic Inform.
+    Devices without a reference time start at a random point within their first interval,
+    and every Inform is delayed by a random jitter of up to jitter * interval,
+    which keeps devices from informing in lockstep.
+    """
+    devices: Sequence[mdevice.Device]
+    default_interval: Optional[float]
+    jitter: float
+    _heap: List[Tuple[float, int, float]]
+
+    def __init__(
+            self,
+            devices: Sequence[mdevice.Device],
+            now: Optional[float] = None,
+            *,
+            default_interval: Optional[float] = None,
+            jitter: float = 0.05,
+            rng: Optional[random.Random] = None,
+    ):
+        """
+        Args:
+            devices: The devices to schedule.
+            now: The current UNIX time. Defaults to time.time().
+            default_interval: The interval of devices that do not have a PeriodicInformInterval parameter.
+                By default, these devices are not scheduled.
+            jitter: The maximum random delay of an Inform, as a share of the device's interval.
+            rng: The random number generator for start times and jitter.
+        """
+        if now is None:
+            now = time.time()
+        self.devices = devices
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self._rng = rng or random.Random()
+        self._heap = []
+        for index in range(len(devices)):
+            self.schedule(index, now)
+
+    def __repr__(self):
+        return f"PeriodicInformSchedule({len(self._heap)} of {len(self.devices)} devices)"
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def next_due(self) -> Optional[float]:
+        """The time the next Inform is due, or None if no device is scheduled."""
+        return self._heap[0][0] if self._heap else None
+
+    def schedule(self, index: int, now: float, last: Optional[float] = None) -> Optional[float]:
+        """
+        Schedule the next periodic Inform of a device.
+
+        Args:
+            index: The device's index.
+            now: The current UNIX time.
+            last: The time the device's last periodic Inform was due, without jitter.
+
+        Returns:
+            The time the Inform is due, or None if the device does not send periodic Informs.
+        """
+        interval, reference = periodic_inform_settings(self.devices[index], self.default_interval)
+        if interval is None:
+            return None
+        if reference is not None:
+            # The next point in time that is an integer number of intervals from the reference time.
+            nominal = reference + math.floor((now - reference) / interval + 1) * interval
+        elif last is None:
+            nominal = now + self._rng.uniform(0, interval)
+        else:
+            nominal = last + interval
+            if nominal <= now:
+                # Informs that were missed, e.g. because the session took longer than the interval, are skipped.
+                nominal += math.ceil((now - nominal) / interval) * interval
+        due = nominal + self._rng.uniform(0, self.jitter * interval)
+        heapq.heappush(self._heap, (due, index, nominal))
+        return due
+
+    def pop_due(self, now: float) -> List[Tuple[int, float]]:
+        """
+        Remove all devices that are due from the schedule.
+        Each of them needs to be rescheduled with :py:meth:`schedule` after its Inform.
+
+        Returns:
+            The devices' indices and the times their Informs were due, without jitter.
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, index, nominal = heapq.heappop(self._heap)
+            due.append((index, nominal))
+        return due
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile of a sorted sequence, q in [0, 100].
+    """
+    if not values:
+        return float("nan")
+    rank = math.ceil(q / 100 * len(values))
+    return values[max(rank - 1, 0)]
+
+
+class FleetStats:
+    """
+    Aggregate results of a fleet run.
+    All latencies are in seconds.
+    Wake-up latencies measure the time from receiving a UDP connection request to receiving the InformResponse.
+    """
+    sessions: int
+    rpcs: int
+    errors: Dict[str, int]
+    session_latencies: List[float]
+    request_latencies: List[float]
+    wakeup_latencies: List[float]
+    duration: float
+
+    def __init__(self):
+        self.sessions = 0
+        self.rpcs = 0
+        self.errors = collections.Counter()
+        self.session_latencies = []
+        self.request_latencies = []
+        self.wakeup_latencies = []
+        self.duration = 0.0
+
+    def __repr__(self):
+        return f"FleetStats({self.sessions} sessions, {sum(self.errors.values())} errors)"
+
+    @property
+    def sessions_per_second(self) -> float:
+        if not self.duration:
+            return 0.0
+        return self.sessions / self.duration
+
+    @property
+    def error_rate(self) -> float:
+        """Share of sessions that failed."""
+        total = self.sessions + sum(self.errors.values())
+        if not total:
+            return 0.0
+        return sum(self.errors.values()) / total
+
+    def percentiles(self, values: List[float], qs: Sequence[float] = (50, 90, 99)) -> Dict[float, float]:
+        values = sorted(values)
+        return {q: percentile(values, q) for q in qs}
+
+    def summary(self) -> str:
+        lines = [
+            f"Sessions:     {self.sessions} ({self.sessions_per_second:.1f}/s over {self.duration:.2f}s)",
+            f"Server RPCs:  {self.rpcs}",
+            f"Errors:       {sum(self.errors.values())} ({self.error_rate:.2%})",
+        ]
+        for name, count in self.errors.most_common():
+            lines.append(f"    {name}: {count}")
+        latencies = [("Session", self.session_latencies), ("Request", self.request_latencies)]
+        if self.wakeup_latencies:
+            latencies.append(("Wake-up", self.wakeup_latencies))
+        for name, values in latencies:
+            ps = ", ".join(f"p{q}={v * 1000:.1f}ms" for q, v in self.percentiles(values).items())
+            lines.append(f"{name} latency: {ps}")
+        return "\n".join(lines)
+
+
+class Fleet:
+    """
+    A fleet of virtual CPEs talking to the same ACS.
+    """
+    acs_url: str
+    clients: List[AsyncClient]
+    concurrency: int
+    transport: Optional[mtransport.Transport]
+    stats: FleetStats
+
+    def __init__(
+            self,
+            acs_url: str,
+            size: int = 100,
+            template: Optional[mdevice.Device] = None,
+            *,
+            ouis: Sequence[str] = (),
+            concurrency: int = 100,
+            transport: Optional[mtransport.Transport] = None,
+            **client_kwargs
+    ):
+        """
+        Args:
+            acs_url: The ACS URL.
+            size: The number of virtual CPEs.
+            template: The device every virtual CPE is derived from. Defaults to :py:data:`tr069.data.device.DEFAULT`.
+            ouis: OUIs assigned to the virtual CPEs in round-robin order. Defaults to the template's OUI.
+            concurrency: The maximum number of concurrently running sessions.
+            transport: A connection pool shared by all virtual CPEs. By default, every CPE opens its own connections.
+            **client_kwargs: Additional arguments passed to :py:class:`tr069.AsyncClient`.
+        """
+        self.acs_url = acs_url
+        self.concurrency = concurrency
+        self.transport = transport
+        if template is None:
+            template = mdevice.DEFAULT
+        client_kwargs.setdefault("log", False)
+        self.clients = [
+            AsyncClient(acs_url, device, transport=transport, **client_kwargs)
+            for device in make_devices(template, size, ouis)
+        ]
+        self.stats = FleetStats()
+
+    def __repr__(self):
+        return f"Fleet({self.acs_url}, {len(self.clients)} devices)"
+
+    async def _session(
+            self,
+            client: AsyncClient,
+            events: Sequence[event.Event],
+            connection_request: Optional[udp_connection_request.UDPConnectionRequest] = None,
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            inform = await client.inform(events=events)
+            if inform.status_code != 200:
+                raise SessionError(f"HTTP {inform.status_code}")
+            if connection_request:
+                self.stats.wakeup_latencies.append(time.time() - connection_request.timestamp)
+            await client.done()
+            count = await client.handle_server_rpcs()
+            self.stats.rpcs += count
+        except SessionError as e:
+            self.stats.errors[str(e)] += 1
+        except Exception as e:
+            self.stats.errors[type(e).__name__] += 1
+        else:
+            self.stats.sessions += 1
+            self.stats.session_latencies.append(time.perf_counter() - start)
+        finally:
+            self.stats.request_latencies.extend(m.elapsed.total_seconds() for m in client.messages)
+            # Sessions are independent from each other, so there is no need to keep their messages.
+            client.messages.clear()
+            client.close()
+
+    async def _run_device(self, client: AsyncClient, sessions: int, semaphore: asyncio.Semaphore) -> None:
+        events = (event.Bootstrap, event.Boot)
+        for _ in range(sessions):
+            async with semaphore:
+                await self._session(client, events)
+            events = (event.Periodic,)
+
+    async def run_async(self, sessions: int = 1) -> FleetStats:
+        """
+        Run the given number of sessions on every virtual CPE.
+        The first session of each CPE is a bootstrap, all further sessions are periodic informs.
+
+        Returns:
+            The statistics of this run.
+        """
+        self.stats = FleetStats()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            self._run_device(client, sessions, semaphore)
+            for client in self.clients
+        ))
+        self.stats.duration = time.perf_counter() - start
+        return self.stats
+
+    async def _periodic_session(
+            self,
+            index: int,
+            nominal: float,
+            schedule: PeriodicInformSchedule,
+            semaphore: asyncio.Semaphore,
+            rescheduled: asyncio.Event,
+    ) -> None:
+        async with semaphore:
+            await self._session(self.clients[index], (event.Periodic,))
+        if schedule.schedule(index, time.time(), nominal) is not None:
+            rescheduled.set()
+
+    async def run_periodic(
+            self,
+            duration: float,
+            *,
+            default_interval: Optional[float] = None,
+            jitter: float = 0.05,
+    ) -> FleetStats:
+        """
+        Let every virtual CPE send periodic Informs for duration seconds,
+        as configured by its PeriodicInformEnable, PeriodicInformInterval and PeriodicInformTime parameters.
+        See :py:class:`PeriodicInformSchedule`.
+
+        Args:
+            duration: How long to run, in seconds. Sessions that are still running at the end are awaited.
+            default_interval: The interval of CPEs that do not have a PeriodicInformInterval parameter.
+                By default, these CPEs do not send periodic Informs.
+            jitter: The maximum random delay of an Inform, as a share of the CPE's interval.
+
+        Returns:
+            The statistics of this run.
+        """
+        self.stats = FleetStats()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        end = time.time() + duration
+        schedule = PeriodicInformSchedule(
+            [client.device for client in self.clients], default_interval=default_interval, jitter=jitter
+        )
+        rescheduled = asyncio.Event()
+        sessions = set()
+        while True:
+            now = time.time()
+            for index, nominal in schedule.pop_due(now):
+                session = asyncio.ensure_future(
+                    self._periodic_session(index, nominal, schedule, semaphore, rescheduled)
+                )
+                sessions.add(session)
+                session.add_done_callback(sessions.discard)
+            due = schedule.next_due
+            if now >= end or (due is None and not sessions):
+                break
+            # Sleep until the next Inform is due, or until a device is rescheduled to an earlier time.
+            rescheduled.clear()
+            timeout = min(end, due if due is not None else end) - now
+            try:
+                await asyncio.wait_for(rescheduled.wait(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+        await asyncio.gather(*sessions)
+        self.stats.duration = time.perf_counter() - start
+        return self.stats
+
+    async def _answer_connection_requests(
+            self,
+            client: AsyncClient,
+            queue: asyncio.Queue,
+            count: int,
+            semaphore: asyncio.Semaphore,
+    ) -> None:
+        for _ in range(count):
+            request = await queue.get()
+            async with semaphore:
+                await self._session(client, (event.ConnectionRequest,), request)
+
+    async def answer_connection_requests(
+            self,
+            listener: udp_connection_request.UDPConnectionRequestListener,
+            password: str,
+            count: int = 1,
+    ) -> FleetStats:
+        """
+        Register all virtual CPEs with a started UDP connection request listener
+        and run a session for the next count connection requests of every CPE.
+
+        The CPEs' serial numbers are used as their ConnectionRequestUsername.
+        Their UDPConnectionRequestAddress, ConnectionRequestUsername and ConnectionRequestPassword
+        parameters are updated accordingly, so that the ACS can retrieve them.
+
+        Returns:
+            The statistics of this run, including wake-up latencies.
+        """
+        self.stats = FleetStats()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = []
+        for client in self.clients:
+            params = client.device.params
+            for obj in MANAGEMENT_SERVER_OBJECTS:
+                if params.all(obj):
+                    params[f"{obj}UDPConnectionRequestAddress"] = listener.address
+                    params[f"{obj}ConnectionRequestUsername"] = client.device.serial
+                    params[f"{obj}ConnectionRequestPassword"] = password
+            queue = listener.register(client.device.serial, password)
+            tasks.append(self._answer_connection_requests(client, queue, count, semaphore))
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for client in self.clients:
+                listener.unregister(client.device.serial)
+        self.stats.duration = time.perf_counter() - start
+        return self.stats
+
+    def run(self, sessions: int = 1) -> FleetStats:
+        """
+        Blocking version of :py:meth:`run_async`, which runs the fleet on a new event loop.
+        """
+        return self._run_on_new_loop(self.run_async(sessions))
+
+    def run_periodic_blocking(self, duration: float, **kwargs) -> FleetStats:
+        """
+        Blocking version of :py:meth:`run_periodic`, which runs the fleet on a new event loop.
+        """
+        return self._run_on_new_loop(self.run_periodic(duration, **kwargs))
+
+    def _run_on_new_loop(self, coro) -> FleetStats:
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            if self.transport:
+                # Pooled connections cannot outlive their event loop.
+                self.transport.close()
+                loop.run_until_complete(asyncio.sleep(0))
+            loop.close()
+
+
+@click.command()
+@click.argument("acs-url")
+@click.option("-n", "--size", default=100, help="Number of virtual CPEs.", show_default=True)
+@click.option("-s", "--sessions", default=1, help="Sessions per CPE.", show_default=True)
+@click.option("-c", "--concurrency", default=100, help="Maximum concurrent sessions.", show_default=True)
+@click.option('-b', '--basic-auth', nargs=2, type=str,
+              help="Use basic authentication.", metavar='USER PASS')
+@click.option('-d', '--digest-auth', nargs=2, type=str,
+              help="Use digest authentication.", metavar='USER PASS')
+@click.option('-l', '--log', type=click.File("w"),
+              help="Log all HTTP flows to a JSON lines file.", metavar='FILE')
+@click.option('-m', '--data-model', type=click.Path(exists=True, dir_okay=False),
+              help="Give the CPEs all parameters of a Broadband Forum data model definition.", metavar='FILE')
+@click.option('-i', '--instances', default=1, show_default=True,
+              help="Instances of every multi-instance object in the data model.")
+@click.option('-p', '--pool-size', type=int,
+              help="Share a pool of connections between all CPEs, keeping up to N idle connections.", metavar='N')
+@click.option('-t', '--duration', type=float,
+              help="Instead of a fixed number of sessions, send periodic Informs for the given time.", metavar='SECONDS')
+@click.option('--interval', type=float,
+              help="Periodic inform interval of CPEs without a PeriodicInformInterval parameter.", metavar='SECONDS')
+def cli(acs_url, size, sessions, concurrency, basic_auth, digest_auth, log, data_model, instances, pool_size,
+        duration, interval):
+    """Run a fleet of virtual CPEs against an ACS and report throughput and latency."""
+    logger = util.FlowLogger("jsonl", log) if log else False
+    template = mdevice.DEFAULT
+    if data_model:
+        model = datamodel.load(data_model, instances)
+        template = model.to_device(template.manufacturer, template.oui, template.product_class, template.serial)
+        model.close()
+        click.secho(f"=== Loaded {model.name} with {len(template.params)} parameters ===", fg="magenta", bold=True)
+    transport = mtransport.Transport(pool_size) if pool_size else None
+    fleet = Fleet(
+        acs_url,
+        size,
+        template,
+        concurrency=concurrency,
+        transport=transport,
+        basic_auth=basic_auth or None,
+        digest_auth=digest_auth or None,
+        log=logger,
+    )
+    if duration is None:
+        click.secho(f"=== Running {sessions} session(s) on {size} virtual CPEs ===", fg="magenta", bold=True)
+        stats = fleet.run(sessions)
+    else:
+        click.secho(f"=== Running periodic informs on {size} virtual CPEs for {duration}s ===", fg="magenta", bold=True)
+        stats = fleet.run_periodic_blocking(duration, default_interval=interval)
+    if logger:
+        logger.close()
+    click.echo(stats.summary())
+    if transport:
+        click.echo(repr(transport))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    cli()
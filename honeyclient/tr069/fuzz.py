@@ -0,0 +1,474 @@
+"""
+A mutation fuzzer for ACS endpoints.
+
+The fuzzer mutates valid CWMP envelopes, e.g. those created by the :py:mod:`tr069.data.rpcs` builders,
+sends them to the ACS from a pool of concurrent workers at a configurable rate,
+and flags responses that are anomalous compared to the unmutated envelope:
+server errors, connection failures, slow responses and reflected payloads.
+Anomalous cases are deduplicated into a :py:class:`Corpus`.
+"""
+import asyncio
+import collections
+import functools
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import click
+
+from tr069 import transport as mtransport
+from tr069 import xml_attacks
+from tr069.async_client import AsyncClient
+from tr069.data import device as mdevice
+from tr069.data import rpcs
+from tr069.data import soap
+from tr069.fleet import SessionError
+
+# Injected by mutations, so that it can be recognized when the ACS reflects it.
+MARKER = "tr069fuzz"
+VALUES = [
+    "",
+    "-1",
+    "0",
+    "4294967296",
+    "18446744073709551616",
+    "1e309",
+    "9" * 1_000,
+    "A" * 100_000,
+    "%s%s%s%s%n",
+    "'\"",
+    "\u202e\ufeff\u200b\u200d\U0001f4a9",
+    "0001-01-01T00:00:00Z",
+    "9999-99-99T99:99:99Z",
+    f"{MARKER}<{MARKER}/>",
+    f"{MARKER}&amp;&lt;&gt;",
+    f"<![CDATA[{MARKER}]]>",
+]
+# Responses faster than this (in seconds) are never considered slow, however fast the baseline was.
+MIN_SLOW_LATENCY = 0.5
+_text_rex = re.compile(r">([^<>]*\S[^<>]*)<")
+_element_rex = re.compile(r"<([-\w]+:)?([-\w]+)(?:\s[^>]*)?>[^<]*</\1?\2>")
+_array_rex = re.compile(r"\[(\d+)\]")
+
+Mutator = Callable[[str, random.Random], str]
+
+
+def _replace_value(xml: str, rng: random.Random) -> str:
+    matches = list(_text_rex.finditer(xml))
+    if not matches:
+        return xml
+    match = rng.choice(matches)
+    return f"{xml[:match.start(1)]}{rng.choice(VALUES)}{xml[match.end(1):]}"
+
+
+def _duplicate_element(xml: str, rng: random.Random) -> str:
+    matches = list(_element_rex.finditer(xml))
+    if not matches:
+        return xml
+    match = rng.choice(matches)
+    return f"{xml[:match.end()]}{match.group() * rng.choice([1, 2, 100])}{xml[match.end():]}"
+
+
+def _delete_element(xml: str, rng: random.Random) -> str:
+    matches = list(_element_rex.finditer(xml))
+    if not matches:
+        return xml
+    match = rng.choice(matches)
+    return xml[:match.start()] + xml[match.end():]
+
+
+def _truncate(xml: str, rng: random.Random) -> str:
+    return xml[:rng.randrange(len(xml))]
+
+
+def _cwmp_id(xml: str, rng: random.Random) -> str:
+    return soap.set_cwmp_id(xml, rng.choice(VALUES))
+
+
+def _array_size(xml: str, rng: random.Random) -> str:
+    return _array_rex.sub(lambda _: f"[{rng.choice(['0', '-1', '4294967296', MARKER])}]", xml)
+
+
+def _nesting(xml: str, rng: random.Random) -> str:
+    depth = rng.choice([100, 10_000])
+    nested = f"{'<a>' * depth}{MARKER}{'</a>' * depth}"
+    return re.sub(r"(<[-\w]+:Body>)", lambda m: m.group(1) + nested, xml, count=1)
+
+
+def _flip_characters(xml: str, rng: random.Random) -> str:
+    chars = list(xml)
+    for _ in range(rng.randint(1, 8)):
+        chars[rng.randrange(len(chars))] = rng.choice("<>&\"'/=:\x00\xff")
+    return "".join(chars)
+
+
+def _xxe(xml: str, rng: random.Random) -> str:
+    return xml_attacks.xxe(xml=xml)
+
+
+@functools.lru_cache()
+def _quadratic_blowup(repetitions: int, entity_size: int) -> str:
+    return xml_attacks.quadratic_blowup(repetitions, entity_size)
+
+
+def _entity_expansion(xml: str, rng: random.Random) -> str:
+    # Payloads are at most 13 kB, but expand to 10 MB. They are built once, not on the event loop for every case.
+    return _quadratic_blowup(rng.choice([10, 1_000]), rng.choice([10, 10_000]))
+
+
+MUTATORS: Dict[str, Mutator] = {
+    "replace value": _replace_value,
+    "duplicate element": _duplicate_element,
+    "delete element": _delete_element,
+    "truncate": _truncate,
+    "cwmp:ID": _cwmp_id,
+    "array size": _array_size,
+    "nesting": _nesting,
+    "flip characters": _flip_characters,
+    "xxe": _xxe,
+    "entity expansion": _entity_expansion,
+}
+"""Mutations by name. Each takes an envelope and a random number generator and returns the mutated envelope."""
+
+
+def default_seeds(device: Optional[mdevice.Device] = None) -> Dict[str, str]:
+    """
+    Valid envelopes for all RPCs a CPE sends, by RPC name.
+
+    Args:
+        device: The device used for the Inform and parameter responses. Defaults to :py:data:`tr069.data.device.DEFAULT`.
+    """
+    if device is None:
+        device = mdevice.DEFAULT
+    params = list(device.params.values())[:10]
+    seeds = [
+        rpcs.make_inform(device=device),
+        rpcs.make_get_rpc_methods(),
+        rpcs.make_request_download(file_type_arg={"Version": "1.0"}),
+        rpcs.make_get_parameter_values_response(params),
+        rpcs.make_get_parameter_names_response(params),
+        rpcs.make_set_parameter_values_response(),
+        rpcs.make_set_parameter_attributes_response(),
+        rpcs.make_download_response(),
+    ]
+    return {soap.extract_rpc_name(seed): seed for seed in seeds}
+
+
+def _fingerprint(body: str) -> str:
+    # Numbers are mostly timestamps, IDs or lengths, which would defeat deduplication.
+    return hashlib.sha1(re.sub(r"\d+", "", body[:4096]).encode()).hexdigest()[:12]
+
+
+class Case:
+    """
+    A mutated envelope and the ACS' reaction to it.
+    """
+    seed: str
+    mutator: str
+    body: str
+    status_code: Optional[int]
+    latency: float
+    response: str
+    anomalies: List[str]
+
+    def __init__(
+            self,
+            seed: str,
+            mutator: str,
+            body: str,
+            status_code: Optional[int] = None,
+            latency: float = 0.0,
+            response: str = "",
+            anomalies: Iterable[str] = (),
+    ):
+        self.seed = seed
+        self.mutator = mutator
+        self.body = body
+        self.status_code = status_code
+        self.latency = latency
+        self.response = response
+        self.anomalies = list(anomalies)
+
+    def __repr__(self):
+        return f"Case({self.seed}, {self.mutator}, {self.status_code}, anomalies={self.anomalies})"
+
+    @property
+    def signature(self) -> Tuple:
+        """Cases with the same signature are considered duplicates."""
+        return self.seed, self.mutator, tuple(sorted(self.anomalies)), self.status_code, _fingerprint(self.response)
+
+    def to_record(self) -> Dict:
+        return {
+            "seed": self.seed,
+            "mutator": self.mutator,
+            "body": self.body,
+            "status_code": self.status_code,
+            "latency": self.latency,
+            "response": self.response,
+            "anomalies": self.anomalies,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict) -> "Case":
+        return cls(**record)
+
+
+class Corpus:
+    """
+    Deduplicated anomalous cases.
+    """
+    cases: Dict[Tuple, Case]
+
+    def __init__(self, cases: Iterable[Case] = ()):
+        self.cases = {}
+        for case in cases:
+            self.add(case)
+
+    def __repr__(self):
+        return f"Corpus({len(self.cases)} cases)"
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    def __iter__(self) -> Iterator[Case]:
+        return iter(self.cases.values())
+
+    def add(self, case: Case) -> bool:
+        """
+        Add a case unless the corpus already contains a case with the same signature.
+
+        Returns:
+            True if the case was added.
+        """
+        if case.signature in self.cases:
+            return False
+        self.cases[case.signature] = case
+        return True
+
+    def save(self, path: str) -> None:
+        """Write all cases to a JSON lines file."""
+        with open(path, "w", encoding="utf-8") as f:
+            for case in self:
+                f.write(json.dumps(case.to_record()) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "Corpus":
+        with open(path, encoding="utf-8") as f:
+            return cls(Case.from_record(json.loads(line)) for line in f if line.strip())
+
+
+class Fuzzer:
+    """
+    Send mutated envelopes to an ACS from a pool of concurrent workers.
+
+    Every case runs in a new session: envelopes other than Informs are sent after a valid Inform.
+    Before fuzzing, every seed is sent unmutated once to establish its baseline status and latency.
+    Seeds whose baseline fails are recorded in :py:attr:`baseline_errors` and tried again on the next run.
+    """
+    acs_url: str
+    seeds: Dict[str, str]
+    mutators: Dict[str, Mutator]
+    workers: int
+    rate: Optional[float]
+    latency_factor: float
+    corpus: Corpus
+    stats: Dict[str, int]
+    baselines: Dict[str, Tuple[int, float]]
+    baseline_errors: Dict[str, str]
+
+    def __init__(
+            self,
+            acs_url: str,
+            seeds: Optional[Dict[str, str]] = None,
+            *,
+            mutators: Optional[Dict[str, Mutator]] = None,
+            workers: int = 10,
+            rate: Optional[float] = None,
+            latency_factor: float = 10.0,
+            random_seed: Optional[int] = None,
+            corpus: Optional[Corpus] = None,
+            transport: Optional[mtransport.Transport] = None,
+            **client_kwargs
+    ):
+        """
+        Args:
+            acs_url: The ACS URL.
+            seeds: The envelopes to mutate, by name. Defaults to :py:func:`default_seeds`.
+            mutators: The mutations to apply, by name. Defaults to :py:data:`MUTATORS`.
+            workers: The number of concurrently running cases.
+            rate: The maximum number of cases per second. Defaults to no limit.
+            latency_factor: Responses that take longer than latency_factor times the seed's baseline
+                and longer than :py:data:`MIN_SLOW_LATENCY` are anomalous.
+            random_seed: Seed of the random number generator, for reproducible runs.
+            corpus: The corpus anomalous cases are added to, e.g. from an earlier run.
+            transport: The transport shared by all workers. Defaults to a new transport.
+            **client_kwargs: Additional arguments passed to :py:class:`tr069.AsyncClient`.
+        """
+        self.acs_url = acs_url
+        self.seeds = default_seeds() if seeds is None else seeds
+        self.mutators = MUTATORS if mutators is None else mutators
+        self.workers = workers
+        self.rate = rate
+        self.latency_factor = latency_factor
+        self.corpus = Corpus() if corpus is None else corpus
+        self.stats = collections.Counter()
+        self.baselines = {}
+        self.baseline_errors = {}
+        self._rng = random.Random(random_seed)
+        self._next_case = 0.0
+        self._owns_transport = transport is None
+        if transport is None:
+            transport = mtransport.Transport(workers)
+        client_kwargs.setdefault("log", False)
+        client_kwargs.setdefault("timeout", 10)
+        self._client_kwargs = dict(client_kwargs, transport=transport)
+
+    def __repr__(self):
+        return f"Fuzzer({self.acs_url}, {self.stats['cases']} cases, {len(self.corpus)} in corpus)"
+
+    def cases(self) -> Iterator[Case]:
+        """An endless stream of new, unsent cases."""
+        names = sorted(self.seeds)
+        mutators = sorted(self.mutators)
+        while True:
+            seed = self._rng.choice(names)
+            mutator = self._rng.choice(mutators)
+            yield Case(seed, mutator, self.mutators[mutator](self.seeds[seed], self._rng))
+
+    async def _send(self, client: AsyncClient, seed: str, body: str) -> Tuple[int, float, str]:
+        try:
+            if soap.extract_rpc_name(self.seeds[seed]) != "cwmp:Inform":
+                inform = await client.inform()
+                if inform.status_code != 200:
+                    raise SessionError(f"Inform: HTTP {inform.status_code}")
+            response = await client.request(body, fix_cwmp_id=False)
+            return response.status_code, response.elapsed.total_seconds(), client.envelope(response).xml
+        finally:
+            client.messages.clear()
+            client.close()
+
+    def _check(self, case: Case) -> None:
+        status_code, latency = self.baselines.get(case.seed, (200, 0.0))
+        if case.status_code is not None and case.status_code >= 500 > status_code:
+            case.anomalies.append(f"HTTP {case.status_code}")
+        if case.latency > max(latency * self.latency_factor, MIN_SLOW_LATENCY):
+            case.anomalies.append("slow")
+        if MARKER in case.response:
+            case.anomalies.append("reflected")
+        if "root:" in case.response and case.mutator == "xxe":
+            case.anomalies.append("xxe")
+
+    async def _run_case(self, client: AsyncClient, case: Case) -> None:
+        start = time.perf_counter()
+        try:
+            case.status_code, case.latency, case.response = await self._send(client, case.seed, case.body)
+        except Exception as e:
+            case.latency = time.perf_counter() - start
+            case.anomalies.append(type(e).__name__)
+        self._check(case)
+        self.stats["cases"] += 1
+        if case.anomalies:
+            self.stats["anomalies"] += 1
+            for anomaly in case.anomalies:
+                self.stats[anomaly] += 1
+            if self.corpus.add(case):
+                self.stats["new"] += 1
+
+    async def _throttle(self) -> None:
+        if self.rate:
+            now = time.perf_counter()
+            slot = max(self._next_case, now)
+            self._next_case = slot + 1 / self.rate
+            if slot > now:
+                await asyncio.sleep(slot - now)
+
+    async def _worker(self, cases: Iterator[Case]) -> None:
+        client = AsyncClient(self.acs_url, **self._client_kwargs)
+        for case in cases:
+            await self._throttle()
+            await self._run_case(client, case)
+
+    async def run_async(self, count: int) -> Corpus:
+        """
+        Establish the baselines if needed and run count cases.
+
+        Returns:
+            The corpus of anomalous cases.
+        """
+        client = AsyncClient(self.acs_url, **self._client_kwargs)
+        for seed, body in self.seeds.items():
+            if seed not in self.baselines:
+                try:
+                    status_code, latency, _ = await self._send(client, seed, body)
+                except Exception as e:
+                    self.baseline_errors[seed] = f"{type(e).__name__}: {e}"
+                    self.stats["baseline errors"] += 1
+                else:
+                    self.baselines[seed] = (status_code, latency)
+                    self.baseline_errors.pop(seed, None)
+        cases = iter(self.cases())
+        limited = (next(cases) for _ in range(count))
+        await asyncio.gather(*(self._worker(limited) for _ in range(self.workers)))
+        return self.corpus
+
+    def run(self, count: int) -> Corpus:
+        """
+        Blocking version of :py:meth:`run_async`, which runs on a new event loop.
+        A transport passed to the fuzzer is not closed, only its asyncio connections on that loop.
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.run_async(count))
+        finally:
+            # Pooled asyncio connections cannot outlive their event loop.
+            if self._owns_transport:
+                self._client_kwargs["transport"].close()
+            else:
+                self._client_kwargs["transport"].close_async()
+            loop.run_until_complete(asyncio.sleep(0))
+            loop.close()
+
+
+@click.command()
+@click.argument("acs-url")
+@click.option("-n", "--count", default=1000, help="Number of cases.", show_default=True)
+@click.option("-w", "--workers", default=10, help="Concurrently running cases.", show_default=True)
+@click.option("-r", "--rate", type=float, help="Maximum cases per second.")
+@click.option("-s", "--seed", "random_seed", type=int, help="Random seed, for reproducible runs.")
+@click.option("-o", "--corpus", type=click.Path(dir_okay=False),
+              help="Load and extend a corpus of anomalous cases.", metavar="FILE")
+@click.option('-b', '--basic-auth', nargs=2, type=str,
+              help="Use basic authentication.", metavar='USER PASS')
+@click.option('-d', '--digest-auth', nargs=2, type=str,
+              help="Use digest authentication.", metavar='USER PASS')
+def cli(acs_url, count, workers, rate, random_seed, corpus, basic_auth, digest_auth):
+    """Fuzz an ACS with mutated CWMP envelopes and collect anomalous responses."""
+    fuzzer = Fuzzer(
+        acs_url,
+        workers=workers,
+        rate=rate,
+        random_seed=random_seed,
+        corpus=Corpus.load(corpus) if corpus and os.path.exists(corpus) else None,
+        basic_auth=basic_auth or None,
+        digest_auth=digest_auth or None,
+    )
+    click.secho(f"=== Fuzzing {acs_url} with {count} cases ===", fg="magenta", bold=True)
+    start = time.perf_counter()
+    fuzzer.run(count)
+    duration = time.perf_counter() - start
+    click.echo(f"Cases:      {fuzzer.stats['cases']} ({fuzzer.stats['cases'] / duration * 60:.0f}/min)")
+    click.echo(f"Anomalies:  {fuzzer.stats['anomalies']} ({fuzzer.stats['new']} new)")
+    for seed, error in fuzzer.baseline_errors.items():
+        click.secho(f"    Baseline of {seed} failed: {error}", fg="red")
+    for case in fuzzer.corpus:
+        click.echo(f"    {case.seed} / {case.mutator}: {', '.join(case.anomalies)}")
+    if corpus:
+        fuzzer.corpus.save(corpus)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    cli()
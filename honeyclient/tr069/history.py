@@ -0,0 +1,193 @@
+"""
+Bounded message histories for long-running clients.
+
+By default, clients keep all messages they have exchanged in memory.
+A :py:class:`History` can instead keep only the last N messages, store older messages compressed,
+and spill messages it evicts to an append-only JSON lines file.
+"""
+import collections.abc
+import datetime
+import json
+import zlib
+from typing import Optional, Union, List, Iterable, Iterator, Dict, Any, IO
+
+import requests
+import requests.structures
+
+Record = Dict[str, Any]
+
+
+def _encode_body(body: Union[str, bytes, Iterable[bytes], None]) -> Optional[str]:
+    # Bodies are stored as text, undecodable bytes are preserved as surrogates.
+    # Streamed bodies have been consumed when they were sent and are not stored.
+    if isinstance(body, bytes):
+        return body.decode("utf-8", "surrogateescape")
+    if isinstance(body, str):
+        return body
+    return None
+
+
+def to_record(response: requests.Response) -> Record:
+    """
+    Convert a response and its request into a JSON-serializable record.
+    """
+    request = response.request
+    return {
+        "request": {
+            "method": request.method,
+            "url": request.url,
+            "headers": dict(request.headers),
+            "body": _encode_body(request.body),
+            "body_is_bytes": isinstance(request.body, bytes),
+        },
+        "response": {
+            "status_code": response.status_code,
+            "reason": response.reason,
+            "headers": dict(response.headers),
+            "body": _encode_body(response.content),
+            "encoding": response.encoding,
+            "elapsed": response.elapsed.total_seconds(),
+        },
+    }
+
+
+def from_record(record: Record) -> requests.Response:
+    """
+    Reconstruct a response and its request from a record created by :py:func:`to_record`.
+    """
+    req = record["request"]
+    request = requests.PreparedRequest()
+    request.method = req["method"]
+    request.url = req["url"]
+    request.headers = requests.structures.CaseInsensitiveDict(req["headers"])
+    request.body = req["body"]
+    if req["body"] is not None and req["body_is_bytes"]:
+        request.body = req["body"].encode("utf-8", "surrogateescape")
+
+    resp = record["response"]
+    response = requests.Response()
+    response.request = request
+    response.url = request.url
+    response.status_code = resp["status_code"]
+    response.reason = resp["reason"]
+    response.headers = requests.structures.CaseInsensitiveDict(resp["headers"])
+    response._content = resp["body"].encode("utf-8", "surrogateescape")
+    response.encoding = resp["encoding"]
+    response.elapsed = datetime.timedelta(seconds=resp["elapsed"])
+    return response
+
+
+def load(path: str) -> Iterator[requests.Response]:
+    """
+    Read the messages spilled to a file by a :py:class:`History`.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield from_record(json.loads(line))
+
+
+class _Compressed:
+    """A message stored as a compressed JSON record."""
+    __slots__ = ("data",)
+
+    def __init__(self, response: requests.Response):
+        self.data = zlib.compress(json.dumps(to_record(response)).encode())
+
+    def json(self) -> str:
+        return zlib.decompress(self.data).decode()
+
+    def decompress(self) -> requests.Response:
+        return from_record(json.loads(self.json()))
+
+
+class History(collections.abc.Sequence):
+    """
+    The messages exchanged by a client, oldest first.
+
+    The last message is always kept as-is, which is what cwmp:ID handling and replay() need.
+    If compress is set, older messages are reconstructed from their compressed form on every access,
+    so they are new objects with the same contents as the original responses.
+    """
+    max_messages: Optional[int]
+    compress: bool
+    spill: Optional[str]
+    evicted: int
+    _messages: collections.deque
+    _spill_file: Optional[IO[str]]
+
+    def __init__(
+            self,
+            max_messages: Optional[int] = None,
+            *,
+            compress: bool = False,
+            spill: Optional[str] = None,
+    ):
+        """
+        Args:
+            max_messages: The maximum number of messages kept in memory. Defaults to no limit.
+            compress: If True, all but the last message are stored compressed.
+            spill: The path of a file messages are appended to once they are evicted from memory,
+                see :py:func:`load`. If not set, evicted messages are discarded.
+        """
+        if max_messages is not None and max_messages < 1:
+            raise ValueError("History must keep at least one message.")
+        self.max_messages = max_messages
+        self.compress = compress
+        self.spill = spill
+        self.evicted = 0
+        self._messages = collections.deque()
+        self._spill_file = None
+
+    def __repr__(self):
+        return f"History({len(self._messages)} messages, {self.evicted} evicted)"
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[requests.Response, List[requests.Response]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._messages)))]
+        message = self._messages[index]
+        if isinstance(message, _Compressed):
+            return message.decompress()
+        return message
+
+    def __eq__(self, other):
+        if isinstance(other, collections.abc.Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(a is b or a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def append(self, response: requests.Response) -> None:
+        if self.compress and self._messages:
+            self._messages[-1] = _Compressed(self._messages[-1])
+        self._messages.append(response)
+        while self.max_messages is not None and len(self._messages) > self.max_messages:
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Remove all messages from memory. Spilled messages are not affected.
+        """
+        self._messages.clear()
+
+    def close(self) -> None:
+        """
+        Close the spill file.
+        """
+        if self._spill_file:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def _evict(self) -> None:
+        message = self._messages.popleft()
+        self.evicted += 1
+        if self.spill:
+            if isinstance(message, _Compressed):
+                line = message.json()
+            else:
+                line = json.dumps(to_record(message))
+            if self._spill_file is None:
+                self._spill_file = open(self.spill, "a", encoding="utf-8")
+            self._spill_file.write(line + "\n")
+            self._spill_file.flush()
@@ -0,0 +1,413 @@
+"""
+An in-process mock ACS for end-to-end tests and benchmarks.
+
+:py:class:`MockACS` is a local HTTP server that speaks just enough CWMP to drive a client through complete sessions:
+it answers Informs, runs a scripted list of server RPCs, records the CPE's responses,
+tracks sessions by cookie and optionally requires HTTP digest authentication.
+"""
+import asyncio
+import collections
+import hashlib
+import http
+import itertools
+import os
+import ssl
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from tr069.data import device as mdevice
+from tr069.data import envelope as menvelope
+from tr069.data import parameters
+from tr069.data import soap
+
+INFORM_RESPONSE = soap.soapify("""
+    <cwmp:InformResponse>
+        <MaxEnvelopes>1</MaxEnvelopes>
+    </cwmp:InformResponse>
+""")
+COOKIE_NAME = "session"
+REALM = "tr069.testing"
+
+
+def get_parameter_values(names: Sequence[str]) -> str:
+    """Create a GetParameterValues RPC."""
+    return soap.soapify(f"""
+        <cwmp:GetParameterValues>
+            <ParameterNames soap-enc:arrayType="xsd:string[{len(names)}]">
+                {"".join(f"<string>{name}</string>" for name in names)}
+            </ParameterNames>
+        </cwmp:GetParameterValues>
+    """)
+
+
+def set_parameter_values(params: Union[Dict[str, str], Sequence[parameters.Parameter]]) -> str:
+    """Create a SetParameterValues RPC."""
+    if isinstance(params, dict):
+        params = [parameters.Parameter(name, value) for name, value in params.items()]
+    return soap.soapify(f"""
+        <cwmp:SetParameterValues>
+            <ParameterList soap-enc:arrayType="cwmp:ParameterValueStruct[{len(params)}]">
+                {"".join(param.to_xml() for param in params)}
+            </ParameterList>
+            <ParameterKey></ParameterKey>
+        </cwmp:SetParameterValues>
+    """)
+
+
+def set_parameter_attributes(notifications: Dict[str, int]) -> str:
+    """Create a SetParameterAttributes RPC that changes the notification of the given parameters or objects."""
+    structs = "".join(
+        f"<SetParameterAttributesStruct><Name>{name}</Name>"
+        f"<NotificationChange>1</NotificationChange><Notification>{level}</Notification>"
+        f"<AccessListChange>0</AccessListChange><AccessList soap-enc:arrayType=\"xsd:string[0]\"></AccessList>"
+        f"</SetParameterAttributesStruct>"
+        for name, level in notifications.items()
+    )
+    return soap.soapify(f"""
+        <cwmp:SetParameterAttributes>
+            <ParameterList soap-enc:arrayType="cwmp:SetParameterAttributesStruct[{len(notifications)}]">
+                {structs}
+            </ParameterList>
+        </cwmp:SetParameterAttributes>
+    """)
+
+
+def get_parameter_names(path: str = "", next_level: bool = False) -> str:
+    """Create a GetParameterNames RPC."""
+    return soap.soapify(f"""
+        <cwmp:GetParameterNames>
+            <ParameterPath>{path}</ParameterPath>
+            <NextLevel>{int(next_level)}</NextLevel>
+        </cwmp:GetParameterNames>
+    """)
+
+
+def download(url: str, file_type: str = "1 Firmware Upgrade Image", command_key: str = "") -> str:
+    """Create a Download RPC."""
+    return soap.soapify(f"""
+        <cwmp:Download>
+            <CommandKey>{command_key}</CommandKey>
+            <FileType>{file_type}</FileType>
+            <URL>{url}</URL>
+            <Username></Username>
+            <Password></Password>
+            <FileSize>0</FileSize>
+            <TargetFileName></TargetFileName>
+            <DelaySeconds>0</DelaySeconds>
+            <SuccessURL></SuccessURL>
+            <FailureURL></FailureURL>
+        </cwmp:Download>
+    """)
+
+
+class Session:
+    """
+    A CWMP session, from the Inform to the ACS' empty response.
+    """
+    id: str
+    inform: menvelope.Envelope
+    rpcs: List[str]
+    responses: List[menvelope.Envelope]
+    done: bool
+    last_activity: float
+    _device: Optional[mdevice.Device]
+
+    def __init__(self, id: str, inform: menvelope.Envelope, rpcs: Iterable[str]):
+        self.id = id
+        self.inform = inform
+        self.rpcs = list(rpcs)
+        self.responses = []
+        self.done = False
+        self.last_activity = time.monotonic()
+        self._device = None
+        self._pending = collections.deque(self.rpcs)
+        self._ids = itertools.count(1)
+
+    def __repr__(self):
+        return f"Session({self.id}, {len(self.responses)}/{len(self.rpcs)} RPCs, done={self.done})"
+
+    @property
+    def device(self) -> mdevice.Device:
+        """The device that started the session, parsed from its Inform on first access."""
+        if self._device is None:
+            self._device = mdevice.from_xml(self.inform.xml)
+        return self._device
+
+    def next_rpc(self) -> Optional[str]:
+        if not self._pending:
+            self.done = True
+            return None
+        return soap.set_cwmp_id(self._pending.popleft(), str(next(self._ids)))
+
+
+class _Request:
+    """A parsed HTTP request."""
+    __slots__ = ("method", "headers", "cookies", "body")
+
+    def __init__(self, method: str, headers: Dict[str, str], cookies: Dict[str, str], body: str):
+        self.method = method
+        self.headers = headers
+        self.cookies = cookies
+        self.body = body
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[_Request]:
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method = request_line.split(b" ", 1)[0].decode("latin-1")
+    headers = {}
+    cookies = {}
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        value = value.strip()
+        if name == "cookie":
+            for part in value.split(";"):
+                key, _, val = part.strip().partition("=")
+                cookies[key] = val
+        headers[name] = value
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()).strip():
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return _Request(method, headers, cookies, body.decode("utf-8", "replace"))
+
+
+def _format_response(status: int, body: str = "", headers: Optional[Dict[str, str]] = None) -> bytes:
+    content = body.encode()
+    lines = [f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}"]
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    if status != 204:
+        lines.append("Content-Type: text/xml; charset=utf-8")
+        lines.append(f"Content-Length: {len(content)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + content
+
+
+class MockACS:
+    """
+    A local ACS that runs a scripted provisioning session for every Inform.
+
+    Example::
+
+        with MockACS([get_parameter_values(["InternetGatewayDevice."])]) as acs:
+            client = tr069.Client(acs.url)
+            client.inform()
+            client.done()
+            client.handle_server_rpcs()
+
+    Sessions are tracked with a cookie, or by connection for clients that do not support cookies.
+    Digest nonces are valid for :py:attr:`NONCE_TTL` seconds.
+    All connections are served by a single event loop on a background thread,
+    which sustains thousands of sessions per second even on a single core.
+    """
+    url: str
+    script: Union[Sequence[str], Callable[[menvelope.Envelope], Iterable[str]]]
+    digest_auth: Optional[Tuple[str, str]]
+    keep_sessions: bool
+    sessions: Dict[str, Session]
+    stats: Dict[str, int]
+    # By nonce: the time it expires.
+    _nonces: Dict[str, float]
+
+    NONCE_TTL = 300
+    MAX_NONCES = 10_000
+    SESSION_TIMEOUT = 300
+
+    def __init__(
+            self,
+            script: Union[Sequence[str], Callable[[menvelope.Envelope], Iterable[str]]] = (),
+            *,
+            address: Tuple[str, int] = ("127.0.0.1", 0),
+            digest_auth: Optional[Tuple[str, str]] = None,
+            keep_sessions: bool = True,
+            ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        """
+        Args:
+            script: The server RPCs sent in every session, e.g. created with :py:func:`get_parameter_values`.
+                Alternatively, a function that returns the RPCs for a new session given the session's Inform.
+            address: The address to listen on.
+            digest_auth: A (user, pass) tuple. If set, clients need to authenticate with HTTP digest authentication.
+            keep_sessions: If False, completed sessions and sessions that were idle for
+                :py:attr:`SESSION_TIMEOUT` seconds are discarded, which keeps memory constant under load.
+            ssl_context: A server TLS context. If set, the ACS is served over HTTPS.
+        """
+        self.script = script
+        self.digest_auth = digest_auth
+        self.keep_sessions = keep_sessions
+        self.sessions = collections.OrderedDict()
+        self.stats = collections.Counter()
+        self._ids = itertools.count(1)
+        self._nonces = collections.OrderedDict()
+        self._connections = set()
+
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(self._start_server(address, ssl_context))
+        host, port = self._server.sockets[0].getsockname()[:2]
+        scheme = "https" if ssl_context else "http"
+        self.url = f"{scheme}://{host}:{port}/"
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return f"MockACS({self.url}, {self.stats['sessions']} sessions)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def _start_server(
+            self,
+            address: Tuple[str, int],
+            ssl_context: Optional[ssl.SSLContext],
+    ) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._accept, *address, ssl=ssl_context, backlog=1024)
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.ensure_future(self._serve(reader, writer))
+        self._connections.add(task)
+        task.add_done_callback(self._connections.discard)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # The session of this connection, for clients that do not support cookies.
+        connection_session = None
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                session = connection_session
+                if COOKIE_NAME in request.cookies:
+                    session = self.sessions.get(request.cookies[COOKIE_NAME])
+                status, body, headers, session = self._handle(request, session)
+                connection_session = session
+                writer.write(_format_response(status, body, headers))
+                await writer.drain()
+                if request.headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    def _handle(
+            self,
+            request: _Request,
+            session: Optional[Session],
+    ) -> Tuple[int, str, Dict[str, str], Optional[Session]]:
+        """
+        Returns:
+            The response's status code, body and headers, and the session of the connection.
+        """
+        authorization = request.headers.get("authorization")
+        if self.digest_auth and (authorization or session is None):
+            if not authorization or not self._check_digest(request.method, authorization):
+                self.stats["unauthorized"] += 1
+                return 401, "", {"WWW-Authenticate": self._digest_challenge()}, session
+
+        envelope = menvelope.Envelope(request.body)
+        if envelope.rpc_name == "cwmp:Inform":
+            session = self._start_session(envelope)
+            headers = {"Set-Cookie": f"{COOKIE_NAME}={session.id}; Path=/"}
+            return 200, soap.fix_cwmp_id(INFORM_RESPONSE, request.body), headers, session
+        if session is None or session.done:
+            self.stats["no session"] += 1
+            return 400, "No session, send an Inform first.", {}, None
+        session.last_activity = time.monotonic()
+        if not self.keep_sessions:
+            self.sessions.move_to_end(session.id)
+        if request.body.strip():
+            session.responses.append(envelope)
+        rpc = session.next_rpc()
+        if rpc is None:
+            self.stats["sessions completed"] += 1
+            if not self.keep_sessions:
+                del self.sessions[session.id]
+            return 204, "", {}, None
+        self.stats["rpcs"] += 1
+        return 200, rpc, {}, session
+
+    def _start_session(self, inform: menvelope.Envelope) -> Session:
+        rpcs = self.script(inform) if callable(self.script) else self.script
+        session = Session(str(next(self._ids)), inform, rpcs)
+        self.stats["sessions"] += 1
+        if not self.keep_sessions:
+            self._expire_sessions(session.last_activity - self.SESSION_TIMEOUT)
+        self.sessions[session.id] = session
+        return session
+
+    def _expire_sessions(self, deadline: float) -> None:
+        # Sessions are ordered by their last activity.
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_activity > deadline:
+                break
+            del self.sessions[session.id]
+            session.done = True
+            self.stats["sessions expired"] += 1
+
+    def _digest_challenge(self) -> str:
+        now = time.monotonic()
+        # Nonces are ordered by their expiry.
+        while self._nonces and (len(self._nonces) >= self.MAX_NONCES or next(iter(self._nonces.values())) < now):
+            self._nonces.popitem(last=False)
+        nonce = os.urandom(16).hex()
+        self._nonces[nonce] = now + self.NONCE_TTL
+        return f'Digest realm="{REALM}", nonce="{nonce}", qop="auth", algorithm=MD5'
+
+    def _check_digest(self, method: str, authorization: str) -> bool:
+        scheme, _, params = authorization.partition(" ")
+        if scheme.lower() != "digest":
+            return False
+        fields = {}
+        for part in params.split(","):
+            name, _, value = part.strip().partition("=")
+            fields[name.lower()] = value.strip('"')
+        try:
+            if self._nonces.get(fields["nonce"], 0) < time.monotonic() or fields["username"] != self.digest_auth[0]:
+                return False
+            ha1 = _md5(f"{self.digest_auth[0]}:{REALM}:{self.digest_auth[1]}")
+            ha2 = _md5(f"{method}:{fields['uri']}")
+            if fields.get("qop"):
+                expected = _md5(f"{ha1}:{fields['nonce']}:{fields['nc']}:{fields['cnonce']}:{fields['qop']}:{ha2}")
+            else:
+                expected = _md5(f"{ha1}:{fields['nonce']}:{ha2}")
+        except KeyError:
+            return False
+        return fields.get("response") == expected
+
+
+def _md5(text: str) -> str:
+    return hashlib.md5(text.encode()).hexdigest()
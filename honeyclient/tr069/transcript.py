@@ -0,0 +1,315 @@
+"""
+Recording and bulk replay of complete CWMP sessions.
+
+A :py:class:`Recorder` is a message history that groups the messages of a client into sessions
+and remembers when each request was sent. The sessions can be saved to a transcript file
+and replayed by many virtual CPEs against an ACS, in parallel and time-compressed,
+which turns a single captured interaction into a repeatable regression and load scenario::
+
+    recorder = transcript.Recorder()
+    client = tr069.Client(acs_url, history=recorder)
+    ...
+    recorder.save("session.jsonl.gz")
+
+    stats = transcript.replay(acs_url, transcript.load("session.jsonl.gz"), devices=1000, speed=10)
+"""
+import asyncio
+import gzip
+import json
+import re
+import time
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Sequence
+
+import click
+import requests
+
+from tr069 import history as mhistory
+from tr069 import util
+from tr069.async_client import AsyncClient
+from tr069.data import soap
+from tr069.fleet import FleetStats, SessionError
+
+_serial_rex = re.compile(r"<SerialNumber>(.*?)</SerialNumber>", re.DOTALL)
+
+
+class Session:
+    """
+    A recorded CWMP session.
+
+    Messages are records as created by :py:func:`tr069.history.to_record`, with an additional "time" field:
+    the number of seconds between the start of the session and sending the request.
+    """
+    start: float
+    messages: List[mhistory.Record]
+
+    def __init__(self, start: float, messages: Iterable[mhistory.Record] = ()):
+        """
+        Args:
+            start: The time the first request was sent, in seconds since the epoch.
+            messages: The session's messages.
+        """
+        self.start = start
+        self.messages = list(messages)
+
+    def __repr__(self):
+        return f"Session({self.serial}, {len(self.messages)} messages)"
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    @property
+    def serial(self) -> Optional[str]:
+        """The serial number in the session's Inform."""
+        for message in self.messages:
+            match = _serial_rex.search(message["request"]["body"] or "")
+            if match:
+                return match.group(1)
+        return None
+
+    @property
+    def duration(self) -> float:
+        if not self.messages:
+            return 0.0
+        return self.messages[-1]["time"] + self.messages[-1]["response"]["elapsed"]
+
+    def append(self, response: requests.Response, sent: float) -> None:
+        record = mhistory.to_record(response)
+        record["time"] = sent - self.start
+        self.messages.append(record)
+
+    def responses(self) -> List[requests.Response]:
+        """Reconstruct the session's responses and their requests."""
+        return [mhistory.from_record(message) for message in self.messages]
+
+    def to_record(self) -> Dict[str, Any]:
+        return {"start": self.start, "messages": self.messages}
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Session":
+        return cls(record["start"], record["messages"])
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def save(sessions: Iterable[Session], path: str) -> None:
+    """
+    Write sessions to a transcript file, one JSON object per line. Files ending in .gz are compressed.
+    """
+    with _open(path, "w") as f:
+        for session in sessions:
+            f.write(json.dumps(session.to_record(), separators=(",", ":")) + "\n")
+
+
+def load(path: str) -> Iterator[Session]:
+    """
+    Read the sessions of a transcript file written by :py:func:`save`.
+    """
+    with _open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield Session.from_record(json.loads(line))
+
+
+def _is_inform(request: requests.PreparedRequest) -> bool:
+    body = request.body or ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    return soap.extract_rpc_name(body) == "cwmp:Inform"
+
+
+class Recorder(mhistory.History):
+    """
+    A message history that also records all messages as sessions, each of which starts with an Inform.
+
+    Clearing the history does not affect recorded sessions, so a recorder can be used by clients
+    that clear their history after every session.
+    """
+    sessions: List[Session]
+
+    def __init__(self, max_messages: Optional[int] = None, **kwargs):
+        """
+        Args:
+            max_messages: The maximum number of messages kept in the history. Recorded sessions are not limited.
+            **kwargs: Additional arguments passed to :py:class:`tr069.history.History`.
+        """
+        super().__init__(max_messages, **kwargs)
+        self.sessions = []
+
+    def __repr__(self):
+        return f"Recorder({len(self.sessions)} sessions)"
+
+    def append(self, response: requests.Response) -> None:
+        super().append(response)
+        sent = time.time() - response.elapsed.total_seconds()
+        if not self.sessions or _is_inform(response.request):
+            self.sessions.append(Session(sent))
+        self.sessions[-1].append(response, sent)
+
+    def save(self, path: str) -> None:
+        """Write all recorded sessions to a transcript file, see :py:func:`save`."""
+        save(self.sessions, path)
+
+
+def _describe(status_code: int, body: str) -> str:
+    return soap.extract_rpc_name(body) or f"HTTP {status_code}"
+
+
+class _Replay:
+    def __init__(
+            self,
+            acs_url: str,
+            sessions: Sequence[Session],
+            serials: Sequence[str],
+            speed: float,
+            concurrency: int,
+            client_kwargs: Dict[str, Any],
+    ):
+        self.acs_url = acs_url
+        self.sessions = sessions
+        self.serials = serials
+        self.speed = speed
+        self.concurrency = concurrency
+        self.client_kwargs = client_kwargs
+        self.stats = FleetStats()
+        self._recorded_serials = [session.serial for session in sessions]
+
+    async def _wait_until(self, start: float, offset: float) -> None:
+        if self.speed:
+            delay = start + offset / self.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _session(self, client: AsyncClient, session: Session, original: Optional[str], serial: str) -> None:
+        start = time.perf_counter()
+        try:
+            for message in session.messages:
+                await self._wait_until(start, message["time"])
+                body = message["request"]["body"] or ""
+                if original is not None:
+                    body = body.replace(f">{original}<", f">{serial}<")
+                response = await client.request(body)
+                expected = _describe(message["response"]["status_code"], message["response"]["body"])
+                actual = _describe(response.status_code, client.envelope(response).xml)
+                if expected != actual:
+                    raise SessionError(f"Expected {expected}, got {actual}")
+                if not actual.startswith("HTTP ") and not actual.endswith("Response"):
+                    self.stats.rpcs += 1
+        except SessionError as e:
+            self.stats.errors[str(e)] += 1
+        except Exception as e:
+            self.stats.errors[type(e).__name__] += 1
+        else:
+            self.stats.sessions += 1
+            self.stats.session_latencies.append(time.perf_counter() - start)
+        finally:
+            self.stats.request_latencies.extend(m.elapsed.total_seconds() for m in client.messages)
+            client.messages.clear()
+            client.close()
+
+    async def _device(self, serial: str, semaphore: asyncio.Semaphore) -> None:
+        client = AsyncClient(self.acs_url, **self.client_kwargs)
+        start = time.perf_counter()
+        for session, original in zip(self.sessions, self._recorded_serials):
+            await self._wait_until(start, session.start - self.sessions[0].start)
+            async with semaphore:
+                await self._session(client, session, original, serial)
+
+    async def run(self) -> FleetStats:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(*(self._device(serial, semaphore) for serial in self.serials))
+        self.stats.duration = time.perf_counter() - start
+        return self.stats
+
+
+async def replay_async(
+        acs_url: str,
+        sessions: Iterable[Session],
+        devices: int = 1,
+        *,
+        serials: Optional[Sequence[str]] = None,
+        speed: float = 1.0,
+        concurrency: int = 100,
+        **client_kwargs
+) -> FleetStats:
+    """
+    Replay recorded sessions with many virtual CPEs in parallel.
+
+    Every CPE sends the recorded requests of all sessions in order,
+    with its own serial number, cookies and the cwmp:IDs of the ACS' requests.
+    A session fails if the ACS does not respond with the same status code and RPC as in the recording.
+
+    Args:
+        acs_url: The ACS URL.
+        sessions: The sessions to replay, e.g. from :py:func:`load`.
+        devices: The number of virtual CPEs.
+        serials: The serial numbers of the virtual CPEs, which replace the recorded serial number.
+            Defaults to the recorded serial number followed by a per-device suffix, like in :py:mod:`tr069.fleet`.
+        speed: The time compression factor. The delays between sessions and requests are divided by speed,
+            0 replays as fast as possible.
+        concurrency: The maximum number of concurrently running sessions.
+        **client_kwargs: Additional arguments passed to :py:class:`tr069.AsyncClient`.
+
+    Returns:
+        The statistics of this run.
+    """
+    sessions = list(sessions)
+    if serials is None:
+        recorded = next((s.serial for s in sessions if s.serial), "")
+        serials = [f"{recorded}{i:06X}" for i in range(devices)]
+    client_kwargs.setdefault("log", False)
+    return await _Replay(acs_url, sessions, serials, speed, concurrency, client_kwargs).run()
+
+
+def replay(acs_url: str, sessions: Iterable[Session], devices: int = 1, **kwargs) -> FleetStats:
+    """
+    Blocking version of :py:func:`replay_async`, which runs on a new event loop.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(replay_async(acs_url, sessions, devices, **kwargs))
+    finally:
+        loop.close()
+
+
+@click.command()
+@click.argument("transcript", type=click.Path(exists=True, dir_okay=False))
+@click.argument("acs-url")
+@click.option("-n", "--devices", default=1, help="Number of virtual CPEs.", show_default=True)
+@click.option("-x", "--speed", default=1.0, show_default=True,
+              help="Time compression factor, 0 replays as fast as possible.")
+@click.option("-c", "--concurrency", default=100, help="Maximum concurrent sessions.", show_default=True)
+@click.option('-b', '--basic-auth', nargs=2, type=str,
+              help="Use basic authentication.", metavar='USER PASS')
+@click.option('-d', '--digest-auth', nargs=2, type=str,
+              help="Use digest authentication.", metavar='USER PASS')
+@click.option('-l', '--log', type=click.File("w"),
+              help="Log all HTTP flows to a JSON lines file.", metavar='FILE')
+def cli(transcript, acs_url, devices, speed, concurrency, basic_auth, digest_auth, log):
+    """Replay the sessions of a transcript file with many virtual CPEs."""
+    logger = util.FlowLogger("jsonl", log) if log else False
+    sessions = list(load(transcript))
+    click.secho(
+        f"=== Replaying {len(sessions)} session(s) on {devices} virtual CPEs ===", fg="magenta", bold=True
+    )
+    stats = replay(
+        acs_url,
+        sessions,
+        devices,
+        speed=speed,
+        concurrency=concurrency,
+        basic_auth=basic_auth or None,
+        digest_auth=digest_auth or None,
+        log=logger,
+    )
+    if logger:
+        logger.close()
+    click.echo(stats.summary())
+
+
+if __name__ == "__main__":  # pragma: no cover
+    cli()
@@ -0,0 +1,296 @@
+"""
+Connection pools and TLS contexts shared by many clients.
+
+By default, every client has its own connections and TLS configuration.
+When thousands of simulated CPEs talk to the same ACS, that means a full TCP and TLS handshake for every session.
+Clients that share a :py:class:`Transport` instead reuse idle connections and resume TLS sessions::
+
+    transport = Transport(pool_size=50)
+    clients = [tr069.Client(acs_url, device, transport=transport) for device in devices]
+"""
+import collections
+import ssl
+import urllib.parse
+import weakref
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import requests
+import requests.adapters
+import urllib3
+
+Verify = Union[bool, str]
+Cert = Union[Tuple[str, str], str, None]
+
+
+def make_ssl_context(verify: Verify = True, cert: Cert = None) -> ssl.SSLContext:
+    """
+    Create a client SSL context from requests-style verify and cert arguments.
+
+    Args:
+        verify: Whether to verify the server's certificate, or the path of a CA bundle to verify it with.
+        cert: A client certificate file, or a (certificate, key) tuple.
+    """
+    return _configure(ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT), verify, cert)
+
+
+def _configure(ctx: ssl.SSLContext, verify: Verify, cert: Cert) -> ssl.SSLContext:
+    # Mirrors ssl.create_default_context, which cannot create subclasses.
+    if isinstance(verify, str):
+        ctx.load_verify_locations(cafile=verify)
+    else:
+        ctx.load_default_certs(ssl.Purpose.SERVER_AUTH)
+        if not verify:
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+    if isinstance(cert, str):
+        ctx.load_cert_chain(cert)
+    elif cert:
+        ctx.load_cert_chain(*cert)
+    return ctx
+
+
+class _ResumingContext(ssl.SSLContext):
+    """
+    An SSL context that resumes the last TLS session with a host on new connections.
+
+    TLS 1.3 session tickets only arrive after the handshake, so the session is taken from the host's
+    most recent connection whenever a new one is made.
+    """
+    stats: Dict[str, int]
+    _sessions: Dict[str, ssl.SSLSession]
+    _connections: Dict[str, "weakref.ReferenceType"]
+
+    def __init__(self, protocol: int, stats: Dict[str, int]):
+        self.stats = stats
+        self._sessions = {}
+        self._connections = {}
+
+    def _session(self, hostname: Optional[str]) -> Optional[ssl.SSLSession]:
+        ref = self._connections.get(hostname)
+        conn = ref() if ref else None
+        if conn is not None:
+            try:
+                session = conn.session
+            except (OSError, ValueError):
+                session = None
+            if session is not None and (session.has_ticket or conn.version() != "TLSv1.3"):
+                self._sessions[hostname] = session
+        return self._sessions.get(hostname)
+
+    def handshake_done(self, hostname: Optional[str], conn: Union[ssl.SSLSocket, ssl.SSLObject]) -> None:
+        """Record a completed handshake on conn, whose session is resumed on the next connection to hostname."""
+        self._connections[hostname] = weakref.ref(conn)
+        self.stats["tls handshakes"] += 1
+        if conn.session_reused:
+            self.stats["tls resumed"] += 1
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True,
+                    suppress_ragged_eofs=True, server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self._session(server_hostname)
+        conn = super().wrap_socket(
+            sock,
+            server_side=server_side,
+            do_handshake_on_connect=do_handshake_on_connect,
+            suppress_ragged_eofs=suppress_ragged_eofs,
+            server_hostname=server_hostname,
+            session=session,
+        )
+        if do_handshake_on_connect and not server_side:
+            self.handshake_done(server_hostname, conn)
+        return conn
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        # asyncio performs the handshake later, see Transport.connected.
+        if session is None and not server_side:
+            session = self._session(server_hostname)
+        return super().wrap_bio(
+            incoming, outgoing, server_side=server_side, server_hostname=server_hostname, session=session
+        )
+
+
+class _CountingPool:
+    stats: Dict[str, int] = collections.Counter()
+
+    def _new_conn(self):
+        self.stats["connections"] += 1
+        return super()._new_conn()
+
+
+class _HTTPConnectionPool(_CountingPool, urllib3.HTTPConnectionPool):
+    pass
+
+
+class _HTTPSConnectionPool(_CountingPool, urllib3.HTTPSConnectionPool):
+    def _new_conn(self):
+        conn = super()._new_conn()
+        # All TLS settings are part of the transport's shared context. requests sets the CA and client certificates
+        # of every request on the pool, which would load them into that context again for every new connection.
+        conn.cert_reqs = conn.ssl_context.verify_mode
+        conn.ca_certs = conn.ca_cert_dir = None
+        conn.cert_file = conn.key_file = None
+        return conn
+
+
+class _PoolManager(urllib3.PoolManager):
+    def __init__(self, stats: Dict[str, int], **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+        self.pool_classes_by_scheme = {"http": _HTTPConnectionPool, "https": _HTTPSConnectionPool}
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.stats = self.stats
+        return pool
+
+
+class _Adapter(requests.adapters.HTTPAdapter):
+    """A requests transport adapter that uses the transport's pool and TLS context."""
+
+    def __init__(self, transport: "Transport"):
+        self._transport = transport
+        super().__init__(pool_maxsize=transport.pool_size)
+
+    def init_poolmanager(self, connections, maxsize, block=requests.adapters.DEFAULT_POOLBLOCK, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _PoolManager(
+            self._transport.stats, num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs
+        )
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        if host_params["scheme"] == "https":
+            # The transport's TLS settings take precedence over the verify argument, which requests may take
+            # from the environment, so all requests to a host share one pool.
+            pool_kwargs = {"ssl_context": self._transport.ssl_context}
+        return host_params, pool_kwargs
+
+    def send(self, request, **kwargs):
+        self._transport.stats["requests"] += 1
+        return super().send(request, **kwargs)
+
+
+class Transport:
+    """
+    A pool of connections and a TLS context shared by many :py:class:`tr069.Client`
+    and :py:class:`tr069.AsyncClient` instances.
+
+    Clients that share a transport keep their own cookies and authentication state,
+    but take idle connections from the pool instead of opening new ones, return them when they are closed,
+    and resume earlier TLS sessions with the ACS when a new connection is needed.
+    TLS settings are part of the transport and cannot be set on individual clients.
+
+    The stats count the requests sent and the connections opened through the transport,
+    as well as the TLS handshakes and how many of them resumed an earlier session.
+    """
+    pool_size: int
+    verify: Verify
+    cert: Cert
+    stats: Dict[str, int]
+    _ssl_context: Optional[_ResumingContext]
+    _adapter: Optional[_Adapter]
+    _idle: Dict[Tuple[str, str, int], List[Any]]
+
+    def __init__(self, pool_size: int = 100, *, verify: Verify = True, cert: Cert = None):
+        """
+        Args:
+            pool_size: The maximum number of idle connections kept per host.
+            verify: Whether to verify the ACS' certificate, or the path of a CA bundle to verify it with.
+            cert: TLS client certificate, either a file or a (certificate, key) tuple.
+        """
+        self.pool_size = pool_size
+        self.verify = verify
+        self.cert = cert
+        self.stats = collections.Counter()
+        self._ssl_context = None
+        self._adapter = None
+        self._idle = {}
+
+    def __repr__(self):
+        return (
+            f"Transport({self.stats['requests']} requests, {self.stats['connections']} connections, "
+            f"{self.stats['tls resumed']}/{self.stats['tls handshakes']} TLS sessions resumed)"
+        )
+
+    @property
+    def ssl_context(self) -> ssl.SSLContext:
+        """The TLS context of all connections, created on first use."""
+        if self._ssl_context is None:
+            self._ssl_context = _configure(
+                _ResumingContext(ssl.PROTOCOL_TLS_CLIENT, self.stats), self.verify, self.cert
+            )
+        return self._ssl_context
+
+    def session(self) -> requests.Session:
+        """
+        Create a requests session with its own cookies that sends all requests through the transport.
+        """
+        if self._adapter is None:
+            self._adapter = _Adapter(self)
+        session = requests.Session()
+        session.mount("http://", self._adapter)
+        session.mount("https://", self._adapter)
+        return session
+
+    @staticmethod
+    def _key(url: str) -> Tuple[str, str, int]:
+        parts = urllib.parse.urlsplit(url)
+        return parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)
+
+    def acquire(self, url: str) -> Optional[Any]:
+        """
+        Take an idle asyncio connection to url from the pool.
+
+        Returns:
+            The connection, or None if a new connection needs to be opened.
+        """
+        idle = self._idle.get(self._key(url))
+        while idle:
+            connection = idle.pop()
+            if not connection.closed and not connection.writer.is_closing():
+                return connection
+        return None
+
+    def release(self, url: str, connection: Any) -> None:
+        """
+        Return an asyncio connection to url to the pool, or close it if the pool is full.
+        """
+        if connection.closed:
+            return
+        idle = self._idle.setdefault(self._key(url), [])
+        if len(idle) < self.pool_size:
+            idle.append(connection)
+        else:
+            connection.close()
+
+    def connected(self, url: str, connection: Any) -> None:
+        """
+        Record a new asyncio connection to url.
+        """
+        self.stats["connections"] += 1
+        ssl_object = connection.writer.get_extra_info("ssl_object")
+        if ssl_object is not None:
+            self.ssl_context.handshake_done(urllib.parse.urlsplit(url).hostname, ssl_object)
+
+    def close_async(self) -> None:
+        """
+        Close all idle asyncio connections, e.g. before the event loop they were opened on is closed.
+        Idle connections of requests sessions are kept.
+        """
+        for idle in self._idle.values():
+            for connection in idle:
+                connection.close()
+        self._idle.clear()
+
+    def close(self) -> None:
+        """
+        Close all idle connections. The transport remains usable and keeps its TLS sessions for resumption.
+
+        Asyncio connections belong to the event loop they were opened on, so they should be closed
+        before that loop is closed.
+        """
+        self.close_async()
+        if self._adapter is not None:
+            self._adapter.close()
